@@ -62,7 +62,8 @@ def init_econ_platform():
     :return:
     """
     econ_platform_core.init_package()
-    _LoadedExtensions, _FailedExtensions, _DecoratedFailedExtensions = econ_platform.extensions.load_extensions()
+    _LoadedExtensions, _FailedExtensions, _DecoratedFailedExtensions = econ_platform_core.ExtensionList.TimePhase(
+        'Load extensions (econ_platform)', econ_platform.extensions.load_extensions)
     econ_platform_core.ExtensionList.LoadedExtensions += _LoadedExtensions
     econ_platform_core.ExtensionList.FailedExtensions += _FailedExtensions
     econ_platform_core.ExtensionList.DecoratedFailedExtensions += _DecoratedFailedExtensions
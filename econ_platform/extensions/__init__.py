@@ -29,72 +29,16 @@ limitations under the License.
 
 import os
 
-import econ_platform
 import econ_platform_core
-import importlib
+import econ_platform_core.extensions
+
 
 def load_extensions():
     """
-
-    NOTE: This code is a copy of the code in econ_platform_core.extensions.__init__.py.
-    I will need to figure out how to make this function not use the current directory.
-
-    TODO: Merge this function with the one in econ_platform_core.
-
-    Imports all *.py files in this directory (in alphabetical order).
-
-    Since the order of import will eventually matter, will need to add something to force a order of import operations.
-    For now, not am issue (can just use the alphabetical order rule to fix problems).
-
-    All errors are caught and largely ignored (other than listing the module that failed, and a text dump on the
-    console.
-
-    Returns [loaded_extensions, failed_extensions]
-
-    The operations on import of an extension:
-
-    (1) The import itself. If you wish, you can just put a script that is executed.
-    (2) If the module has a variable (hopefully a string) with the name 'extension_name', that is used as the extension
-    name for display, otherwise it is the name of the text file.
-    (3) If the module has a main() function, it is called.
-
-    Since logging is not yet initialised, things are dumped to console rather than logged. (If you really need logging
-    for debugging purposes, you could turn on logging in the extension.)
+    Load the extensions in this directory; the work is done by
+    econ_platform_core.extensions.load_extensions() (see there for details).
 
     :return: list
     """
-    # There might be some iteration tools in importlib, but no time to read documentation...
-    this_dir = os.path.dirname(__file__)
-    flist = os.listdir(this_dir)
-    # Do alphabetical order
-    flist.sort()
-    exclusion_list = ['__init__']
-    loaded_extensions = []
-    failed_extensions = []
-    decorated_fails = []
-    use_monkey_example = econ_platform_core.PlatformConfiguration['Options'].getboolean('UseMonkeyPatchExample')
-    if not use_monkey_example:
-        exclusion_list.append('monkey_patch_example')
-    for fname in flist:
-        fname = fname.lower()
-        if not fname.endswith('.py'):
-            continue
-        fname = fname[:-3]
-        if fname in exclusion_list:
-            continue
-        # Import it!
-        try:
-            mod = importlib.import_module('econ_platform.extensions.' + fname)
-            if hasattr(mod, 'extension_name'):
-                fname = str(mod.extension_name)
-            # Try running main()
-            if hasattr(mod, 'main'):
-                mod.main()
-            print('Extension {0} loaded.'.format(fname))
-            loaded_extensions.append(fname)
-        except Exception as ex:
-            print('Failure loading extension:', fname)
-            print(type(ex), str(ex))
-            failed_extensions.append(fname)
-            decorated_fails.append((fname, str(ex)))
-    return (loaded_extensions, failed_extensions, decorated_fails)
\ No newline at end of file
+    return econ_platform_core.extensions.load_extensions(package_name='econ_platform.extensions',
+                                                         directory=os.path.dirname(__file__))
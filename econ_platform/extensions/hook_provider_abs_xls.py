@@ -19,15 +19,16 @@ limitations under the License.
 """
 
 import econ_platform_core
-import econ_platform.providers.provider_abs_xls
 
 
 extension_name = 'Australian Bureau Statistics (XLS)'
+provider_names = ['ABS_XLS']
 
 def main():
     """
     Insert the provider into the platform list
     :return:
     """
+    import econ_platform.providers.provider_abs_xls
     obj = econ_platform.providers.provider_abs_xls.ProviderAbsXls()
     econ_platform_core.Providers.AddProvider(obj)
\ No newline at end of file
@@ -19,14 +19,15 @@ limitations under the License.
 
 import econ_platform_core
 import econ_platform
-import econ_platform.providers.provider_dbnomics
 
 extension_name = 'DB.nomics'
+provider_names = ['DBnomics']
 
 def main():
     """
     Insert the provider into the platform list
     :return:
     """
+    import econ_platform.providers.provider_dbnomics
     obj = econ_platform.providers.provider_dbnomics.ProviderDBnomics()
     econ_platform_core.Providers.AddProvider(obj)
\ No newline at end of file
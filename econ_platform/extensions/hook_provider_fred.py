@@ -18,15 +18,16 @@ limitations under the License.
 """
 
 import econ_platform_core
-import econ_platform.providers.provider_fred
 
 
 extension_name = 'FRED (St. Louis Fed)'
+provider_names = ['FRED']
 
 def main():
     """
     Insert the provider into the platform list
     :return:
     """
+    import econ_platform.providers.provider_fred
     obj = econ_platform.providers.provider_fred.ProviderFred()
     econ_platform_core.Providers.AddProvider(obj)
\ No newline at end of file
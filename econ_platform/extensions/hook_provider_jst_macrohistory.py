@@ -18,15 +18,16 @@ limitations under the License.
 """
 
 import econ_platform_core
-import econ_platform.providers.provider_jst_macrohistory
 
 
 extension_name = 'Jordà-Schularick-Taylor Macrohistory Database'
+provider_names = ['JST_Macrohistory']
 
 def main():
     """
     Insert the provider into the platform list
     :return:
     """
+    import econ_platform.providers.provider_jst_macrohistory
     obj = econ_platform.providers.provider_jst_macrohistory.ProviderJSTMacrohistory()
     econ_platform_core.Providers.AddProvider(obj)
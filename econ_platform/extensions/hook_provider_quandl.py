@@ -18,15 +18,16 @@ limitations under the License.
 """
 
 import econ_platform_core
-import econ_platform.providers.provider_quandl
 
 
 extension_name = 'Quandl'
+provider_names = ['Quandl']
 
 def main():
     """
     Insert the provider into the platform list
     :return:
     """
+    import econ_platform.providers.provider_quandl
     obj = econ_platform.providers.provider_quandl.ProviderQuandl()
     econ_platform_core.Providers.AddProvider(obj)
\ No newline at end of file
@@ -19,15 +19,16 @@ limitations under the License.
 """
 
 import econ_platform_core
-import econ_platform.providers.provider_rba_xls
 
 
 extension_name = 'Reserve Bank of Australia (XLS)'
+provider_names = ['RBA_XLS']
 
 def main():
     """
     Insert the provider into the platform list
     :return:
     """
+    import econ_platform.providers.provider_rba_xls
     obj = econ_platform.providers.provider_rba_xls.ProviderRbaXls()
     econ_platform_core.Providers.AddProvider(obj)
\ No newline at end of file
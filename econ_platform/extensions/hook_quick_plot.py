@@ -17,14 +17,41 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import importlib
+
 import econ_platform
-import econ_platform.analysis.quick_plot
+import econ_platform_core
+
 
 extension_name = 'quick_plot()'
 
+
+def lazy_quick_plot(ser, title=None):
+    """
+    Imports econ_platform.analysis.quick_plot (and so matplotlib) the first time a plot is made.
+
+    :param ser: pandas.Series
+    :param title: str
+    :return:
+    """
+    try:
+        mod = importlib.import_module('econ_platform.analysis.quick_plot')
+    except ImportError:
+        raise econ_platform_core.PlatformError(
+            'quick_plot() not initialised properly; probably matplotlib is not installed.') from None
+    econ_platform._quick_plot_stub = mod.quick_plot
+    mod.quick_plot(ser, title)
+
+
 def main():
     """
     Monkey patches econ_platform.analysis.quick_plot() over top of econ_platform._quick_plot_stub()
+
+    If [Options] LazyExtensions is True, the import waits until the first plot.
     :return:
     """
-    econ_platform._quick_plot_stub = econ_platform.analysis.quick_plot.quick_plot
+    if econ_platform_core.PlatformConfiguration['Options'].getboolean('LazyExtensions', fallback=False):
+        econ_platform._quick_plot_stub = lazy_quick_plot
+        return
+    mod = importlib.import_module('econ_platform.analysis.quick_plot')
+    econ_platform._quick_plot_stub = mod.quick_plot
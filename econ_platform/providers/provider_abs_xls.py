@@ -14,9 +14,12 @@ and this module would not not be needed.
 If I cared enough about Australian statistics, I would work on importing the whole spreadsheet. However, since I
 only want a few series, that is overkill.
 
-IN order to make this module somewhat user-friendly, should extract a manifest of all series in all spreadsheets,
-and then the user can browse the meta-data. I think this should be done in a "support table," a platform functionality
-that would also be very useful for CANSIM_CSV.
+Each workbook is scanned once to build an index of Series ID -> (sheet, column, series name), saved in the
+"index" subdirectory; the index for a workbook is rebuilt if its size or modification time changes. A fetch then
+only reads the one sheet that holds the series, and unknown Series ID's are answered from the index without
+opening any workbook. GetSeriesIndex() returns the combined index, which can be used to browse the series.
+If [P_ABSXLS] parse_processes is more than 1, the workbooks that need indexing are scanned in worker processes
+(as is done for RBA_XLS parsing).
 
 KNOWN ISSUE: The request from the provider uses a funky date format that R could not handle. However. subsequent
 fetches from the database worked fine.
@@ -56,11 +59,25 @@ import econ_platform_core.tickers as tickers
 import econ_platform_core.utils
 
 
+def _index_workbook_worker(fname):
+    """
+    ProcessPoolExecutor worker: index a workbook.
+
+    :param fname: str
+    :return: dict
+    """
+    return ProviderAbsXls().IndexWorkbook(fname)
+
+
 class ProviderAbsXls(econ_platform_core.ProviderWrapper):
     def __init__(self):
         super(ProviderAbsXls, self).__init__(name='ABS_XLS')
         # Directory is not configurable for now.
         self.Directory = os.path.join(os.path.dirname(__file__), 'abs_xls')
+        # Bump this if the index format changes.
+        self.IndexVersion = 1
+        # Number of worker processes for indexing workbooks; read from the config on first use.
+        self.ParseProcesses = None
 
 
     def fetch(self, series_meta):
@@ -89,31 +106,104 @@ class ProviderAbsXls(econ_platform_core.ProviderWrapper):
         :param series_code: str
         :return: pandas.DataFrame
         """
-        # Now for the ugly solution...
         flist = glob.glob(os.path.join(self.Directory, '*.xls'))
-        # Search until we find it; if we don't, puke
+        self.IndexWorkbooks(flist)
         for fname in flist:
-            # This query pattern will work on the "data" sheets; ignore the index.
-            try:
-                sheets = pandas.read_excel(fname, sheet_name=None, header=None, index_col=0)
-            except:
-                econ_platform_core.log_last_error()
-                log_warning('Problem with Excel {0}'.format(fname))
+            index = self.GetWorkbookIndex(fname)
+            if series_code not in index:
                 continue
-            for sheet_name in sheets:
-                sheet = sheets[sheet_name]
-                list_index = list(sheet.index)
-                # We ignore sheets that do not match the desired format.
-                if 'Series ID' not in list_index:
-                    continue
-                for c in sheet.columns:
-                    if sheet[c]["Series ID"] == series_code:
-                        list_index[0] = 'series_name'
-                        sheet.index = list_index
-                        return sheet[c]
+            sheet_name, column, _ = index[series_code]
+            sheet = pandas.read_excel(fname, sheet_name=sheet_name, header=None, index_col=0)
+            list_index = list(sheet.index)
+            list_index[0] = 'series_name'
+            sheet.index = list_index
+            return sheet[column]
         # Did not find it; puke.
         raise econ_platform_core.entity_and_errors.TickerNotFoundError('Could not find series ID = {0}'.format(series_code))
 
+    def GetWorkbookIndex(self, fname):
+        """
+        Get the Series ID index for a workbook: {series_id: (sheet_name, column, series_name)}. Uses the saved
+        index if the workbook has not changed; otherwise, the workbook is scanned and the index is saved.
 
+        :param fname: str
+        :return: dict
+        """
+        index = econ_platform_core.utils.read_sidecar_cache(fname, cache_subdir='index',
+                                                            cache_version=self.IndexVersion)
+        if index is not None:
+            return index
+        index = self.IndexWorkbook(fname)
+        if index is None:
+            # Could not read the workbook; try again next time.
+            return {}
+        econ_platform_core.utils.write_sidecar_cache(fname, index, cache_subdir='index',
+                                                     cache_version=self.IndexVersion)
+        return index
+
+    def IndexWorkbooks(self, flist):
+        """
+        If ParseProcesses > 1, index the workbooks that do not have a saved index in worker processes, and save
+        the indexes. Otherwise, does nothing: GetWorkbookIndex() indexes them one at a time, as needed.
 
+        :param flist: list
+        :return:
+        """
+        if self.ParseProcesses is None:
+            self.ParseProcesses = econ_platform_core.utils.get_parse_processes(self.ProviderCode)
+        if self.ParseProcesses <= 1:
+            return
+        to_index = [fname for fname in flist if econ_platform_core.utils.read_sidecar_cache(
+            fname, cache_subdir='index', cache_version=self.IndexVersion) is None]
+        if len(to_index) < 2:
+            return
+        log('Indexing %i workbooks with %i processes', len(to_index), min(self.ParseProcesses, len(to_index)))
+        with econ_platform_core.utils.create_process_pool(min(self.ParseProcesses, len(to_index))) as pool:
+            indexes = list(pool.map(_index_workbook_worker, to_index))
+        for fname, index in zip(to_index, indexes):
+            if index is not None:
+                econ_platform_core.utils.write_sidecar_cache(fname, index, cache_subdir='index',
+                                                             cache_version=self.IndexVersion)
+
+    def IndexWorkbook(self, fname):
+        """
+        Scan all the data sheets in a workbook for Series ID's. If a Series ID appears more than once, the first
+        one is used (which is what the old search did).
 
+        :param fname: str
+        :return: dict
+        """
+        log('Indexing %s', fname)
+        try:
+            sheets = pandas.read_excel(fname, sheet_name=None, header=None, index_col=0)
+        except:
+            econ_platform_core.log_last_error()
+            log_warning('Problem with Excel {0}'.format(fname))
+            return None
+        out = {}
+        for sheet_name in sheets:
+            sheet = sheets[sheet_name]
+            # We ignore sheets that do not match the desired format.
+            if 'Series ID' not in list(sheet.index):
+                continue
+            for c in sheet.columns:
+                series_id = sheet[c]['Series ID']
+                if type(series_id) is not str or series_id in out:
+                    continue
+                out[series_id] = (sheet_name, c, str(sheet[c].iloc[0]))
+        return out
+
+    def GetSeriesIndex(self):
+        """
+        Get the combined index for all workbooks: {series_id: (file name, sheet_name, series_name)}.
+
+        :return: dict
+        """
+        out = {}
+        flist = glob.glob(os.path.join(self.Directory, '*.xls'))
+        self.IndexWorkbooks(flist)
+        for fname in flist:
+            for series_id, (sheet_name, _, series_name) in self.GetWorkbookIndex(fname).items():
+                if series_id not in out:
+                    out[series_id] = (os.path.basename(fname), sheet_name, series_name)
+        return out
@@ -33,15 +33,18 @@ import econ_platform_core.entity_and_errors
 class ProviderFred(econ_platform_core.ProviderWrapper):
     def __init__(self):
         super(ProviderFred, self).__init__(name='FRED')
+        self.SupportsIncremental = True
 
-
-    def fetch(self, series_meta):
+    def fetch(self, series_meta, start_date=None):
         """
         Do the fetch; will puke if do not have an API key in the config
         TODO: Look to see if FRED_API_KEY environment variable is set...
 
         Can only support single series queries...
+
+        If start_date is given, only ask for observations from that date on (observation_start).
         :param series_meta: str
+        :param start_date: datetime.date
         :return: list
         """
         query_ticker = series_meta.ticker_query
@@ -50,7 +53,10 @@ class ProviderFred(econ_platform_core.ProviderWrapper):
             # KeyError - ha, ha, I kill myself...
             raise KeyError('Error: need to set the FRED API key in the config.txt; available from St. Louis Fed.')
         fred = fredapi.Fred(api_key=api_key)
-        data = fred.get_series(str(query_ticker))
+        if start_date is None:
+            data = fred.get_series(str(query_ticker))
+        else:
+            data = fred.get_series(str(query_ticker), observation_start=start_date)
         data.name = str(series_meta.ticker_full)
         if not series_meta.Exists:
             return data, self.GetMeta(series_meta)
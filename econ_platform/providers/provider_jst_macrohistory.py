@@ -6,6 +6,9 @@ JORDÀ-SCHULARICK-TAYLOR MACROHISTORY DATABASE
 Note: these data are in an Excel spreadsheet (XLSX); the user needs to download and place it in the appropriate
 directory (based on config settings). The code assumes that there is only one spreadsheet in the directory.
 
+The workbook is only read when it changes: the parsed data are saved in the "cache" subdirectory, keyed by the
+size and modification time of the file.
+
 Description from the website: http://www.macrohistory.net/data/
 
 The Jordà-Schularick-Taylor Macrohistory Database is the result of an extensive data collection effort over several
@@ -86,6 +89,10 @@ class ProviderJSTMacrohistory(econ_platform_core.ProviderWrapper):
         super().__init__(name='JST_Macrohistory')
         self.WebPage = 'http://www.macrohistory.net/data/#DownloadData'
         self.Directory = None
+        # (signature, ParseWorkbook() output) for the last workbook read.
+        self.Parsed = None
+        # Bump this if the ParseWorkbook() output changes.
+        self.CacheVersion = 1
 
 
     def fetch(self, series_meta):
@@ -101,38 +108,25 @@ class ProviderJSTMacrohistory(econ_platform_core.ProviderWrapper):
             raise econ_platform_core.entity_and_errors.PlatformError('More than one XLSX file in {0}: cannot tell which to use'.format(
                 self.Directory))
         fname = flist[0]
-        log_debug('Reading %s', fname)
-        data_sheet = pandas.read_excel(fname, sheet_name='Data', header=0)
-        description_sheet = pandas.read_excel(fname, sheet_name='Variable description', index_col=0, header=None)
-        # All data is in one giant honkin' DataFrame, with one row per country per year.
-        # To generate time series, need to select one country at a time.
-        country_list = set(data_sheet['country'])
+        parsed = self.GetParsedWorkbook(fname)
         self.TableWasFetched = True
         self.TableMeta = {}
         self.TableSeries = {}
-        for country in country_list:
-            df = data_sheet.loc[data_sheet['country'] == country]
-            iso_code = df['iso'][df.index[0]]
-            # Now, blast through the data types.
-            dates = df['year']
-            cal_dates = [datetime.date(x, 1, 1) for x in dates]
-            exclusions = ('year', 'iso', 'country', 'ifs')
-            for c in df.columns:
-                if c in exclusions:
-                    continue
-                ser = pandas.Series(df[c])
-                ser.index = cal_dates
-                meta = econ_platform_core.series_metadata.SeriesMetadata()
-                meta.series_provider_code = econ_platform_core.tickers.TickerProviderCode(self.ProviderCode)
-                meta.ticker_query = econ_platform_core.tickers.TickerFetch('{0} {1}'.format(iso_code, c))
-                meta.ticker_full = econ_platform_core.tickers.create_ticker_full(meta.series_provider_code,
-                                                                                 meta.ticker_query)
-                meta.series_name = '{0} {1}'.format(country, description_sheet.at[c,1])
-                meta.series_description = '{0} from Jordà-Schularick-Taylor Macrohistory Database'.format(
-                    meta.series_name)
-                full_str = str(meta.ticker_full)
-                self.TableSeries[full_str] = ser
-                self.TableMeta[full_str] = meta
+        cal_dates = pandas.Index([datetime.date(int(x), 1, 1) for x in parsed['years']])
+        values = parsed['values']
+        for pos, (c, iso_code) in enumerate(parsed['columns']):
+            ser = pandas.Series(values[:, pos], index=cal_dates)
+            meta = econ_platform_core.series_metadata.SeriesMetadata()
+            meta.series_provider_code = econ_platform_core.tickers.TickerProviderCode(self.ProviderCode)
+            meta.ticker_query = econ_platform_core.tickers.TickerFetch('{0} {1}'.format(iso_code, c))
+            meta.ticker_full = econ_platform_core.tickers.create_ticker_full(meta.series_provider_code,
+                                                                             meta.ticker_query)
+            meta.series_name = '{0} {1}'.format(parsed['countries'][iso_code], parsed['descriptions'][c])
+            meta.series_description = '{0} from Jordà-Schularick-Taylor Macrohistory Database'.format(
+                meta.series_name)
+            full_str = str(meta.ticker_full)
+            self.TableSeries[full_str] = ser
+            self.TableMeta[full_str] = meta
         try:
             ser = self.TableSeries[str(series_meta.ticker_full)]
             meta = self.TableMeta[str(series_meta.ticker_full)]
@@ -140,5 +134,57 @@ class ProviderJSTMacrohistory(econ_platform_core.ProviderWrapper):
         except KeyError:
             raise econ_platform_core.entity_and_errors.TickerNotFoundError('{0} not found'.format(str(series_meta.ticker_full)))
 
-
-
+    def GetParsedWorkbook(self, fname):
+        """
+        Get the output of ParseWorkbook(), from memory or from the "cache" subdirectory if the workbook has
+        not changed (same size and modification time).
+
+        :param fname: str
+        :return: dict
+        """
+        signature = (fname, econ_platform_core.utils.get_file_signature(fname))
+        if self.Parsed is not None and self.Parsed[0] == signature:
+            return self.Parsed[1]
+        parsed = econ_platform_core.utils.read_sidecar_cache(fname, cache_version=self.CacheVersion)
+        if parsed is None:
+            parsed = self.ParseWorkbook(fname)
+            econ_platform_core.utils.write_sidecar_cache(fname, parsed, cache_version=self.CacheVersion)
+        else:
+            log_debug('Using cached parse of %s', fname)
+        self.Parsed = (signature, parsed)
+        return parsed
+
+    @staticmethod
+    def ParseWorkbook(fname):
+        """
+        Read the workbook, and pivot the data sheet so that there is one column per (variable, country).
+
+        All data is in one giant honkin' DataFrame, with one row per country per year. Returns a dict:
+        'years' (array), 'columns' (list of (variable, iso code)), 'values' (2-D array, years x columns),
+        'countries' (iso code -> name) and 'descriptions' (variable -> description).
+
+        Note that every series has all the years in the data sheet (missing values where a country has no row for
+        that year), not just the years for its country. If a country has more than one row for a year, the last
+        row is used.
+
+        :param fname: str
+        :return: dict
+        """
+        log_debug('Reading %s', fname)
+        data_sheet = pandas.read_excel(fname, sheet_name='Data', header=0)
+        description_sheet = pandas.read_excel(fname, sheet_name='Variable description', index_col=0, header=None)
+        exclusions = ('year', 'iso', 'country', 'ifs')
+        variables = [c for c in data_sheet.columns if c not in exclusions]
+        # pivot() does not accept duplicate (year, iso) rows; the last one wins, as it did with the old row loop.
+        data_sheet = data_sheet.drop_duplicates(['year', 'iso'], keep='last')
+        wide = data_sheet.pivot(index='year', columns='iso', values=variables).sort_index()
+        try:
+            values = wide.to_numpy(dtype=float)
+        except (TypeError, ValueError):
+            values = wide.to_numpy()
+        countries = data_sheet.drop_duplicates('iso').set_index('iso')['country']
+        return {'years': wide.index.to_numpy(),
+                'columns': [(str(c), str(iso)) for c, iso in wide.columns],
+                'values': values,
+                'countries': countries.to_dict(),
+                'descriptions': dict((c, description_sheet.at[c, 1]) for c in variables)}
@@ -7,6 +7,15 @@ RBA_XLS derives from this class, and it should be a small refactoring for ABS_XL
 
 Later on, could make more flexible if needed.
 
+Parsing the spreadsheets is slow, and BuildTable() looks at every xls in the directory for each fetch. The parsed
+(and patched) series for each workbook are saved in the "cache" subdirectory, and are re-used as long as the
+workbook has the same size and modification time. Bump WorkbookCacheVersion if the parsing code changes.
+
+Excel parsing is CPU-bound; if ParseProcesses > 1, workbooks that are not in the cache are parsed in a
+ProcessPoolExecutor. ParseProcesses is read from parse_processes in the provider's config section
+([P_{provider code}]; see econ_platform_core.utils.get_parse_processes()). Workers send back compact payloads (see PackWorkbook()), and the combine_first() merges of
+tickers that appear in more than one workbook are done in the main process, in the same order as before.
+
 NOTE: Without the "xlrd" module, the pandas.read_excel() call will fail.
 
 This dependency on xlrd (which was not installed when I did a pip install on pandas) means that this module is not
@@ -15,6 +24,7 @@ inside econ_platform_core, even though there are no visible problematic imports.
 
 
 import os
+import numpy
 import pandas
 import glob
 
@@ -29,9 +39,24 @@ import econ_platform_core.utils
 class SkipColumn(Exception):
     pass
 
+
+def _parse_workbook_worker(provider_class, provider_code, fname):
+    """
+    ProcessPoolExecutor worker: parse a workbook with a fresh provider object.
+
+    :param provider_class: class
+    :param provider_code: str
+    :param fname: str
+    :return: list
+    """
+    obj = provider_class()
+    obj.ProviderCode = provider_code
+    return obj.PackWorkbook(obj.ParseWorkbook(fname))
+
+
 class ProviderXlsGrab(econ_platform_core.ProviderWrapper):
-    def __init__(self, name='XLS_GRAB'):
-        super(ProviderXlsGrab, self).__init__(name=name)
+    def __init__(self, name='XLS_GRAB', default_code=None):
+        super(ProviderXlsGrab, self).__init__(name=name, default_code=default_code)
         # Look up config only when fetch is called, since configuration parsing may
         # not yet have happened.
         self.Directory = None
@@ -39,10 +64,21 @@ class ProviderXlsGrab(econ_platform_core.ProviderWrapper):
         self.TickerLabels = tuple()
         self.SeriesNameLabel = None
         self.SeriesDescriptionLabel = None
+        self.UseWorkbookCache = True
+        self.WorkbookCacheVersion = 2
+        # Number of worker processes for parsing workbooks; 1 = parse in this process.
+        self.ParseProcesses = 1
 
     def SetDirectory(self):
         raise NotImplementedError()
 
+    def SetParseProcesses(self):
+        """
+        Read ParseProcesses from the provider's config section.
+        :return:
+        """
+        self.ParseProcesses = econ_platform_core.utils.get_parse_processes(self.ProviderCode)
+
 
     def fetch(self, series_meta):
         """
@@ -54,6 +90,7 @@ class ProviderXlsGrab(econ_platform_core.ProviderWrapper):
             raise NotImplementedError('Only "Australian" XLS format supported')
         if self.Directory is None:
             self.SetDirectory()
+            self.SetParseProcesses()
         self.TableWasFetched = True
         self.TableMeta = {}
         self.TableSeries = {}
@@ -81,39 +118,136 @@ class ProviderXlsGrab(econ_platform_core.ProviderWrapper):
         """
         # Now for the ugly solution...
         flist = glob.glob(os.path.join(self.Directory, '*.xls'))
-        # Search until we find it; if we don't, puke
-        out = []
+        payloads = {}
+        to_parse = []
         for fname in flist:
-            log_debug('Reading %s', fname)
-            # This query pattern will work on the "data" sheets; ignore the index.
-            try:
-                sheets = pandas.read_excel(fname, sheet_name=None, header=None, index_col=0)
-            except:
-                econ_platform_core.log_last_error()
-                log_warning('Problem with Excel {0}'.format(fname))
+            payload = None
+            if self.UseWorkbookCache:
+                payload = econ_platform_core.utils.read_sidecar_cache(fname, cache_version=self.WorkbookCacheVersion)
+            if payload is None:
+                to_parse.append(fname)
+            else:
+                log_debug('Using cached parse of %s', fname)
+                payloads[fname] = payload
+        payloads.update(self.ParseWorkbooks(to_parse))
+        for fname in flist:
+            if payloads[fname] is None:
                 continue
-            for sheet_name in sheets:
-                sheet = sheets[sheet_name]
-                sheet = self.PatchSheet(sheet)
-                list_index = list(sheet.index)
-                # We ignore sheets that do not match the desired format.
-                for targ_field in self.TickerLabels:
-                    if targ_field not in list_index:
+            for ser, meta in self.UnpackWorkbook(payloads[fname]):
+                full_ticker = str(meta.ticker_full)
+                if full_ticker in self.TableSeries:
+                    ser = ser.combine_first(self.TableSeries[full_ticker])
+                    self.TableSeries[full_ticker] = ser
+                else:
+                    self.TableSeries[full_ticker] = ser
+                    self.TableMeta[full_ticker] = meta
+
+    def ParseWorkbooks(self, flist):
+        """
+        Parse a list of workbooks (in worker processes if ParseProcesses > 1), and save the results to the cache.
+
+        Returns {file name: payload}; the payload is None if the workbook could not be read.
+
+        :param flist: list
+        :return: dict
+        """
+        out = {}
+        if self.ParseProcesses > 1 and len(flist) > 1:
+            log('Parsing %i workbooks with %i processes', len(flist), min(self.ParseProcesses, len(flist)))
+            with econ_platform_core.utils.create_process_pool(min(self.ParseProcesses, len(flist))) as pool:
+                futures = [(fname, pool.submit(_parse_workbook_worker, self.__class__, self.ProviderCode, fname))
+                           for fname in flist]
+                for fname, future in futures:
+                    out[fname] = future.result()
+        else:
+            for fname in flist:
+                out[fname] = self.PackWorkbook(self.ParseWorkbook(fname))
+        if self.UseWorkbookCache:
+            for fname in out:
+                if out[fname] is not None:
+                    econ_platform_core.utils.write_sidecar_cache(fname, out[fname],
+                                                                 cache_version=self.WorkbookCacheVersion)
+        return out
+
+    @staticmethod
+    def PackWorkbook(entries):
+        """
+        Convert the output of ParseWorkbook() to a compact form for the cache and for sending between processes:
+        a list of (ticker, dates array, values array, metadata dict).
+
+        :param entries: list
+        :return: list
+        """
+        if entries is None:
+            return None
+        out = []
+        for ser, meta in entries:
+            try:
+                dates = pandas.DatetimeIndex(ser.index).values
+            except (TypeError, ValueError):
+                dates = numpy.asarray(list(ser.index), dtype=object)
+            try:
+                values = ser.values.astype(float)
+            except (TypeError, ValueError):
+                values = numpy.asarray(ser.values, dtype=object)
+            info = {'ticker_query': str(meta.ticker_query), 'series_name': meta.series_name,
+                    'series_description': meta.series_description}
+            out.append((str(meta.ticker_full), dates, values, info))
+        return out
+
+    def UnpackWorkbook(self, payload):
+        """
+        Rebuild the (series, meta) pairs from PackWorkbook() output.
+
+        :param payload: list
+        :return: list
+        """
+        out = []
+        for full_ticker, dates, values, info in payload:
+            meta = econ_platform_core.series_metadata.SeriesMetadata()
+            meta.ticker_full = tickers.create_ticker_full(self.ProviderCode, info['ticker_query'])
+            meta.series_provider_code = tickers.TickerProviderCode(self.ProviderCode)
+            meta.ticker_query = tickers.TickerFetch(info['ticker_query'])
+            meta.series_name = info['series_name']
+            meta.series_description = info['series_description']
+            ser = pandas.Series(values, index=dates)
+            ser.name = full_ticker
+            out.append((ser, meta))
+        return out
+
+    def ParseWorkbook(self, fname):
+        """
+        Read all the data sheets in a workbook. Returns a list of (series, meta) pairs, or None if the
+        workbook could not be read.
+
+        :param fname: str
+        :return: list
+        """
+        log_debug('Reading %s', fname)
+        # This query pattern will work on the "data" sheets; ignore the index.
+        try:
+            sheets = pandas.read_excel(fname, sheet_name=None, header=None, index_col=0)
+        except:
+            econ_platform_core.log_last_error()
+            log_warning('Problem with Excel {0}'.format(fname))
+            return None
+        out = []
+        for sheet_name in sheets:
+            sheet = sheets[sheet_name]
+            sheet = self.PatchSheet(sheet)
+            list_index = list(sheet.index)
+            # We ignore sheets that do not match the desired format.
+            for targ_field in self.TickerLabels:
+                if targ_field not in list_index:
+                    continue
+                list_index = self.FixIndex(list_index)
+                sheet.index = list_index
+                for c in sheet.columns:
+                    try:
+                        out.append(self.ConvertDFtoSeries(sheet[c]))
+                    except SkipColumn:
                         continue
-                    list_index = self.FixIndex(list_index)
-                    sheet.index = list_index
-                    for c in sheet.columns:
-                        try:
-                            [ser, meta] = self.ConvertDFtoSeries(sheet[c])
-                        except SkipColumn:
-                            continue
-                        full_ticker = str(meta.ticker_full)
-                        if full_ticker in self.TableSeries:
-                            ser = ser.combine_first(self.TableSeries[full_ticker])
-                            self.TableSeries[full_ticker] = ser
-                        else:
-                            self.TableSeries[full_ticker] = ser
-                            self.TableMeta[full_ticker] = meta
+        return out
 
 
     def ConvertDFtoSeries(self, df):
@@ -47,6 +47,7 @@ limitations under the License.
 
 
 import pandas
+import threading
 import traceback
 import webbrowser
 import warnings
@@ -62,6 +63,7 @@ import econ_platform_core.extensions
 
 from econ_platform_core.tickers import TickerFull, TickerDataType, TickerFetch, TickerLocal, TickerProviderCode
 from econ_platform_core.series_metadata import SeriesMetadata
+from econ_platform_core.series_cache import SeriesCache
 
 
 import econ_platform_core.tickers
@@ -69,6 +71,8 @@ import econ_platform_core.tickers
 # Get the logging information. Users can either programmatically change the LogInfo.LogDirectory or
 # use a config file before calling start_log()
 from econ_platform_core.update_protocols import UpdateProtocolManager, NoUpdateProtocol
+from econ_platform_core.refresh_engine import RefreshEngine
+from econ_platform_core.async_fetch import afetch, afetch_many
 
 LogInfo = utils.PlatformLogger()
 
@@ -86,6 +90,8 @@ def start_log(fname=None):  # pragma: nocover
 
 PlatformConfiguration = econ_platform_core.configuration.ConfigParserWrapper()
 ExtensionList = econ_platform_core.extensions.ExtensionManager()
+# In-memory series cache used by DatabaseManager.Retrieve(). Turned on by init_package().
+Cache = SeriesCache()
 
 
 class DatabaseManager(PlatformEntity):
@@ -94,6 +100,9 @@ class DatabaseManager(PlatformEntity):
 
     Note: Only support full series replacement for now.
 
+    Retrieve(), Write(), Delete() and SetLastUpdate() handle the series cache (econ_platform_core.Cache);
+    subclasses implement the work in _Retrieve(), _Write(), _Delete() and _SetLastUpdate().
+
     SetsLastUpdateAutomatically: Does the database update the last_update/last_refresh fields automatically on
     a write> If False, the UpdateProtocol will (supposed to...) call SetLastUpdate() after a Write()
     """
@@ -155,8 +164,23 @@ class DatabaseManager(PlatformEntity):
         """
         raise NotImplementedError()
 
-    def Retrieve(self, series_meta):  # pragma: nocover
+    def Retrieve(self, series_meta):
+        """
+        Retrieve a series; comes from the cache if possible.
+
+        :param series_meta: SeriesMetadata
+        :return: pandas.Series
         """
+        ser = Cache.Get(self.Code, series_meta.ticker_full)
+        if ser is None:
+            generation = Cache.GetGeneration(self.Code, series_meta.ticker_full)
+            ser = self._Retrieve(series_meta)
+            Cache.Put(self.Code, series_meta.ticker_full, ser, generation)
+        return ser
+
+    def _Retrieve(self, series_meta):  # pragma: nocover
+        """
+        Implementation of Retrieve().
 
         :param series_meta: SeriesMetadata
         :return: pandas.Series
@@ -194,6 +218,8 @@ class DatabaseManager(PlatformEntity):
         Set the timestamp of the last refresh. Note that this will be called if an external provider is polled
         and there is no new data.
 
+        Subclasses implement _SetLastRefresh().
+
         If time_stamp is None, the manager should set to the current time.
 
         This needs to be implemented by all database managers. The simplest manager (TEXT) will just touch the file
@@ -203,6 +229,16 @@ class DatabaseManager(PlatformEntity):
         during the write operation. It is left to the manager, as it is likely that it will be more efficient to set the
         status during the write operation.
 
+        :param ticker_full: TickerFull
+        :param time_stamp: datatime.datetime
+        :return:
+        """
+        self._SetLastRefresh(ticker_full, time_stamp)
+
+    def _SetLastRefresh(self, ticker_full, time_stamp=None):  # pragma: nocover
+        """
+        Implementation of SetLastRefresh().
+
         :param ticker_full: TickerFull
         :param time_stamp: datatime.datetime
         :return:
@@ -214,6 +250,19 @@ class DatabaseManager(PlatformEntity):
         Sets the last_update *and* last_refresh fields. If time_stamp is None, uses current time.
 
         Called after a Write() by the UpdateProtocol, unless self.SetsLastUpdateAutomatically is True.
+
+        Since the series was updated, it is dropped from the cache.
+        :param ticker_full: TickerFull
+        :param time_stamp: datatime.date
+        :return:
+        """
+        Cache.Invalidate(self.Code, ticker_full)
+        self._SetLastUpdate(ticker_full, time_stamp)
+
+    def _SetLastUpdate(self, ticker_full, time_stamp=None):  # pragma: nocover
+        """
+        Implementation of SetLastUpdate().
+
         :param ticker_full: TickerFull
         :param time_stamp: datatime.date
         :return:
@@ -221,6 +270,77 @@ class DatabaseManager(PlatformEntity):
         raise NotImplementedError()
 
 
+    def GetAllValidSeriesTickers(self):  # pragma: nocover
+        """
+        Returns a list of all the full tickers on the database. Used for database transfers, and by
+        refresh_all().
+
+        :return: list
+        """
+        raise NotImplementedError()
+
+    def GetMetaMany(self, ticker_list):
+        """
+        Get the metadata for a list of tickers. Returns a list of SeriesMetadata, in the same order
+        as ticker_list.
+
+        Used by fetch_many(). Databases that can resolve a set of tickers in one query should
+        override _GetMetaMany().
+
+        :param ticker_list: list
+        :return: list
+        """
+        return self._GetMetaMany(ticker_list)
+
+    def _GetMetaMany(self, ticker_list):
+        """
+        Default implementation: one GetMeta() call per ticker.
+
+        :param ticker_list: list
+        :return: list
+        """
+        return [self.GetMeta(x) for x in ticker_list]
+
+    def RetrieveMany(self, meta_list):
+        """
+        Retrieve a group of series that exist on the database. Series in the cache are not retrieved
+        from the database.
+
+        Returns a dict, keyed by str(ticker_full).
+
+        :param meta_list: list
+        :return: dict
+        """
+        out = {}
+        missing = []
+        for meta in meta_list:
+            ser = Cache.Get(self.Code, meta.ticker_full)
+            if ser is None:
+                missing.append(meta)
+            else:
+                out[str(meta.ticker_full)] = ser
+        if len(missing) > 0:
+            generations = [Cache.GetGeneration(self.Code, meta.ticker_full) for meta in missing]
+            retrieved = self._RetrieveMany(missing)
+            for meta, generation in zip(missing, generations):
+                ser = retrieved[str(meta.ticker_full)]
+                Cache.Put(self.Code, meta.ticker_full, ser, generation)
+                out[str(meta.ticker_full)] = ser
+        return out
+
+    def _RetrieveMany(self, meta_list):
+        """
+        Default implementation: one _Retrieve() call per series. Override if the database can
+        pull all the series in a single query.
+
+        :param meta_list: list
+        :return: dict
+        """
+        out = {}
+        for meta in meta_list:
+            out[str(meta.ticker_full)] = self._Retrieve(meta)
+        return out
+
     def RetrieveWithMeta(self, full_ticker):
         """
         Retrieve both the meta data and the series. Have a single method in case there is
@@ -237,16 +357,42 @@ class DatabaseManager(PlatformEntity):
         ser = self.Retrieve(meta)
         return ser, meta
 
-    def Delete(self, series_meta):  # pragma: nocover
+    def Delete(self, series_meta, warn_if_non_existent=True):
         """
         Delete a series.
         :param series_meta: SeriesMetadata
+        :param warn_if_non_existent: bool
+        :return:
+        """
+        Cache.Invalidate(self.Code, series_meta.ticker_full)
+        self._Delete(series_meta, warn_if_non_existent)
+
+    def _Delete(self, series_meta, warn_if_non_existent=True):  # pragma: nocover
+        """
+        Implementation of Delete()
+        :param series_meta: SeriesMetadata
+        :param warn_if_non_existent: bool
         :return:
         """
         raise NotImplementedError()
 
-    def Write(self, ser, series_meta, overwrite=True):  # pragma: nocover
+    def Write(self, ser, series_meta, overwrite=True):
+        """
+        Write a series to the database. (The cached version is thrown away.)
+
+        :param ser: pandas.Series
+        :param series_meta: SeriesMetadata
+        :param overwrite: bool
+        :return:
+        """
+        try:
+            self._Write(ser, series_meta, overwrite)
+        finally:
+            Cache.Invalidate(self.Code, series_meta.ticker_full)
+
+    def _Write(self, ser, series_meta, overwrite=True):  # pragma: nocover
         """
+        Implementation of Write()
 
         :param ser: pandas.Series
         :param series_meta: SeriesMetadata
@@ -255,6 +401,35 @@ class DatabaseManager(PlatformEntity):
         """
         raise NotImplementedError()
 
+    def WriteMany(self, series_list):
+        """
+        Write a group of series, and set their last update time (if the database does not do so
+        automatically). Used to write tables from providers that set TableWasFetched.
+
+        Databases that can do this in a single transaction should override _WriteMany().
+
+        :param series_list: iterable of (pandas.Series, SeriesMetadata)
+        :return:
+        """
+        series_list = list(series_list)
+        try:
+            self._WriteMany(series_list)
+        finally:
+            for _, series_meta in series_list:
+                Cache.Invalidate(self.Code, series_meta.ticker_full)
+
+    def _WriteMany(self, series_list):
+        """
+        Default implementation: one _Write() (and _SetLastUpdate()) call per series.
+
+        :param series_list: list
+        :return:
+        """
+        for ser, series_meta in series_list:
+            self._Write(ser, series_meta)
+            if not self.SetsLastUpdateAutomatically:
+                self._SetLastUpdate(series_meta.ticker_full)
+
 
 class DatabaseList(PlatformEntity):
     """
@@ -264,6 +439,9 @@ class DatabaseList(PlatformEntity):
     def __init__(self):
         super().__init__()
         self.DatabaseDict = {}
+        # code -> (name, loader) for databases that are created on first use.
+        self.LazyDatabases = {}
+        self.LazyLock = threading.RLock()
 
     def Initialise(self):
         pass
@@ -282,6 +460,20 @@ class DatabaseList(PlatformEntity):
             code = PlatformConfiguration['DatabaseList'][wrapper.Name]
         wrapper.Code = code
         self.DatabaseDict[wrapper.Code] = wrapper
+        self.LazyDatabases.pop(wrapper.Code, None)
+
+    def AddLazyDatabase(self, code, name, loader):
+        """
+        Register a database that is only created the first time its code is used. The loader is a function
+        (normally an extension main()) that calls AddDatabase().
+
+        :param code: str
+        :param name: str
+        :param loader: function
+        :return:
+        """
+        self.DatabaseDict.pop(code, None)
+        self.LazyDatabases[code] = (name, loader)
 
     def __getitem__(self, item):
         """
@@ -295,6 +487,13 @@ class DatabaseList(PlatformEntity):
         if item == 'SQL':
             # If the DEFAULT is SQL, will be re-mapped twice!
             item = PlatformConfiguration['Database']['SQL']
+        if item not in self.DatabaseDict and item in self.LazyDatabases:
+            with self.LazyLock:
+                if item in self.LazyDatabases:
+                    # If main() fails, the code stays registered, and the loader raises the error again.
+                    _, loader = self.LazyDatabases[item]
+                    loader()
+                    self.LazyDatabases.pop(item, None)
         return self.DatabaseDict[item]
 
     def TransferSeries(self, full_ticker, source, dest):
@@ -303,6 +502,8 @@ class DatabaseList(PlatformEntity):
 
         Useful for migrations and testing.
 
+        The destination Write() takes care of dropping the series from the cache.
+
         :param full_ticker: str
         :param source: str
         :param dest: str
@@ -343,6 +544,10 @@ class ProviderWrapper(PlatformEntity):
         self.TableSeries = {}
         self.TableMeta = {}
         self.WebPage = ''
+        # Can fetch() be passed a start_date, and return only the observations from that date on?
+        self.SupportsIncremental = False
+        # Can refresh() run fetch() in a worker thread? Needs to be False if fetch() goes back to the database.
+        self.RefreshInParallel = True
         if not name == 'VirtualObject':
             try:
                 self.ProviderCode = PlatformConfiguration['ProviderList'][name]
@@ -353,11 +558,16 @@ class ProviderWrapper(PlatformEntity):
                 else:
                     self.ProviderCode = default_code
 
-    def fetch(self, series_meta):  # pragma: nocover
+    def fetch(self, series_meta, start_date=None):  # pragma: nocover
         """
         Fetch a series from a provider.
 
+        start_date is only passed in if SupportsIncremental is True. If it is not None, the provider can
+        return just the observations from that date on (the update protocol splices them onto the stored
+        series). Providers that do not support it can keep the single-argument signature.
+
         :param series_meta: SeriesMetadata
+        :param start_date: datetime.date
         :return: pandas.Series
         """
         raise NotImplementedError
@@ -392,6 +602,9 @@ class ProviderList(PlatformEntity):
     def __init__(self):
         super().__init__()
         self.ProviderDict = {}
+        # code -> (name, loader) for providers that are created on first use.
+        self.LazyProviders = {}
+        self.LazyLock = threading.RLock()
         self.EchoAccess = False
         self.UserProvider = None
         self.PushOnlyProvider = None
@@ -406,6 +619,7 @@ class ProviderList(PlatformEntity):
          :return:
          """
         self.ProviderDict[obj.ProviderCode] = obj
+        self.LazyProviders.pop(obj.ProviderCode, None)
         if obj.Name == 'User':
             # Tuck the "User" provider into a known location.
             self.UserProvider = obj
@@ -419,7 +633,29 @@ class ProviderList(PlatformEntity):
         :return: ProviderWrapper
         """
         # Need to convert to string since we are likely passed a ticker.
-        return self.ProviderDict[str(item)]
+        item = str(item)
+        if item not in self.ProviderDict and item in self.LazyProviders:
+            # The lock is so that refresh() threads do not create the provider twice.
+            with self.LazyLock:
+                if item in self.LazyProviders:
+                    # If main() fails, the code stays registered, and the loader raises the error again.
+                    _, loader = self.LazyProviders[item]
+                    loader()
+                    self.LazyProviders.pop(item, None)
+        return self.ProviderDict[item]
+
+    def AddLazyProvider(self, code, name, loader):
+        """
+        Register a provider that is only created the first time its code is used. The loader is a function
+        (normally an extension main()) that calls AddProvider().
+
+        :param code: str
+        :param name: str
+        :param loader: function
+        :return:
+        """
+        self.ProviderDict.pop(code, None)
+        self.LazyProviders[code] = (name, loader)
 
 
 Providers = ProviderList()
@@ -427,11 +663,69 @@ Providers = ProviderList()
 UpdateProtocolList = UpdateProtocolManager()
 
 
+def _get_provider(provider_code):
+    """
+    Look up the provider, with a friendlier error message.
+
+    :param provider_code: TickerProviderCode
+    :return: ProviderWrapper
+    """
+    # noinspection PyPep8
+    try:
+        return Providers[provider_code]
+    except KeyError:
+        raise KeyError('Unknown provider_code: ' + str(provider_code)) from None
+
+
+# Stack of DependencyRecorder objects (per thread).
+_DependencyStack = threading.local()
+
+
+class DependencyRecorder(PlatformEntity):
+    """
+    Records the series that are read by fetch()/fetch_many() while it is active. Used as a context manager:
+
+    with DependencyRecorder() as recorder:
+        ser = my_function()
+
+    recorder.Dependencies is a dict: (database code, full ticker) -> pandas.Series. Recorders can be nested; only
+    the innermost one sees the series (so a user series that is built from another user series depends on that
+    series, and not on its inputs).
+    """
+    def __init__(self):
+        super().__init__()
+        self.Dependencies = {}
+
+    def __enter__(self):
+        if not hasattr(_DependencyStack, 'Stack'):
+            _DependencyStack.Stack = []
+        _DependencyStack.Stack.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _DependencyStack.Stack.remove(self)
+        return False
+
+
+def _record_dependency(database_code, ticker_full, ser):
+    """
+    Tell the active DependencyRecorder (if any) that a series was read.
+
+    :param database_code: str
+    :param ticker_full: TickerFull
+    :param ser: pandas.Series
+    :return:
+    """
+    stack = getattr(_DependencyStack, 'Stack', None)
+    if stack:
+        stack[-1].Dependencies[(str(database_code), str(ticker_full))] = ser
+
+
 def fetch(ticker, database='Default', dropna=True):
     """
     Fetch a series from database; may create series and/or update as needed.
 
-    (May create a "fetchmany()" for fancier fetches that take a slice of the database.)
+    Use fetch_many() if you want a large number of series.
 
     :param ticker: str
     :param database: str
@@ -444,19 +738,20 @@ def fetch(ticker, database='Default', dropna=True):
     database_manager: DatabaseManager = Databases[database]
     series_meta = database_manager.GetMeta(ticker)
     series_meta.AssertValid()
-    provider_code = series_meta.series_provider_code
-    # noinspection PyPep8
-    try:
-        provider_manager: ProviderWrapper = Providers[provider_code]
-    except:
-        raise KeyError('Unknown provider_code: ' + str(provider_code)) from None
-    if series_meta.Exists:
-        # Return what is on the database.
-        global UpdateProtocolList
-        # TODO: Allow for choice of protocol.
-        return UpdateProtocolList["DEFAULT"].Update(ticker, series_meta, provider_manager, database_manager)
+    # TODO: Allow for choice of protocol.
+    protocol = UpdateProtocolList["DEFAULT"]
+    if series_meta.Exists and not protocol.NeedsUpdate(series_meta, database_manager):
+        # Return what is on the database. (Skipping the provider lookup means that a lazy provider
+        # extension is not loaded just to read the database.)
+        ser = database_manager.Retrieve(series_meta)
     else:
-        return UpdateProtocolList["DEFAULT"].FetchAndWrite(ticker, series_meta, provider_manager, database_manager)
+        provider_manager: ProviderWrapper = _get_provider(series_meta.series_provider_code)
+        if series_meta.Exists:
+            ser = protocol.Update(ticker, series_meta, provider_manager, database_manager)
+        else:
+            ser = protocol.FetchAndWrite(ticker, series_meta, provider_manager, database_manager)
+    _record_dependency(database_manager.Code, series_meta.ticker_full, ser)
+    return ser
     #     if provider_manager.IsExternal:
     #         _hook_fetch_external(provider_manager, ticker)
     #     if provider_manager.PushOnly:
@@ -510,6 +805,75 @@ def fetch(ticker, database='Default', dropna=True):
     # return ser
 
 
+def fetch_many(ticker_list, database='Default', dropna=True, return_dict=False):
+    """
+    Fetch a list of series.
+
+    Does the same work as calling fetch() on each ticker, but the metadata are resolved in bulk
+    (GetMetaMany()), and all the series that do not need an update are pulled from the database in a
+    single RetrieveMany() call. Series that are missing or stale are grouped by provider, and go through
+    the update protocol one at a time.
+
+    If a provider fetches an entire table, the other series in the table are taken from the fetched table, rather
+    than going back to the provider.
+
+    Returns a DataFrame (aligned on the union of the dates), unless return_dict is True, in which case
+    a dict of series (keyed by the tickers in ticker_list) is returned.
+
+    :param ticker_list: list
+    :param database: str
+    :param dropna: bool
+    :param return_dict: bool
+    :return: pandas.DataFrame
+    """
+    database_manager: DatabaseManager = Databases[database]
+    # Remove duplicates, preserving order.
+    ticker_list = list(dict.fromkeys([str(x) for x in ticker_list]))
+    meta_list = database_manager.GetMetaMany(ticker_list)
+    protocol = UpdateProtocolList["DEFAULT"]
+    on_database = []
+    # provider_code -> list of (ticker, series_meta)
+    to_update = {}
+    for ticker, series_meta in zip(ticker_list, meta_list):
+        series_meta.AssertValid()
+        if series_meta.Exists and not protocol.NeedsUpdate(series_meta, database_manager):
+            on_database.append((ticker, series_meta))
+        else:
+            provider_code = str(series_meta.series_provider_code)
+            if provider_code not in to_update:
+                to_update[provider_code] = []
+            to_update[provider_code].append((ticker, series_meta))
+    out = {}
+    if len(on_database) > 0:
+        retrieved = database_manager.RetrieveMany([x[1] for x in on_database])
+        for ticker, series_meta in on_database:
+            out[ticker] = retrieved[str(series_meta.ticker_full)]
+    for provider_code in sorted(to_update.keys()):
+        provider_manager = _get_provider(provider_code)
+        table_series = {}
+        for ticker, series_meta in to_update[provider_code]:
+            ticker_full = str(series_meta.ticker_full)
+            if ticker_full in table_series:
+                # Already written when the table was fetched.
+                out[ticker] = table_series[ticker_full]
+                continue
+            if series_meta.Exists:
+                out[ticker] = protocol.Update(ticker, series_meta, provider_manager, database_manager)
+            else:
+                out[ticker] = protocol.FetchAndWrite(ticker, series_meta, provider_manager, database_manager)
+            if provider_manager.TableWasFetched:
+                table_series.update(provider_manager.TableSeries)
+    if dropna:
+        for ticker in out:
+            out[ticker] = out[ticker].dropna()
+    for ticker, series_meta in zip(ticker_list, meta_list):
+        _record_dependency(database_manager.Code, series_meta.ticker_full, out[ticker])
+    if return_dict:
+        return out
+    # Preserve the order of the input list.
+    return pandas.DataFrame({ticker: out[ticker] for ticker in ticker_list})
+
+
 def fetch_df(ticker, database='Default', dropna=True):
     """
     Return a DataFrame. Used by R.
@@ -531,6 +895,33 @@ def fetch_df(ticker, database='Default', dropna=True):
         raise
 
 
+def refresh(ticker_list, database='Default'):
+    """
+    Refresh the stale series in ticker_list, with the provider fetches done in parallel. Stale means
+    that the default update protocol says they need an update, or they are not on the database.
+
+    Returns a dict of status strings, keyed by ticker ('fresh', 'updated', 'unchanged', 'table', 'skipped',
+    'failed'). See econ_platform_core.refresh_engine for the configuration options.
+
+    :param ticker_list: list
+    :param database: str
+    :return: dict
+    """
+    engine = RefreshEngine(database)
+    return engine.Refresh(ticker_list)
+
+
+def refresh_all(database='Default'):
+    """
+    Refresh all the stale series on a database. See refresh().
+
+    :param database: str
+    :return: dict
+    """
+    database_manager: DatabaseManager = Databases[database]
+    return refresh(database_manager.GetAllValidSeriesTickers(), database)
+
+
 def reset_update_time(ticker, database='Default', time_stamp=None):
     """
     Convenience function to set the update/refresh time back in the past, forcing an update of the series.
@@ -557,6 +948,8 @@ def log_extension_status():  # pragma: nocover
     log_debug('Successful Extension Initialisation')
     for e in ExtensionList.LoadedExtensions:
         log_debug(e)
+    for e in ExtensionList.LazyExtensions:
+        log_debug('%s (registered, loaded on first use)', e)
     if len(ExtensionList.DecoratedFailedExtensions) == 0:
         log_debug('No extension loads failed.')
         return
@@ -640,12 +1033,7 @@ def fetch_metadata(ticker_str, database='SQL'):
     :return: pandas.DataFame
     """
     db_manager: DatabaseManager = Databases[database]
-    meta = db_manager.Find(ticker_str)
-    if meta.Exists:
-        try:
-            meta = db_manager.GetMeta(meta.ticker_full)
-        except NotImplementedError:
-            pass
+    meta = db_manager.GetMeta(ticker_str)
     df = meta.to_DF()
     return df
 
@@ -656,20 +1044,40 @@ def init_package():
     :return:
     """
     global PlatformConfiguration
+    global ExtensionList
+    ExtensionList.StartupProfile = []
     if not PlatformConfiguration.LoadedAny:
         # May switch over to "silent" loading, but not knowing which config files were loaded can
         # cause a lot of errors...
-        PlatformConfiguration = econ_platform_core.configuration.load_platform_configuration(display_steps=True)
+        PlatformConfiguration = ExtensionList.TimePhase(
+            'Load configuration', econ_platform_core.configuration.load_platform_configuration, display_steps=True)
     # By default, go into the "logs" directory below this file.
     if len(LogInfo.LogDirectory) == 0:
         # If it has not been set manually, use the config information.
         LogInfo.LogDirectory = utils.parse_config_path(PlatformConfiguration['Logging']['LogDirectory'])
-    Databases.Initialise()
-    Providers.Initialise()
-    UpdateProtocolList.Initialise()
-    global ExtensionList
+    ExtensionList.TimePhase('Databases.Initialise', Databases.Initialise)
+    ExtensionList.TimePhase('Cache.Initialise', Cache.Initialise, PlatformConfiguration)
+    ExtensionList.TimePhase('Providers.Initialise', Providers.Initialise)
+    ExtensionList.TimePhase('UpdateProtocolList.Initialise', UpdateProtocolList.Initialise)
+    ExtensionList.LazyExtensions = []
     ExtensionList.LoadedExtensions, ExtensionList.FailedExtensions, ExtensionList.DecoratedFailedExtensions = \
-        econ_platform_core.extensions.load_extensions()
+        ExtensionList.TimePhase('Load extensions (econ_platform_core)', econ_platform_core.extensions.load_extensions)
+
+
+def get_startup_profile():
+    """
+    Get the timings (in seconds) of the init_package()/init_econ_platform() phases and of each extension,
+    as a DataFrame. For extensions, WallTime is split into ImportTime (importing the module) and MainTime (main(),
+    or registering the codes for extensions that are loaded on first use).
+
+    Extensions that are loaded on first use get another entry when they are loaded.
+
+    Set the environment variable PLATFORM_STARTUP_PROFILE to send the entries to the log as well (log needs to
+    be started before initialisation).
+
+    :return: pandas.DataFrame
+    """
+    return ExtensionList.GetStartupProfile()
 
 
 def get_platform_information(return_instead_of_print=False):
@@ -692,6 +1100,8 @@ def get_platform_information(return_instead_of_print=False):
         out = appender(out, ['Extension', ext, 'Loaded'])
     out.sort_values('Name')
     failed = pandas.DataFrame(columns=['Type', 'Name', 'Info'])
+    for ext in ExtensionList.LazyExtensions:
+        out = appender(out, ['Extension', ext, 'Registered'])
     for ext in ExtensionList.FailedExtensions:
         failed = appender(failed, ['Extension', ext, 'FAILED'])
     out = failed.append(out)
@@ -701,11 +1111,16 @@ def get_platform_information(return_instead_of_print=False):
     for db in db_list:
         mgr = Databases[db]
         out = appender(out, ['Database', mgr.Name, db])
+    # Do not load the lazy extensions just to list them.
+    for db in sorted(Databases.LazyDatabases.keys()):
+        out = appender(out, ['Database', Databases.LazyDatabases[db][0], db])
     prov_list = list(Providers.ProviderDict.keys())
     prov_list.sort()
     for prov in prov_list:
         provider = Providers[prov]
         out = appender(out, ['Provider', provider.Name, prov])
+    for prov in sorted(Providers.LazyProviders.keys()):
+        out = appender(out, ['Provider', Providers.LazyProviders[prov][0], prov])
     update_list = list(UpdateProtocolList.Protocols.keys())
     update_list.sort()
     for prot in update_list:
@@ -0,0 +1,294 @@
+"""
+async_fetch.py
+
+Coroutine versions of fetch() and fetch_many(), for notebooks and services that run an asyncio event loop:
+
+ser = await econ_platform_core.afetch('F@GDP')
+df = await econ_platform_core.afetch_many(['F@GDP', 'D@Eurostat/namq_10_gdp/Q.CP_MEUR.SCA.B1GQ.EL'])
+
+The results are the same as fetch()/fetch_many(); the difference is that the provider calls are done at the
+same time (so the total time is close to that of the slowest fetch, if the concurrency limits allow it).
+
+How it works (the work is done by AsyncFetchEngine, which uses the same settings as the refresh engine:
+[Refresh] max_workers is the size of the thread pool, and [RefreshConcurrency] sets the number of simultaneous
+fetches per provider):
+- Nothing that blocks runs on the event loop thread: the database calls and the provider fetches all go to the
+  thread pool, so the loop is free for the rest of the program while the fetch is running. (As in RefreshEngine,
+  reads can run at the same time as a write.) Each call closes the pool thread's database connection when it
+  is done, so that the threads do not leave connections open.
+- The metadata are resolved in bulk (GetMetaMany()), along with the check for which series need an update.
+- The series that do not need an update are retrieved with a single RetrieveMany() call, at the same time as the
+  provider fetches.
+- For each series to be fetched, the stored series is read (if the fetch is incremental), then the provider fetch
+  (UpdateProtocol.FetchFromProvider()) runs. An asyncio.Semaphore per provider limits the number running at once.
+- The results are written as they come back, one at a time (an asyncio.Lock), outside the provider semaphore.
+- Providers with RefreshInParallel set to False (the User provider) and push-only series go through the normal
+  fetch(), one at a time (in the thread pool), after the rest are done.
+
+Errors follow fetch(): a series that is on the database falls back to the stored series if the provider fails
+(as SimpleUpdate does), while a failure on a new series raises. If several series fail, the error for the first
+in the list is raised (after all the fetches are done).
+
+Copyright 2019 Brian Romanchuk
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+import concurrent.futures
+from logging import debug as log_debug
+
+import pandas
+
+import econ_platform_core
+from econ_platform_core.entity_and_errors import PlatformError, NoDataError
+from econ_platform_core.refresh_engine import RefreshEngine
+
+
+class AsyncFetchEngine(RefreshEngine):
+    """
+    Does the work for afetch()/afetch_many(). Create a new one for each call (the semaphores belong to the
+    event loop that is running).
+    """
+    def __init__(self, database='Default', executor=None):
+        super().__init__(database)
+        self.Database = database
+        # If None, a thread pool is created (and shut down) for each FetchMany() call.
+        self.Executor = executor
+        self.AsyncSemaphores = {}
+        # full ticker -> series, for tables fetched along with another series.
+        self.TableSeries = {}
+        # Writes are done one at a time (the text database has no lock of its own); created by FetchMany().
+        self.AsyncWriteLock = None
+
+    def GetAsyncSemaphore(self, provider_code):
+        """
+        Get the asyncio.Semaphore that limits concurrent fetches for a provider.
+
+        :param provider_code: str
+        :return: asyncio.Semaphore
+        """
+        provider_code = str(provider_code).upper()
+        if provider_code not in self.AsyncSemaphores:
+            limit = self.ProviderConcurrency.get(provider_code, self.DefaultConcurrency)
+            self.AsyncSemaphores[provider_code] = asyncio.Semaphore(max(limit, 1))
+        return self.AsyncSemaphores[provider_code]
+
+    async def FetchMany(self, ticker_list, dropna=True):
+        """
+        Fetch a list of series; returns a dict keyed by ticker (duplicates removed).
+
+        :param ticker_list: list
+        :param dropna: bool
+        :return: dict
+        """
+        loop = asyncio.get_running_loop()
+        ticker_list = list(dict.fromkeys([str(x) for x in ticker_list]))
+        self.AsyncWriteLock = asyncio.Lock()
+        executor = self.Executor
+        if executor is None:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(self.MaxWorkers, 1))
+        try:
+            meta_list, needs_update = await self._RunInPool(loop, executor, self._CheckStale, ticker_list)
+            on_database = []
+            parallel = []
+            serial = []
+            for ticker, series_meta, stale in zip(ticker_list, meta_list, needs_update):
+                if not stale:
+                    on_database.append((ticker, series_meta))
+                    continue
+                provider_manager = econ_platform_core._get_provider(series_meta.series_provider_code)
+                if provider_manager.RefreshInParallel and not provider_manager.PushOnly:
+                    parallel.append((ticker, series_meta, provider_manager))
+                else:
+                    serial.append(ticker)
+            log_debug('afetch_many: %d from database, %d in parallel, %d in serial', len(on_database),
+                      len(parallel), len(serial))
+            jobs = [self._FetchOne(loop, executor, ticker, series_meta, provider_manager)
+                    for ticker, series_meta, provider_manager in parallel]
+            if len(on_database) > 0:
+                jobs.append(self._Retrieve(loop, executor, on_database))
+            results = await asyncio.gather(*jobs, return_exceptions=True)
+            out = {}
+            for res in results:
+                if isinstance(res, BaseException):
+                    raise res
+                out.update(res)
+            # These can make provider calls (and User series call fetch() themselves).
+            for ticker in serial:
+                out[ticker] = await self._RunInPool(loop, executor, econ_platform_core.fetch, ticker, self.Database)
+        except BaseException:
+            if self.Executor is None:
+                # Do not wait for the fetches that are still running; they close their connections when done.
+                executor.shutdown(wait=False)
+            raise
+        if self.Executor is None:
+            # Everything submitted has finished, so this does not hold up the loop.
+            executor.shutdown(wait=True)
+        if dropna:
+            for ticker in out:
+                out[ticker] = out[ticker].dropna()
+        # Same order as the input, and recorded as inputs (as fetch_many() does).
+        out = dict((ticker, out[ticker]) for ticker in ticker_list)
+        for ticker, series_meta in zip(ticker_list, meta_list):
+            econ_platform_core._record_dependency(self.DatabaseManager.Code, series_meta.ticker_full, out[ticker])
+        return out
+
+    def _RunInPool(self, loop, executor, fn, *args):
+        """
+        Run fn(*args) in the thread pool (returns an awaitable). The worker thread's database connection is closed
+        afterwards, so that the pool threads do not leave connections open.
+
+        :param loop: asyncio.AbstractEventLoop
+        :param executor: concurrent.futures.Executor
+        :param fn: function
+        :param args: arguments passed to fn
+        :return: asyncio.Future
+        """
+        def call_and_close():
+            try:
+                return fn(*args)
+            finally:
+                self.CloseThreadConnection()
+        return loop.run_in_executor(executor, call_and_close)
+
+    def _CheckStale(self, ticker_list):
+        """
+        Runs in the thread pool: get the metadata, and whether each series needs to be fetched.
+
+        :param ticker_list: list
+        :return: tuple
+        """
+        meta_list = self.DatabaseManager.GetMetaMany(ticker_list)
+        needs_update = []
+        for series_meta in meta_list:
+            series_meta.AssertValid()
+            needs_update.append(not series_meta.Exists or
+                                self.Protocol.NeedsUpdate(series_meta, self.DatabaseManager))
+        return meta_list, needs_update
+
+    async def _Retrieve(self, loop, executor, on_database):
+        """
+        Retrieve the series that do not need an update.
+
+        :param loop: asyncio.AbstractEventLoop
+        :param executor: concurrent.futures.Executor
+        :param on_database: list
+        :return: dict
+        """
+        meta_list = [x[1] for x in on_database]
+        retrieved = await self._RunInPool(loop, executor, self.DatabaseManager.RetrieveMany, meta_list)
+        return dict((ticker, retrieved[str(series_meta.ticker_full)]) for ticker, series_meta in on_database)
+
+    async def _FetchOne(self, loop, executor, ticker, series_meta, provider_manager):
+        """
+        Fetch one series from the provider, and write it (all in the thread pool).
+
+        :param loop: asyncio.AbstractEventLoop
+        :param executor: concurrent.futures.Executor
+        :param ticker: str
+        :param series_meta: econ_platform_core.SeriesMetadata
+        :param provider_manager: econ_platform_core.ProviderWrapper
+        :return: dict
+        """
+        ticker_full = str(series_meta.ticker_full)
+        # The read is outside the semaphore, so that it is not limited by the provider concurrency.
+        stored, start_date = await self._RunInPool(loop, executor, self.Protocol.GetIncrementalStart, series_meta,
+                                                   provider_manager, self.DatabaseManager)
+        async with self.GetAsyncSemaphore(series_meta.series_provider_code):
+            if ticker_full in self.TableSeries:
+                # Written along with a table fetched for another series.
+                return {ticker: self.TableSeries[ticker_full]}
+            try:
+                result = await self._RunInPool(loop, executor, self.Protocol.FetchFromProvider, ticker,
+                                               series_meta, provider_manager, stored, start_date,
+                                               self.DatabaseManager.Code)
+            except NoDataError:
+                result = None
+            except PlatformError as ex:
+                return await self._UseStored(loop, executor, ticker, series_meta, ex)
+            if result is not None and result.TableWasFetched:
+                self.TableSeries.update(result.TableSeries)
+        try:
+            async with self.AsyncWriteLock:
+                if result is None:
+                    ser = await self._RunInPool(loop, executor, self._KeepStored, series_meta)
+                else:
+                    ser = await self._RunInPool(loop, executor, self.Protocol.WriteFetched, result,
+                                                self.DatabaseManager)
+        except PlatformError as ex:
+            return await self._UseStored(loop, executor, ticker, series_meta, ex)
+        return {ticker: ser}
+
+    def _KeepStored(self, series_meta):
+        """
+        Runs in the thread pool: the provider had nothing new, so mark the series as refreshed and read it.
+
+        :param series_meta: econ_platform_core.SeriesMetadata
+        :return: pandas.Series
+        """
+        self.DatabaseManager.SetLastRefresh(series_meta.ticker_full)
+        return self.DatabaseManager.Retrieve(series_meta)
+
+    async def _UseStored(self, loop, executor, ticker, series_meta, ex):
+        """
+        The fetch (or write) failed: fall back to the stored series, if there is one.
+
+        :param loop: asyncio.AbstractEventLoop
+        :param executor: concurrent.futures.Executor
+        :param ticker: str
+        :param series_meta: econ_platform_core.SeriesMetadata
+        :param ex: PlatformError
+        :return: dict
+        """
+        if not series_meta.Exists:
+            raise ex
+        econ_platform_core.log_warning('Could not fetch %s from provider; using database. %s', ticker, ex)
+        ser = await self._RunInPool(loop, executor, self.DatabaseManager.Retrieve, series_meta)
+        return {ticker: ser}
+
+
+async def afetch(ticker, database='Default', dropna=True, executor=None):
+    """
+    Coroutine version of fetch().
+
+    :param ticker: str
+    :param database: str
+    :param dropna: bool
+    :param executor: concurrent.futures.Executor
+    :return: pandas.Series
+    """
+    engine = AsyncFetchEngine(database, executor)
+    out = await engine.FetchMany([ticker], dropna=dropna)
+    return out[str(ticker)]
+
+
+async def afetch_many(ticker_list, database='Default', dropna=True, return_dict=False, executor=None):
+    """
+    Coroutine version of fetch_many(): the provider fetches are done concurrently.
+
+    Returns a DataFrame (aligned on the union of the dates), unless return_dict is True, in which case
+    a dict of series (keyed by the tickers in ticker_list) is returned.
+
+    :param ticker_list: list
+    :param database: str
+    :param dropna: bool
+    :param return_dict: bool
+    :param executor: concurrent.futures.Executor
+    :return: pandas.DataFrame
+    """
+    engine = AsyncFetchEngine(database, executor)
+    out = await engine.FetchMany(ticker_list, dropna=dropna)
+    if return_dict:
+        return out
+    return pandas.DataFrame(out)
@@ -23,6 +23,7 @@ limitations under the License.
 # to move it back later. I might make a stub definition.
 import warnings
 import datetime
+import threading
 
 import econ_platform_core
 import econ_platform_core.entity_and_errors
@@ -46,15 +47,30 @@ class AdvancedDatabase(econ_platform_core.DatabaseManager):
     "HandleDatabase" is used rather than "Connection" since it may not be an actual SQL Connection object in
     implementations. If you do not want to use that member, just set it to anything other than None when you initialise
     the connection.
+
+    HandleDatabase is stored per thread, so each thread that uses the object goes through Connect() once, and
+    gets its own connection. The public methods that write (Write(), Delete(), SetLastUpdate(), SetLastRefresh())
+    hold WriteLock, so that writes from different threads are serialised.
     """
     def __init__(self, name='Advanced Database (Abstract)'):
+        # Needs to exist before HandleDatabase is set.
+        self._ThreadState = threading.local()
         super().__init__(name=name)
         self.IsAdvanced = True
         self.HandleDatabase = None
+        self.WriteLock = threading.RLock()
+
+    @property
+    def HandleDatabase(self):
+        return getattr(self._ThreadState, 'HandleDatabase', None)
+
+    @HandleDatabase.setter
+    def HandleDatabase(self, value):
+        self._ThreadState.HandleDatabase = value
 
     def Connect(self):
         """
-        Connect to the database, if HandleDatabase is None.
+        Connect to the database, if HandleDatabase is None (for this thread).
         :return:
         """
         if self.HandleDatabase is not None:
@@ -64,6 +80,48 @@ class AdvancedDatabase(econ_platform_core.DatabaseManager):
         if self.HandleDatabase is None:
             raise econ_platform_core.entity_and_errors.ConnectionError('Database handle not set!')
 
+    def Close(self):
+        """
+        Close the connection for the current thread (if any); the next call from this thread reconnects.
+        Subclasses that open connections override this.
+        :return:
+        """
+        self.HandleDatabase = None
+
+    def Write(self, ser, series_meta, overwrite=True):
+        """
+        Write a series; serialised across threads.
+
+        :param ser: pandas.Series
+        :param series_meta: SeriesMetadata
+        :param overwrite: bool
+        :return:
+        """
+        with self.WriteLock:
+            super().Write(ser, series_meta, overwrite)
+
+    def WriteMany(self, series_list):
+        """
+        Write a group of series (and set the last update); serialised across threads.
+
+        :param series_list: iterable of (pandas.Series, SeriesMetadata)
+        :return:
+        """
+        with self.WriteLock:
+            self.Connect()
+            super().WriteMany(series_list)
+
+    def Delete(self, series_meta, warn_if_non_existent=True):
+        """
+        Delete a series; serialised across threads.
+
+        :param series_meta: SeriesMetadata
+        :param warn_if_non_existent: bool
+        :return:
+        """
+        with self.WriteLock:
+            super().Delete(series_meta, warn_if_non_existent)
+
     def _Connect(self):
         """
         Subclasses override this. Make sure that HandleDatabase is not None.
@@ -132,6 +190,33 @@ class AdvancedDatabase(econ_platform_core.DatabaseManager):
             return self._GetMetaFromFullTicker(ticker_obj)
         raise econ_platform_core.entity_and_errors.PlatformError('Internal error: unsupported ticker class')
 
+    def RetrieveWithMeta(self, full_ticker):
+        """
+        Retrieve both the series and the meta data, via _RetrieveWithMeta(). Databases that can read both in
+        a single query/transaction override that method, so that the two are consistent. The series is added
+        to the cache.
+
+        :param full_ticker: str
+        :return: list
+        """
+        self.Connect()
+        generation = econ_platform_core.Cache.GetGeneration(self.Code, full_ticker)
+        ser, meta = self._RetrieveWithMeta(full_ticker)
+        econ_platform_core.Cache.Put(self.Code, meta.ticker_full, ser, generation)
+        return ser, meta
+
+    def _RetrieveWithMeta(self, full_ticker):
+        """
+        Default implementation: GetMeta(), then Retrieve().
+
+        :param full_ticker: str
+        :return: list
+        """
+        meta = self.GetMeta(full_ticker)
+        meta.AssertValid()
+        ser = self.Retrieve(meta)
+        return ser, meta
+
     def _GetMetaFromFullTicker(self, ticker_full):
         """
         Get the meta data based on the full ticker.
@@ -199,8 +284,9 @@ class AdvancedDatabase(econ_platform_core.DatabaseManager):
         :param time_stamp: datatime.datetime
         :return:
         """
-        self.Connect()
-        self._SetLastRefresh(ticker_full, time_stamp)
+        with self.WriteLock:
+            self.Connect()
+            super().SetLastRefresh(ticker_full, time_stamp)
 
     def _SetLastRefresh(self, ticker_full, time_stamp=None):
         """
@@ -222,8 +308,9 @@ class AdvancedDatabase(econ_platform_core.DatabaseManager):
         :param time_stamp: datatime.datetime
         :return:
         """
-        self.Connect()
-        self._SetLastUpdate(ticker_full, time_stamp)
+        with self.WriteLock:
+            self.Connect()
+            super().SetLastUpdate(ticker_full, time_stamp)
 
     def _SetLastUpdate(self, ticker_full, time_stamp=None):
         """
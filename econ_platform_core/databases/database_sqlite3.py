@@ -28,6 +28,44 @@ have permissions to create tables. Working with local database files is probably
 way to create a distinction between "production" and "development" environments: once the new
 code is ready for prime time, you just point it at the production server instead of a local file.)
 
+Schema versions
+---------------
+
+The schema version is saved in the database file (PRAGMA user_version; 0 is treated as version 1).
+
+Version 1: the original schema. The series_dates column is TEXT: ISO dates ("yyyy-mm-dd"), or a float as a string
+for model time axes. Every date has to be parsed in Python, and float axes are sorted as strings.
+
+Version 2: series_dates holds numbers. Calendar dates are INTEGER day numbers (days since 1970-01-01),
+model time axes are REAL. The column has no declared type, so SQLite keeps the storage class
+of what was written, and the reader can tell the two types of axes apart. The data table is a WITHOUT ROWID
+table clustered on (series_id, series_dates), so that a series is stored in date order.
+
+New database files are created with the version in the config ([D_SQLITE] schema_version, defaults to 1).
+Existing files can be converted with MigrateSchema() (or the migrate_sqlite_schema.py script).
+
+Ticker lookups go through the TickerAlias table (ticker -> series_id, with the ticker as primary key), which
+triggers keep in sync with the SeriesMeta, TickerLocal and TickerDataType tables. Files created before the table
+existed use the (slower) TickerLookup UNION view until MigrateTickerAlias() is run (also done by the migration
+script).
+
+Connection settings
+-------------------
+
+The PRAGMA settings journal_mode, synchronous, mmap_size, cache_size, temp_store and page_size are set from
+[D_SQLITE] every time a file is opened. An extra database can override them in a section named after its
+code, e.g. [D_SQLITE_TMP]. The default config uses WAL journaling with synchronous=NORMAL, so that a
+commit does not force a sync of the file, and readers do not block the writer.
+(See scripts/benchmark_sqlite_pragmas.py.)
+
+Threads
+-------
+
+Each thread gets its own connection and cursor (the Connection and Cursor members are thread-local), so the
+same DatabaseSqlite3 object can be used from a thread pool. Writes are serialised by AdvancedDatabase.WriteLock.
+The exception is an in-memory database (':memory:'), which only exists on a single connection, and so that
+connection is shared by all threads.
+
 Copyright 2019 Brian Romanchuk
 
 Licensed under the Apache License, Version 2.0 (the "License");
@@ -43,8 +81,10 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import contextlib
 import os
 import pandas
+import numpy
 import sqlite3
 import datetime
 
@@ -54,6 +94,7 @@ import econ_platform_core.entity_and_errors
 import econ_platform_core.series_metadata
 import econ_platform_core.utils
 from econ_platform_core.databases import AdvancedDatabase
+from econ_platform_core.tickers import TickerFull
 
 
 class DBapiDatabase(AdvancedDatabase):
@@ -87,9 +128,16 @@ class DatabaseSqlite3(DBapiDatabase):
     derived classes should only override the non-public implementation methods.)
 
     """
-    Cursor: sqlite3.Cursor
     Directory: str
-    Connection: sqlite3.Connection
+    # PRAGMA settings that can be set in the config, with the allowed values (None: integer).
+    PragmaNames = {
+        'page_size': None,
+        'journal_mode': ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'),
+        'synchronous': ('OFF', 'NORMAL', 'FULL', 'EXTRA', '0', '1', '2', '3'),
+        'mmap_size': None,
+        'cache_size': None,
+        'temp_store': ('DEFAULT', 'FILE', 'MEMORY', '0', '1', '2'),
+        }
 
     def __init__(self):
         """
@@ -99,6 +147,10 @@ class DatabaseSqlite3(DBapiDatabase):
         super().__init__(name='SQLite Database')
         self.Name = 'SQLite Database'
         self.DatabaseFile = ''
+        # Every connection opened by this object (all threads), so that CloseAll() can find them.
+        self.AllConnections = []
+        # An in-memory database only exists on one connection, so ':memory:' shares one connection across threads.
+        self.MemoryConnection = None
         self.Connection = None
         self.Cursor = None
         self.TableMeta = ''
@@ -107,29 +159,149 @@ class DatabaseSqlite3(DBapiDatabase):
         self.TableLocal = 'TickerLocal'
         self.TableTickerDataType = 'TickerDataType'
         self.ViewLookup = 'TickerLookup'
+        # Indexed ticker -> series_id table, kept in sync by triggers. Older files do not have it
+        # (see MigrateTickerAlias()); found on connection.
+        self.TableAlias = 'TickerAlias'
+        self.HasAliasTable = None
         self.TableProviderMeta = 'ProviderMeta'
         self.LogSQL = False
         self.AutoCreate = True
+        # Keep the number of "?" in an "IN (...)" clause below the SQLite limit (999 in older versions).
+        self.MaxQueryParameters = 500
+        # Schema version of the connected database file.
+        self.SchemaVersion = None
+        # Schema version used when creating a new database file. If None, taken from config.
+        self.NewSchemaVersion = None
+        self.LatestSchemaVersion = 2
+        # 'diff': only write the observations that changed; 'replace': delete the series and re-insert.
+        # If None, taken from config.
+        self.WriteMode = None
+        # Number of rows inserted/updated/deleted by the last Write() (for monitoring and testing).
+        self.LastWriteStatistics = {}
+        # Connection PRAGMA settings (name -> value), applied on connect. If None, taken from config.
+        self.Pragmas = None
+
+
+    @property
+    def Connection(self):
+        """
+        The sqlite3.Connection for the current thread.
+        """
+        return getattr(self._ThreadState, 'Connection', None)
+
+    @Connection.setter
+    def Connection(self, value):
+        self._ThreadState.Connection = value
+
+    @property
+    def Cursor(self):
+        """
+        The sqlite3.Cursor for the current thread (created by Execute()).
+        """
+        return getattr(self._ThreadState, 'Cursor', None)
 
+    @Cursor.setter
+    def Cursor(self, value):
+        self._ThreadState.Cursor = value
 
     def _Connect(self):
         """
-        Implementation of database connection.
+        Implementation of database connection. Called once per thread (see AdvancedDatabase).
         :return:
         """
         if self.Connection is not None:
             return self.Connection
         self.SetParameters()
         full_name = self.DatabaseFile
-        if full_name == ':memory:':
-            did_not_exist = True
+        with self.WriteLock:
+            if full_name == ':memory:':
+                did_not_exist = self.MemoryConnection is None
+            else:
+                did_not_exist = not os.path.exists(full_name)
+            if did_not_exist and self.AutoCreate:
+                self.CreateSqlite3Tables()
+                return self.Connection
+        self._OpenConnection()
+        self.SchemaVersion = self.GetSchemaVersion()
+        self.HasAliasTable = self.TableExists(self.TableAlias)
+
+    def TableExists(self, table_name):
+        """
+        Is there a table with this name in the database file?
+
+        :param table_name: str
+        :return: bool
+        """
+        cmd = "SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name = ?"
+        return self.Connection.execute(cmd, (table_name,)).fetchall()[0][0] > 0
+
+    def _OpenConnection(self):
+        """
+        Open a connection for the current thread, and apply the PRAGMA settings.
+
+        The connections are opened with check_same_thread=False so that CloseAll() can close them from any
+        thread, but each connection is only used by the thread that opened it (other than the shared
+        ':memory:' connection).
+
+        :return: sqlite3.Connection
+        """
+        if self.DatabaseFile == ':memory:' and self.MemoryConnection is not None:
+            self.Connection = self.MemoryConnection
         else:
-            did_not_exist = not os.path.exists(full_name)
-        if did_not_exist and self.AutoCreate:
-            self.CreateSqlite3Tables()
-            return self.Connection
-        self.Connection = sqlite3.Connection(full_name)
+            self.Connection = sqlite3.Connection(self.DatabaseFile, check_same_thread=False)
+            with self.WriteLock:
+                self.AllConnections.append(self.Connection)
+                if self.DatabaseFile == ':memory:':
+                    self.MemoryConnection = self.Connection
+            self.ApplyPragmas()
+        self.Cursor = None
         self.HandleDatabase = self.Connection
+        return self.Connection
+
+    def Close(self):
+        """
+        Close the connection for the current thread. (The shared ':memory:' connection stays open, since
+        closing it would wipe the database.)
+
+        :return:
+        """
+        conn = self.Connection
+        self.Connection = None
+        self.Cursor = None
+        self.HandleDatabase = None
+        if conn is None or conn is self.MemoryConnection:
+            return
+        with self.WriteLock:
+            if conn in self.AllConnections:
+                self.AllConnections.remove(conn)
+        conn.close()
+
+    def CloseAll(self):
+        """
+        Close the connections of all threads (including ':memory:'). Threads that use the object afterwards
+        need to be the ones to reconnect, so only call this when the other threads are done.
+
+        :return:
+        """
+        with self.WriteLock:
+            for conn in self.AllConnections:
+                conn.close()
+            self.AllConnections = []
+            self.MemoryConnection = None
+        self.Connection = None
+        self.Cursor = None
+        self.HandleDatabase = None
+
+    def GetSchemaVersion(self):
+        """
+        Get the schema version saved in the database file.
+
+        :return: int
+        """
+        res = self.Connection.execute('PRAGMA user_version').fetchall()
+        version = res[0][0]
+        # Files created before versioning was added have user_version = 0.
+        return max(version, 1)
 
     def SetParameters(self):
         # Set data from config file, unless previously set
@@ -139,11 +311,84 @@ class DatabaseSqlite3(DBapiDatabase):
             self.TableMeta = econ_platform_core.PlatformConfiguration['SQL']['meta_table']
         if len(self.TableData) == 0:
             self.TableData = econ_platform_core.PlatformConfiguration['SQL']['data_table']
+        if self.NewSchemaVersion is None:
+            self.NewSchemaVersion = econ_platform_core.PlatformConfiguration['D_SQLITE'].getint('schema_version',
+                                                                                              fallback=1)
+        if self.WriteMode is None:
+            self.WriteMode = econ_platform_core.PlatformConfiguration['D_SQLITE'].get('write_mode',
+                                                                                   fallback='diff').lower()
+        if self.WriteMode not in ('diff', 'replace'):
+            raise econ_platform_core.entity_and_errors.PlatformError(
+                'Unknown SQLite write_mode: {0}'.format(self.WriteMode))
+        if self.Pragmas is None:
+            self.Pragmas = self.GetPragmasFromConfig()
 
         # Database file is a special case.
         self.DatabaseFile = econ_platform_core.utils.parse_config_path(self.DatabaseFile)
 
 
+    def GetPragmasFromConfig(self):
+        """
+        Get the connection PRAGMA settings from [D_SQLITE], overridden by the entries in [D_SQLITE_{Code}]
+        (if that section exists; e.g., [D_SQLITE_TMP] for the TMP database in [D_SQLITE_EXTRA]).
+
+        Empty values are skipped, which leaves the SQLite default.
+
+        :return: dict
+        """
+        config = econ_platform_core.PlatformConfiguration
+        sections = ['D_SQLITE']
+        if len(self.Code) > 0 and not self.Code.upper() == 'SQLITE':
+            sections.append('D_SQLITE_{0}'.format(self.Code.upper()))
+        out = {}
+        for section in sections:
+            try:
+                sect = config[section]
+            except KeyError:
+                continue
+            for name in self.PragmaNames:
+                if name in sect:
+                    out[name] = sect[name].strip()
+        return dict([(k, v) for k, v in out.items() if len(v) > 0])
+
+    def ApplyPragmas(self):
+        """
+        Apply the connection PRAGMA settings (self.Pragmas). PRAGMA statements cannot use parameters,
+        so the values are validated first.
+
+        page_size goes first, since it cannot be changed once the file is in WAL mode. (It only has an effect
+        on a new database file, or after a VACUUM.)
+
+        :return:
+        """
+        if not self.Pragmas:
+            return
+        for name in self.PragmaNames:
+            if name not in self.Pragmas:
+                continue
+            value = str(self.Pragmas[name]).strip().upper()
+            allowed = self.PragmaNames[name]
+            if allowed is None:
+                try:
+                    value = str(int(value))
+                except ValueError:
+                    raise econ_platform_core.entity_and_errors.PlatformError(
+                        'SQLite {0} must be an integer, not {1}'.format(name, self.Pragmas[name])) from None
+            elif value not in allowed:
+                raise econ_platform_core.entity_and_errors.PlatformError(
+                    'Invalid SQLite {0}: {1}'.format(name, self.Pragmas[name]))
+            self.Connection.execute('PRAGMA {0} = {1}'.format(name, value)).fetchall()
+
+    def GetPragmaValues(self):
+        """
+        Read the current values of the tunable PRAGMA settings from the connection.
+
+        :return: dict
+        """
+        self.Connect()
+        return dict([(name, self.Connection.execute('PRAGMA {0}'.format(name)).fetchall()[0][0])
+                     for name in self.PragmaNames])
+
     def TestTablesExist(self):
         self.Connect()
         cursor = self.Connection.cursor()
@@ -206,46 +451,232 @@ class DatabaseSqlite3(DBapiDatabase):
         res = cursor.fetchall()
         return res[0][0] > 0
 
-    def Retrieve(self, series_meta):
+    def _Retrieve(self, series_meta):
         self.Connect()
         ticker_full = str(series_meta.ticker_full)
         series_id = self.GetSeriesID(ticker_full)
         if series_id is None:
             raise econ_platform_core.entity_and_errors.TickerNotFoundError('{0} not found on database'.format(ticker_full))
-        cmd = """
-SELECT series_dates, series_values FROM {0} WHERE series_id = ?
-        """.format(self.TableData)
-        res = self.Execute(cmd, series_id, commit_after=False).fetchall()
-        def mapper(s):
-            try:
-                return econ_platform_core.utils.iso_string_to_date(s)
-            except:
-                return float(s)
+        dates, values = self._ReadObservations([series_id])[series_id]
+        return self._BuildSeries(dates, values, ticker_full)
+
+    def _RetrieveWithMeta(self, full_ticker):
+        """
+        Read the metadata and the observations inside one read transaction, so that they are consistent with
+        each other even if another connection writes in between. The series_id comes from the metadata row, so
+        there is no separate ticker lookup.
+
+        Local and data type tickers are resolved to the full ticker first.
+
+        :param full_ticker: str
+        :return: list
+        """
+        ticker_obj = econ_platform_core.tickers.map_string_to_ticker(full_ticker)
+        if type(ticker_obj) is not TickerFull:
+            return super()._RetrieveWithMeta(full_ticker)
+        collist = list(self.MetaColumnMapper.keys())
+        meta_cmd = 'SELECT {0} FROM {1} WHERE ticker_full = ?'.format(','.join(collist), self.TableMeta)
+        own_transaction = not self.Connection.in_transaction
+        if own_transaction:
+            self.Execute('BEGIN')
         try:
-            dates = [mapper(x[0]) for x in res]
-        except:
-            raise econ_platform_core.entity_and_errors.PlatformError('Corrupted date axis for {0}'.format(ticker_full))
-        valz = [x[1] for x in res]
-
-        if len(dates) > 0 and type(dates[0]) == float:
-            # need to sort properly; data were sorted as strings!
-            # This is silly, but not fixable until we create a float-based time axis table.
-            # SQLAlchemy...
-            data = [(x,y) for x,y in zip(dates, valz)]
-            data.sort()
-            dates = [x[0] for x in data]
-            valz = [x[1] for x in data]
-            ser = pandas.Series(valz)
-            ser.index = dates
+            res = self.Execute(meta_cmd, str(ticker_obj)).fetchall()
+            if len(res) > 0:
+                meta = self._BuildMeta(ticker_obj, res[0])
+                dates, values = self._ReadObservations([meta.series_id])[meta.series_id]
+        finally:
+            if own_transaction:
+                self.Connection.commit()
+        if len(res) == 0:
+            raise econ_platform_core.entity_and_errors.TickerNotFoundError(
+                '{0} not found on database'.format(str(ticker_obj)))
+        return self._BuildSeries(dates, values, str(ticker_obj)), meta
+
+    def _RetrieveMany(self, meta_list):
+        """
+        Pull all the series in one SELECT (per block of series_id values).
+
+        :param meta_list: list
+        :return: dict
+        """
+        self.Connect()
+        id_to_ticker = {}
+        for meta in meta_list:
+            ticker_full = str(meta.ticker_full)
+            series_id = meta.series_id
+            if series_id is None:
+                series_id = self.GetSeriesID(ticker_full)
+            if series_id is None:
+                raise econ_platform_core.entity_and_errors.TickerNotFoundError(
+                    '{0} not found on database'.format(ticker_full))
+            id_to_ticker[series_id] = ticker_full
+        observations = self._ReadObservations(list(id_to_ticker.keys()))
+        out = {}
+        for series_id, ticker_full in id_to_ticker.items():
+            dates, values = observations[series_id]
+            out[ticker_full] = self._BuildSeries(dates, values, ticker_full)
+        return out
+
+    def _ReadObservations(self, id_list):
+        """
+        Read the observations for a list of series_id values; returns a dict series_id -> (dates, values),
+        as numpy arrays.
+
+        The arrays are filled straight from the cursor by numpy.fromiter() (with a structured dtype), so the
+        rows are never collected into a list of tuples. A COUNT(*) query gives the array sizes, and tells
+        whether the dates of each series are all INTEGER (schema version 2 calendar dates) or REAL (model time
+        axes); both queries run in one read transaction, so the counts match the rows. Schema version 1 dates
+        are strings, and come back as an object array. (The shared ':memory:' connection is used by all threads,
+        so the transaction holds WriteLock in that case.)
+
+        :param id_list: list
+        :return: dict
+        """
+        out = dict((x, (numpy.array([], dtype=object), numpy.array([], dtype=float))) for x in id_list)
+        if self.SchemaVersion >= 2:
+            order_by = 'ORDER BY series_id, series_dates'
+        else:
+            order_by = ''
+        for pos in range(0, len(id_list), self.MaxQueryParameters):
+            block = id_list[pos:pos + self.MaxQueryParameters]
+            marks = ','.join(['?', ] * len(block))
+            count_cmd = """
+SELECT series_id, COUNT(*), SUM(typeof(series_dates) <> 'integer') FROM {0} WHERE series_id IN ({1})
+GROUP BY series_id ORDER BY series_id""".format(self.TableData, marks)
+            data_cmd = """
+SELECT series_id, series_dates, series_values FROM {0} WHERE series_id IN ({1}) {2}
+            """.format(self.TableData, marks, order_by)
+            if self.Connection is self.MemoryConnection:
+                lock = self.WriteLock
+            else:
+                lock = contextlib.nullcontext()
+            with lock:
+                own_transaction = not self.Connection.in_transaction
+                if own_transaction:
+                    self.Execute('BEGIN')
+                try:
+                    counts = self.Execute(count_cmd, *block, commit_after=False).fetchall()
+                    if self.SchemaVersion < 2:
+                        date_type = object
+                    elif all(x[2] == 0 for x in counts):
+                        date_type = 'i8'
+                    else:
+                        date_type = 'f8'
+                    cursor = self.Execute(data_cmd, *block, commit_after=False)
+                    try:
+                        rows = numpy.fromiter(cursor, dtype=[('series_id', 'i8'), ('dates', date_type),
+                                                             ('values', 'f8')], count=sum(x[1] for x in counts))
+                    except (TypeError, ValueError):
+                        raise econ_platform_core.entity_and_errors.PlatformError(
+                            'Corrupted values for series_id in {0}'.format(block)) from None
+                finally:
+                    if own_transaction:
+                        self.Connection.commit()
+            if self.SchemaVersion < 2:
+                # Not sorted by the query; keep the order within each series.
+                rows = rows[numpy.argsort(rows['series_id'], kind='stable')]
+            start = 0
+            for series_id, num_rows, num_not_int in counts:
+                chunk = rows[start:start + num_rows]
+                start += num_rows
+                dates = chunk['dates']
+                if date_type == 'f8' and num_not_int == 0:
+                    # Calendar dates, in a block with some model time axes.
+                    dates = dates.astype('i8')
+                out[series_id] = (dates, chunk['values'])
+        return out
+
+    def _BuildSeries(self, dates, values, ticker_full):
+        """
+        Convert the dates and values arrays from _ReadObservations() into a pandas.Series, with no per-row Python
+        code. (Long daily series were spending most of their time in the old per-row date mapper.)
+
+        :param dates: numpy.ndarray
+        :param values: numpy.ndarray
+        :param ticker_full: str
+        :return: pandas.Series
+        """
+        if len(values) == 0:
+            ser = pandas.Series([], index=pandas.DatetimeIndex([]), dtype=float)
+            ser.name = ticker_full
+            return ser
+        if self.SchemaVersion >= 2:
+            index = self._BuildIndexNumeric(dates)
         else:
-            ser = pandas.Series(valz)
-            ser.index = pandas.DatetimeIndex(dates)
+            index, values = self._BuildIndexText(dates, values, ticker_full)
+        ser = pandas.Series(values, index=index)
         ser.name = ticker_full
         return ser
 
+    @staticmethod
+    def _BuildIndexNumeric(dates):
+        """
+        Schema version 2: rows are already sorted, dates are day numbers (int64: calendar dates) or float64.
+
+        :param dates: numpy.ndarray
+        :return: pandas.Index
+        """
+        if dates.dtype.kind in 'iu':
+            return pandas.DatetimeIndex(dates.astype('datetime64[D]').astype('datetime64[ns]'))
+        return pandas.Index(dates.astype(float))
+
+    @staticmethod
+    def _BuildIndexText(dates, values, ticker_full):
+        """
+        Schema version 1: dates are ISO strings, or str() of a float time axis.
+
+        The strings are parsed in one shot by pandas with an exact yyyy-mm-dd format, so that something
+        like '5' is not taken as a date. Like utils.iso_string_to_date(), only the first 10 characters
+        count, but the strings are only truncated if the first attempt fails. Anything else is treated as a
+        float axis, which needs to be sorted, since the rows were sorted as strings.
+
+        :param dates: numpy.ndarray
+        :param values: numpy.ndarray
+        :param ticker_full: str
+        :return: tuple
+        """
+        for attempt in (dates, numpy.array(dates, dtype='U10')):
+            try:
+                return pandas.DatetimeIndex(pandas.to_datetime(attempt, format='%Y-%m-%d')), values
+            except (ValueError, TypeError):
+                pass
+        try:
+            float_arr = numpy.array(dates).astype(float)
+        except ValueError:
+            raise econ_platform_core.entity_and_errors.PlatformError(
+                'Corrupted date axis for {0}'.format(ticker_full)) from None
+        order = numpy.argsort(float_arr, kind='stable')
+        return pandas.Index(float_arr[order]), values[order]
 
-    def Write(self, ser, series_meta, overwrite=True):
+    def ConvertDatesForStorage(self, dates):
         """
+        Convert a series index to the values stored in the series_dates column.
+
+        Version 1: ISO date strings (or str() of whatever the index holds).
+        Version 2: int day numbers since 1970-01-01, or floats if the index is numeric.
+
+        :param dates: pandas.Index
+        :return: list
+        """
+        if self.SchemaVersion < 2:
+            return [econ_platform_core.utils.coerce_date_to_string(x) for x in dates]
+        if pandas.api.types.is_numeric_dtype(dates):
+            return [float(x) for x in dates]
+        try:
+            days = pandas.DatetimeIndex(pandas.to_datetime(dates)).values.astype('datetime64[D]')
+        except (ValueError, TypeError):
+            raise econ_platform_core.entity_and_errors.PlatformError(
+                'Cannot convert the series index to dates') from None
+        return days.astype(numpy.int64).tolist()
+
+
+    def _Write(self, ser, series_meta, overwrite=True):
+        """
+        Write a series. Depending on self.WriteMode, either only the changed observations are written
+        (the default, 'diff'), or the existing series is deleted and then everything is re-inserted ('replace').
+
+        Either way, the changes to the data table (and the creation of a new series) are done in a single
+        transaction, so that a failed write does not leave an empty series behind.
 
         :param ser: pandas.Series
         :param ticker: econ_platform_core.SeriesMetadata
@@ -253,34 +684,155 @@ SELECT series_dates, series_values FROM {0} WHERE series_id = ?
         :return:
         """
 
+        self.Connect()
         series_id = self.GetSeriesID(series_meta.ticker_full)
-        if series_id is None:
-            self.CreateSeries(series_meta)
-            series_id = self.GetSeriesID(series_meta.ticker_full)
-        else:
-            if not overwrite:
-                raise NotImplementedError()
-            else:
-                # Delete the existing series
-                cmd = """
-DELETE FROM {0} WHERE series_id = ?""".format(self.TableData)
-                self.Execute(cmd, series_id, commit_after=True)
+        is_new = series_id is None
+        if not (is_new or overwrite):
+            raise NotImplementedError()
+        try:
+            if is_new:
+                self.CreateSeries(series_meta, commit_after=False)
+                series_id = self.GetSeriesID(series_meta.ticker_full)
+            self.LastWriteStatistics = self._WriteObservations(series_id, ser, is_new)
+            self.Connection.commit()
+        except:
+            self.Connection.rollback()
+            raise
+
+    def _WriteObservations(self, series_id, ser, is_new):
+        """
+        Do the changes to the data table for _Write() and _WriteMany(); no commit.
+
+        Returns the write statistics (number of inserts, updates, deletes, and whether the series was replaced).
+
+        :param series_id: int
+        :param ser: pandas.Series
+        :param is_new: bool
+        :return: dict
+        """
         # Cannot write NULL.
         ser = ser.dropna()
-        dates = ser.index
-        # Need to coerce to strings.
-        dates = [econ_platform_core.utils.coerce_date_to_string(x) for x in dates]
-        id_list = [series_id,]*len(dates)
-        info = zip(id_list, dates, ser.values)
-        cmd = """
-        INSERT INTO {0}(series_id, series_dates, series_values) VALUES (?, ?, ?)
-        """.format(self.TableData)
-        self.Execute(cmd, info, commit_after=True, is_many=True)
+        dates = self.ConvertDatesForStorage(ser.index)
+        # sqlite3 does not understand numpy types.
+        valz = ser.values.astype(float).tolist()
+        if is_new or self.WriteMode == 'replace':
+            to_insert = list(zip(dates, valz))
+            to_update = []
+            to_delete = []
+            delete_all = not is_new
+        else:
+            to_insert, to_update, to_delete = self._DiffObservations(series_id, dates, valz)
+            delete_all = False
+        if delete_all:
+            self.Execute('DELETE FROM {0} WHERE series_id = ?'.format(self.TableData), series_id)
+        if len(to_delete) > 0:
+            cmd = 'DELETE FROM {0} WHERE series_id = ? AND series_dates = ?'.format(self.TableData)
+            self.Execute(cmd, [(series_id, d) for d in to_delete], is_many=True)
+        if len(to_update) > 0:
+            cmd = 'UPDATE {0} SET series_values = ? WHERE series_id = ? AND series_dates = ?'.format(
+                self.TableData)
+            self.Execute(cmd, [(v, series_id, d) for d, v in to_update], is_many=True)
+        if len(to_insert) > 0:
+            cmd = 'INSERT INTO {0}(series_id, series_dates, series_values) VALUES (?, ?, ?)'.format(
+                self.TableData)
+            self.Execute(cmd, [(series_id, d, v) for d, v in to_insert], is_many=True)
+        return {'insert': len(to_insert), 'update': len(to_update),
+                'delete': len(to_delete), 'replace': delete_all}
+
+    def _WriteMany(self, series_list):
+        """
+        Write a group of series in a single transaction: the missing SeriesMeta rows are created with one
+        executemany(), then the observations are written, then the last_update/last_refresh times are set.
+
+        LastWriteStatistics holds the totals (and 'series', the number of series written).
+
+        :param series_list: list
+        :return:
+        """
+        self.Connect()
+        if len(series_list) == 0:
+            return
+        # If a ticker appears more than once, the last one wins (as with repeated Write() calls).
+        by_ticker = {}
+        for ser, series_meta in series_list:
+            by_ticker[str(series_meta.ticker_full)] = (ser, series_meta)
+        time_stamp = datetime.datetime.now()
+        totals = {'insert': 0, 'update': 0, 'delete': 0, 'replace': 0, 'series': len(by_ticker)}
+        try:
+            if not self.Connection.in_transaction:
+                self.Execute('BEGIN')
+            series_ids = self._GetSeriesIDMany(list(by_ticker.keys()))
+            new_tickers = [x for x in by_ticker if series_ids.get(x) is None]
+            if len(new_tickers) > 0:
+                self.Execute(self._GetCreateSeriesSQL(),
+                             [self._GetCreateSeriesParams(by_ticker[x][1]) for x in new_tickers], is_many=True)
+                series_ids.update(self._GetSeriesIDMany(new_tickers))
+            new_tickers = set(new_tickers)
+            for ticker_full, (ser, series_meta) in by_ticker.items():
+                stats = self._WriteObservations(series_ids[ticker_full], ser, ticker_full in new_tickers)
+                for k in stats:
+                    totals[k] += int(stats[k])
+            cmd = 'UPDATE {0} SET last_update = ?, last_refresh = ? WHERE series_id = ?'.format(self.TableMeta)
+            self.Execute(cmd, [(time_stamp, time_stamp, series_ids[x]) for x in by_ticker], is_many=True)
+            self.Connection.commit()
+        except:
+            self.Connection.rollback()
+            raise
+        self.LastWriteStatistics = totals
+
+    def _DiffObservations(self, series_id, dates, valz):
+        """
+        Compare new observations with what is on the database.
+
+        The dates are in storage format (ConvertDatesForStorage()), so they can be compared directly with the
+        series_dates column.
+
+        :param series_id: int
+        :param dates: list
+        :param valz: list
+        :return: tuple
+        """
+        cmd = 'SELECT series_dates, series_values FROM {0} WHERE series_id = ?'.format(self.TableData)
+        existing = dict(self.Execute(cmd, series_id).fetchall())
+        to_insert = []
+        to_update = []
+        for d, v in zip(dates, valz):
+            try:
+                old_v = existing.pop(d)
+            except KeyError:
+                to_insert.append((d, v))
+                continue
+            if old_v != v:
+                to_update.append((d, v))
+        # Anything left over is not in the new series.
+        to_delete = list(existing.keys())
+        return to_insert, to_update, to_delete
+
+    def GetAllValidSeriesTickers(self):
+        """
+        Returns a list of all the full tickers on the database.
+
+        :return: list
+        """
+        self.Connect()
+        res = self.Execute('SELECT ticker_full FROM {0} ORDER BY ticker_full'.format(self.TableMeta)).fetchall()
+        return [x[0] for x in res]
 
     def GetSeriesID(self, full_ticker):
+        """
+        Get the series_id for a ticker (full, local, or data type).
+
+        Uses the TickerAlias table (a primary key lookup), if it exists; otherwise the older TickerLookup view.
+
+        :param full_ticker: str
+        :return: int
+        """
         full_ticker = str(full_ticker)
         self.Connect()
-        cmd = """
+        if self.HasAliasTable:
+            cmd = 'SELECT series_id FROM {0} WHERE ticker = ?'.format(self.TableAlias)
+        else:
+            cmd = """
         SELECT series_id FROM {0} WHERE ticker = ? LIMIT 1""".format(self.ViewLookup)
         self.Execute(cmd, full_ticker, commit_after=False)
         res = self.Cursor.fetchall()
@@ -289,27 +841,66 @@ DELETE FROM {0} WHERE series_id = ?""".format(self.TableData)
         else:
             return res[0][0]
 
-    def CreateSeries(self, series_meta):
+    def CreateSeries(self, series_meta, commit_after=True):
         """
 
         :param series_meta: econ_platform_core.SeriesMetadata
+        :param commit_after: bool
         :return:
         """
         # Need to make sure initialised
         self.Connect()
-        create_str = """
+        self.Execute(self._GetCreateSeriesSQL(), *self._GetCreateSeriesParams(series_meta), commit_after=commit_after)
+
+    def _GetCreateSeriesSQL(self):
+        return """
 INSERT INTO {0} (series_provider_code, ticker_full, ticker_query, series_name, series_description, frequency,
 provider_param_string) VALUES
 (?, ?, ?, ?, ?, ?, ?)        
         """.format(self.TableMeta)
-        local_ticker = series_meta.ticker_local
-        self.Execute(create_str, str(series_meta.series_provider_code), str(series_meta.ticker_full),
-                     series_meta.ticker_query, series_meta.series_name , series_meta.series_description,
-                     series_meta.frequency,
-                     econ_platform_core.utils.dict_to_param_string(series_meta.ProviderMetadata),
-                     commit_after=True)
 
-    def Delete(self, series_meta, warn_if_non_existent=True):
+    @staticmethod
+    def _GetCreateSeriesParams(series_meta):
+        """
+        Parameters for the _GetCreateSeriesSQL() insert; all converted to str, so that they can be
+        passed to executemany().
+
+        :param series_meta: econ_platform_core.SeriesMetadata
+        :return: tuple
+        """
+        def clean(x):
+            if issubclass(x.__class__, econ_platform_core.tickers._TickerAbstract):
+                return str(x)
+            return x
+        return (str(series_meta.series_provider_code), str(series_meta.ticker_full),
+                clean(series_meta.ticker_query), series_meta.series_name, series_meta.series_description,
+                clean(series_meta.frequency),
+                econ_platform_core.utils.dict_to_param_string(series_meta.ProviderMetadata))
+
+    def _GetSeriesIDMany(self, ticker_list):
+        """
+        Get the series_id for a list of tickers; returns a dict (missing tickers are not in the dict).
+
+        :param ticker_list: list
+        :return: dict
+        """
+        ticker_list = [str(x) for x in ticker_list]
+        if not self.HasAliasTable:
+            out = {}
+            for ticker in ticker_list:
+                series_id = self.GetSeriesID(ticker)
+                if series_id is not None:
+                    out[ticker] = series_id
+            return out
+        out = {}
+        for pos in range(0, len(ticker_list), self.MaxQueryParameters):
+            block = ticker_list[pos:pos + self.MaxQueryParameters]
+            cmd = 'SELECT ticker, series_id FROM {0} WHERE ticker IN ({1})'.format(
+                self.TableAlias, ', '.join(['?'] * len(block)))
+            out.update(self.Execute(cmd, *block).fetchall())
+        return out
+
+    def _Delete(self, series_meta, warn_if_non_existent=True):
         """
         Deletes a series; if it does not exist, does nothing.
 
@@ -321,6 +912,13 @@ provider_param_string) VALUES
         cmd = """
         DELETE FROM {0} WHERE ticker_full = ?""".format(self.TableMeta)
         self.Connect()
+        # Foreign keys are not enforced (PRAGMA foreign_keys is off), so the ON DELETE CASCADE does not happen.
+        # Clean up the data and the other tickers, otherwise a new series that re-uses the series_id picks up the
+        # old rows. (The delete triggers remove the tickers from TickerAlias.)
+        series_id = self.GetSeriesID(series_meta.ticker_full)
+        if series_id is not None:
+            for table in (self.TableData, self.TableProviderMeta, self.TableLocal, self.TableTickerDataType):
+                self.Execute('DELETE FROM {0} WHERE series_id = ?'.format(table), series_id)
         self.Execute(cmd, str(series_meta.ticker_full), commit_after=False)
         if self.Cursor.rowcount > 1:  # pragma: nocover
             # This should never be hit, but it could happen if the SQL command is mangled.
@@ -332,6 +930,19 @@ provider_param_string) VALUES
                 str(series_meta.ticker_full)))
         self.Connection.commit()
 
+    # Mapping of SeriesMeta columns to SeriesMetadata members. None means special handling.
+    MetaColumnMapper = {
+        'series_id': 'series_id',
+        'series_provider_code': 'series_provider_code',
+        'ticker_query': 'ticker_query',
+        'series_name': 'series_name',
+        'series_description': 'series_description',
+        'frequency': 'frequency',
+        'last_refresh': 'last_refresh',
+        'last_update':  'last_update',
+        'provider_param_string': None
+    }
+
     def _GetMetaFromFullTicker(self, full_ticker):
         """
         Get the metadata for a full ticker.
@@ -340,30 +951,32 @@ provider_param_string) VALUES
         :return: econ_platform_core.SeriesMetadata
         """
         ticker = str(full_ticker)
-        mapper = {
-            'series_id': 'series_id',
-            'series_provider_code': 'series_provider_code',
-            'ticker_query': 'ticker_query',
-            'series_name': 'series_name',
-            'series_description': 'series_description',
-            'frequency': 'frequency',
-            'last_refresh': 'last_refresh',
-            'last_update':  'last_update',
-            'provider_param_string': None
-        }
-        collist = list(mapper.keys())
+        collist = list(self.MetaColumnMapper.keys())
         # LIMIT 1 is redundant, but...
         res = self.SelectColumnList(self.TableMeta, collist, 'ticker_full = ?', ticker, limit_n=1)
+        if len(res) == 0:
+            return self._BuildMeta(full_ticker, None)
+        return self._BuildMeta(full_ticker, res[0])
+
+    def _BuildMeta(self, full_ticker, row):
+        """
+        Create the SeriesMetadata from a row of SeriesMeta columns (in MetaColumnMapper order). If row is None,
+        the series does not exist.
+
+        :param full_ticker: econ_platform_core.tickers.TickerFull
+        :param row: tuple
+        :return: econ_platform_core.SeriesMetadata
+        """
         meta = econ_platform_core.series_metadata.SeriesMetadata()
         meta.ticker_full = full_ticker
         meta.series_provider_code, meta.ticker_query = full_ticker.SplitTicker()
-        if len(res) == 0:
+        if row is None:
             meta.Exists = False
             return meta
         meta.Exists = True
-        for c, val in zip(collist, res[0]):
-            if mapper[c] is not None:
-                meta[mapper[c]] = val
+        for c, val in zip(self.MetaColumnMapper.keys(), row):
+            if self.MetaColumnMapper[c] is not None:
+                meta[self.MetaColumnMapper[c]] = val
             elif 'provider_param_string' == c:
                 meta.ProviderMetadata = econ_platform_core.utils.param_string_to_dict(val)
         # If the refresh is set to NULL, need to return a value way in the past to force an update
@@ -371,6 +984,32 @@ provider_param_string) VALUES
             meta.last_refresh = datetime.datetime(1980, 1, 1)
         return meta
 
+    def _GetMetaMany(self, ticker_list):
+        """
+        Resolve all the full tickers with one SELECT (per block of tickers). Other ticker types are handled by
+        GetMeta().
+
+        :param ticker_list: list
+        :return: list
+        """
+        self.Connect()
+        ticker_objs = [econ_platform_core.tickers.map_string_to_ticker(x) for x in ticker_list]
+        full_list = list(set([str(x) for x in ticker_objs if type(x) is TickerFull]))
+        found = {}
+        collist = list(self.MetaColumnMapper.keys())
+        for pos in range(0, len(full_list), self.MaxQueryParameters):
+            block = full_list[pos:pos + self.MaxQueryParameters]
+            cmd = 'SELECT ticker_full, {0} FROM {1} WHERE ticker_full IN ({2})'.format(
+                ','.join(collist), self.TableMeta, ','.join(['?', ] * len(block)))
+            for row in self.Execute(cmd, *block, commit_after=False).fetchall():
+                found[row[0]] = row[1:]
+        out = []
+        for ticker_obj in ticker_objs:
+            if type(ticker_obj) is TickerFull:
+                out.append(self._BuildMeta(ticker_obj, found.get(str(ticker_obj), None)))
+            else:
+                out.append(self.GetMeta(ticker_obj))
+        return out
 
     def SelectColumnList(self, table, column_list, where_str, where_params, limit_n):
         """
@@ -400,8 +1039,16 @@ provider_param_string) VALUES
         """
         self.LogSQL = True
         self.SetParameters()
-        full_name = self.DatabaseFile
-        self.Connection =  sqlite3.Connection(full_name)
+        self._OpenConnection()
+        existing_file = self.TableExists(self.TableData)
+        if existing_file:
+            # Do not stamp a new version number on top of existing tables.
+            self.SchemaVersion = self.GetSchemaVersion()
+        else:
+            self.SchemaVersion = self.NewSchemaVersion
+        if self.SchemaVersion not in (1, 2):
+            raise econ_platform_core.entity_and_errors.PlatformError(
+                'Unsupported SQLite schema version: {0}'.format(self.SchemaVersion))
         create_1 = """
         CREATE TABLE IF NOT EXISTS {0} (
         series_id INTEGER PRIMARY KEY, 
@@ -425,25 +1072,8 @@ provider_param_string) VALUES
         CREATE UNIQUE INDEX IF NOT EXISTS index_ticker_full ON {0} (ticker_full)
         """.format(self.TableMeta)
         self.Execute(create_2)
-        create_3 = """
-        CREATE TABLE IF NOT EXISTS {0} (
-        series_id INTEGER,
-        series_dates TEXT NOT NULL,
-        series_values REAL NOT NULL,
-        FOREIGN KEY(series_id) REFERENCES {1}(series_id) ON DELETE CASCADE ON UPDATE CASCADE,
-        PRIMARY KEY (series_id, series_dates)
-        )""".format(self.TableData, self.TableMeta)
-        self.Execute(create_3)
-        create_4 = """
-CREATE VIEW ViewSummary as 
-SELECT m.series_id, m.ticker_full, 
- m.series_provider_code, m.ticker_query, m.series_name, m.series_description, 
- m.series_web_page, m.table_info, m.last_update, m.last_refresh, m.last_meta_change,
- min(d.series_dates) as start_date, max(d.series_dates) as end_date 
- from {0} as m, {1} as d
-WHERE m.series_id = d.series_id GROUP BY d.series_id
-                 """.format(self.TableMeta, self.TableData)
-        self.Execute(create_4)
+        self.Execute(self._GetCreateDataTableSQL(self.TableData))
+        self.Execute(self._GetCreateSummaryViewSQL())
         self.Connection.commit()
         create_5 = """
         CREATE TABLE IF NOT EXISTS {0} (
@@ -474,7 +1104,77 @@ WHERE m.series_id = d.series_id GROUP BY d.series_id
                 PRIMARY KEY (ticker_data_type)
                 )""".format(self.TableTickerDataType, self.TableMeta)
         self.Execute(create_8)
-        create_9 = """
+        if existing_file and not self.TableExists(self.TableAlias):
+            # An empty alias table would hide the existing tickers; MigrateTickerAlias() fills it.
+            self.HasAliasTable = False
+        else:
+            for cmd in self._GetTickerAliasSQL():
+                self.Execute(cmd)
+            self.HasAliasTable = True
+        self.Execute(self._GetCreateLookupViewSQL())
+        self.Execute('PRAGMA user_version = {0}'.format(int(self.SchemaVersion)))
+        # self.TestTablesExist()
+        self.Connection.commit()
+
+    def _GetAliasSources(self):
+        """
+        The tables that supply tickers to the alias table: (table name, ticker column, short name for triggers).
+
+        :return: list
+        """
+        return [(self.TableMeta, 'ticker_full', 'meta'),
+                (self.TableLocal, 'ticker_local', 'local'),
+                (self.TableTickerDataType, 'ticker_data_type', 'datatype')]
+
+    def _GetTickerAliasSQL(self):
+        """
+        SQL to create the TickerAlias table, and the triggers that keep it in sync with the ticker columns of the
+        SeriesMeta, TickerLocal and TickerDataType tables.
+
+        The ticker is the primary key, so that a lookup is an index probe. If the same ticker text shows up in two
+        places, the first one in wins (INSERT OR IGNORE).
+
+        :return: list
+        """
+        out = ["""
+        CREATE TABLE IF NOT EXISTS {0} (
+        ticker TEXT NOT NULL PRIMARY KEY,
+        series_id INTEGER NOT NULL
+        ) WITHOUT ROWID""".format(self.TableAlias),
+               'CREATE INDEX IF NOT EXISTS index_alias_series_id ON {0} (series_id)'.format(self.TableAlias)]
+        for table, column, short_name in self._GetAliasSources():
+            info = {'alias': self.TableAlias, 'table': table, 'col': column, 'short': short_name}
+            out.append("""
+        CREATE TRIGGER IF NOT EXISTS {alias}_{short}_insert AFTER INSERT ON {table}
+        WHEN NEW.{col} IS NOT NULL
+        BEGIN
+            INSERT OR IGNORE INTO {alias} (ticker, series_id) VALUES (NEW.{col}, NEW.series_id);
+        END""".format(**info))
+            out.append("""
+        CREATE TRIGGER IF NOT EXISTS {alias}_{short}_update AFTER UPDATE OF {col}, series_id ON {table}
+        BEGIN
+            DELETE FROM {alias} WHERE ticker = OLD.{col} AND series_id = OLD.series_id;
+            INSERT OR IGNORE INTO {alias} (ticker, series_id) SELECT NEW.{col}, NEW.series_id
+            WHERE NEW.{col} IS NOT NULL;
+        END""".format(**info))
+            out.append("""
+        CREATE TRIGGER IF NOT EXISTS {alias}_{short}_delete AFTER DELETE ON {table}
+        BEGIN
+            DELETE FROM {alias} WHERE ticker = OLD.{col} AND series_id = OLD.series_id;
+        END""".format(**info))
+        return out
+
+    def _GetCreateLookupViewSQL(self):
+        """
+        The TickerLookup view. With the alias table, it is just a view on that table (kept for compatibility
+        with external queries).
+
+        :return: str
+        """
+        if self.HasAliasTable:
+            return """
+        CREATE VIEW {0} AS SELECT series_id, ticker FROM {1}""".format(self.ViewLookup, self.TableAlias)
+        return """
                 CREATE VIEW {0} as 
                 SELECT series_id, ticker_full as ticker 
                 FROM {1}
@@ -485,9 +1185,137 @@ WHERE m.series_id = d.series_id GROUP BY d.series_id
                 ORDER BY series_id
                                  """.format(self.ViewLookup, self.TableMeta, self.TableLocal,
                                             self.TableTickerDataType)
-        self.Execute(create_9)
-        # self.TestTablesExist()
-        self.Connection.commit()
+
+    def MigrateTickerAlias(self):
+        """
+        Add the TickerAlias table (and triggers) to a database file created before it existed, and fill it from the
+        existing tickers. The TickerLookup view is re-created on top of the new table. Runs in a single transaction.
+
+        :return: None
+        """
+        with self.WriteLock:
+            self.Connect()
+            if self.HasAliasTable:
+                econ_platform_core.log('SQLite database already has the {0} table'.format(self.TableAlias))
+                return
+            selects = ['SELECT {0} AS ticker, series_id FROM {1}'.format(column, table)
+                       for table, column, _ in self._GetAliasSources()]
+            populate = """
+INSERT OR IGNORE INTO {0} (ticker, series_id)
+SELECT ticker, series_id FROM ({1}) WHERE ticker IS NOT NULL ORDER BY series_id""".format(
+                self.TableAlias, ' UNION ALL '.join(selects))
+            try:
+                self.Execute('BEGIN')
+                for cmd in self._GetTickerAliasSQL():
+                    self.Execute(cmd)
+                self.Execute(populate)
+                self.Execute('DROP VIEW IF EXISTS {0}'.format(self.ViewLookup))
+                self.HasAliasTable = True
+                self.Execute(self._GetCreateLookupViewSQL())
+                self.Connection.commit()
+            except:
+                self.Connection.rollback()
+                self.HasAliasTable = False
+                raise
+
+    def _GetCreateDataTableSQL(self, table_name):
+        """
+        SQL to create the data table, based on self.SchemaVersion.
+
+        :param table_name: str
+        :return: str
+        """
+        if self.SchemaVersion >= 2:
+            # No declared type on series_dates: INTEGER day numbers and REAL model time stay distinct.
+            return """
+        CREATE TABLE IF NOT EXISTS {0} (
+        series_id INTEGER NOT NULL,
+        series_dates NOT NULL,
+        series_values REAL NOT NULL,
+        FOREIGN KEY(series_id) REFERENCES {1}(series_id) ON DELETE CASCADE ON UPDATE CASCADE,
+        PRIMARY KEY (series_id, series_dates)
+        ) WITHOUT ROWID""".format(table_name, self.TableMeta)
+        return """
+        CREATE TABLE IF NOT EXISTS {0} (
+        series_id INTEGER,
+        series_dates TEXT NOT NULL,
+        series_values REAL NOT NULL,
+        FOREIGN KEY(series_id) REFERENCES {1}(series_id) ON DELETE CASCADE ON UPDATE CASCADE,
+        PRIMARY KEY (series_id, series_dates)
+        )""".format(table_name, self.TableMeta)
+
+    def _GetCreateSummaryViewSQL(self):
+        """
+        SQL to create ViewSummary. In schema version 2, day numbers are converted back to ISO dates for display.
+
+        :return: str
+        """
+        if self.SchemaVersion >= 2:
+            start_date = """CASE WHEN typeof(min(d.series_dates)) = 'integer' 
+   THEN date(min(d.series_dates) * 86400, 'unixepoch') ELSE min(d.series_dates) END"""
+            end_date = """CASE WHEN typeof(max(d.series_dates)) = 'integer' 
+   THEN date(max(d.series_dates) * 86400, 'unixepoch') ELSE max(d.series_dates) END"""
+        else:
+            start_date = 'min(d.series_dates)'
+            end_date = 'max(d.series_dates)'
+        return """
+CREATE VIEW ViewSummary as 
+SELECT m.series_id, m.ticker_full, 
+ m.series_provider_code, m.ticker_query, m.series_name, m.series_description, 
+ m.series_web_page, m.table_info, m.last_update, m.last_refresh, m.last_meta_change,
+ {2} as start_date, {3} as end_date 
+ from {0} as m, {1} as d
+WHERE m.series_id = d.series_id GROUP BY d.series_id
+                 """.format(self.TableMeta, self.TableData, start_date, end_date)
+
+    def MigrateSchema(self, target_version=2):
+        """
+        Migrate the database file to a newer schema version. Runs in a single transaction, so
+        a failure leaves the database unchanged.
+
+        Only version 1 -> 2 is supported. Version 1 date strings are converted to day numbers;
+        anything that does not look like an ISO date is taken to be a float (model time axis).
+
+        The file is vacuumed afterwards to reclaim the space used by the old table. Other threads should not be
+        using the database while this runs.
+
+        :param target_version: int
+        :return: None
+        """
+        with self.WriteLock:
+            self.Connect()
+            if self.SchemaVersion == target_version:
+                econ_platform_core.log('SQLite database already at schema version {0}'.format(target_version))
+                return
+            if not (self.SchemaVersion == 1 and target_version == 2):
+                raise econ_platform_core.entity_and_errors.PlatformError(
+                    'Cannot migrate SQLite schema from version {0} to {1}'.format(self.SchemaVersion, target_version))
+            new_table = self.TableData + '_v2'
+            old_version = self.SchemaVersion
+            self.SchemaVersion = target_version
+            try:
+                self.Execute('BEGIN')
+                self.Execute('DROP VIEW IF EXISTS ViewSummary')
+                self.Execute(self._GetCreateDataTableSQL(new_table))
+                cmd = """
+INSERT INTO {0} (series_id, series_dates, series_values)
+SELECT series_id, 
+  CASE WHEN series_dates GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'
+    THEN CAST(julianday(substr(series_dates, 1, 10)) - 2440587.5 AS INTEGER)
+    ELSE CAST(series_dates AS REAL) END,
+  series_values 
+FROM {1}""".format(new_table, self.TableData)
+                self.Execute(cmd)
+                self.Execute('DROP TABLE {0}'.format(self.TableData))
+                self.Execute('ALTER TABLE {0} RENAME TO {1}'.format(new_table, self.TableData))
+                self.Execute(self._GetCreateSummaryViewSQL())
+                self.Execute('PRAGMA user_version = {0}'.format(int(target_version)))
+                self.Connection.commit()
+            except:
+                self.Connection.rollback()
+                self.SchemaVersion = old_version
+                raise
+            self.Execute('VACUUM')
 
     # def _GetLastRefresh(self, ticker_full):
     #     """
@@ -529,6 +1357,25 @@ WHERE m.series_id = d.series_id GROUP BY d.series_id
 
 
 
+def migrate_sqlite3_schema(database_code='SQLITE', target_version=2):
+    """
+    Migrate a SQLite database (specified by database code) to a newer schema, and add the TickerAlias
+    table if it is missing.
+
+    Can be invoked by running the script migrate_sqlite_schema.py in the scripts directory.
+
+    :param database_code: str
+    :param target_version: int
+    :return:
+    """
+    obj = econ_platform_core.Databases[database_code]
+    if not isinstance(obj, DatabaseSqlite3):
+        raise econ_platform_core.entity_and_errors.PlatformError(
+            'Database {0} is not a SQLite database'.format(database_code))
+    obj.MigrateSchema(target_version)
+    obj.MigrateTickerAlias()
+
+
 def create_sqlite3_tables():
     """
     Create the tables if they are not in the database file.
@@ -1,6 +1,32 @@
 """
 Text "database"
 
+Each series is stored in its own file in the [D_TEXT] directory, named after the ticker (see GetBaseName()). Two
+file formats are supported, chosen by the [D_TEXT] format option (for new writes):
+
+- text (default): tab-separated file written by Series.to_csv(), extension ".txt".
+- binary: extension ".bin". A small header, followed by the data as contiguous little-endian arrays:
+    4 bytes   magic (b'EPBN')
+    uint8     format version (1)
+    uint8     index type (0 = int64 day numbers since 1970-01-01; 1 = float64 axis)
+    uint16    length of the full ticker, followed by the ticker (utf-8)
+    int64     number of observations (N)
+    N x int64 (or float64) index, then N x float64 values.
+  Reading is a couple of numpy.fromfile() calls, and the files are about half the size of the text version.
+
+Either format can be read, whatever the setting. When a series is written, the file in the other format (if any)
+is deleted.
+
+The directory also has a manifest file (_manifest.tsv): one line per write (or refresh), with the full ticker,
+file name, file modification time, number of observations and first/last date. Later lines for a ticker replace
+earlier ones. Listing tickers and the last refresh times come from the manifest, rather than opening or stat'ing
+every file. If the manifest is missing, it is rebuilt by scanning the directory; call RebuildManifest() (or run
+scripts/rebuild_text_manifest.py) if files were added or removed by hand. Once the manifest has more than
+ManifestCompactRatio lines per series, it is rewritten with one line per series.
+
+Deleting the file for a series is the way to force a fetch from the provider, so the existence checks for a single
+series (Exists(), GetMeta()) stat the file as well: if it has gone, the manifest entry is dropped, and the series
+does not exist. (Retrieve() does the same, if the file goes in between, and raises TickerNotFoundError.)
 
 Copyright 2019 Brian Romanchuk
 
@@ -17,7 +43,10 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import hashlib
 import os
+import struct
+import numpy
 import pandas
 import datetime
 import pathlib
@@ -35,9 +64,23 @@ class DatabaseText(econ_platform_core.DatabaseManager):
 
 
     """
+    BinaryMagic = b'EPBN'
+    BinaryVersion = 1
+    FileExtensions = {'text': '.txt', 'binary': '.bin'}
+    ManifestName = '_manifest.tsv'
+    ManifestColumns = ('ticker_full', 'file_name', 'mtime', 'row_count', 'first_date', 'last_date')
+    ManifestCompactRatio = 2
+
     def __init__(self):
         super().__init__('Text File Database')
         self.Directory = None
+        self.Format = None
+        # ticker_full (str) -> manifest entry (dict). ManifestSignature is the (size, mtime) of the manifest file
+        # when it was read, so that changes by other processes are picked up.
+        self.Manifest = None
+        self.ManifestSignature = None
+        # Number of lines (not counting the header) in the manifest file.
+        self.ManifestLines = 0
         # The timestamp is automatically set by the OS when writing.
         self.SetsLastUpdateAutomatically = True
 
@@ -45,53 +88,374 @@ class DatabaseText(econ_platform_core.DatabaseManager):
         if self.Directory is None:
             self.Directory = econ_platform_core.utils.parse_config_path(
                 econ_platform_core.PlatformConfiguration['D_TEXT']['directory'])
+        if self.Format is None:
+            fmt = econ_platform_core.PlatformConfiguration['D_TEXT'].get('format', fallback='text').lower()
+            if fmt not in self.FileExtensions:
+                raise econ_platform_core.entity_and_errors.PlatformError(
+                    'Unknown [D_TEXT] format: {0}'.format(fmt))
+            self.Format = fmt
 
-    def GetFileName(self, ticker_full, full_path=True):
+    def GetFileName(self, ticker_full, full_path=True, fmt=None):
         """
         Get the file name associated with a ticker.
+
+        If fmt is None, returns the name of the existing file (if there is one in either format), otherwise
+        the name for the configured format.
+
         :param ticker_full: TickerFull
         :param full_path: bool
+        :param fmt: str
         :return: str
         """
         # This looks crazy, but might get passes a SeriesMeta by accident. My code convention switched around during
         # development...
         if hasattr(ticker_full, 'ticker_full'):
             ticker_full = ticker_full.ticker_full
-        file_only = econ_platform_core.utils.convert_ticker_to_variable(str(ticker_full)) + '.txt'
+        if fmt is None and self.Manifest is not None and str(ticker_full) in self.Manifest:
+            file_only = self.Manifest[str(ticker_full)]['file_name']
+            if full_path:
+                return os.path.join(self.Directory, file_only)
+            return file_only
+        base_name = self.GetBaseName(ticker_full)
+        if fmt is None:
+            fmt = self.Format
+            if self.Directory is not None:
+                for other in self.FileExtensions:
+                    if os.path.exists(os.path.join(self.Directory, base_name + self.FileExtensions[other])):
+                        fmt = other
+                        # Prefer the configured format, if both exist.
+                        if other == self.Format:
+                            break
+        file_only = base_name + self.FileExtensions.get(fmt, '.txt')
         if full_path:
             return os.path.join(self.Directory, file_only)
         else:
             return file_only
 
+    @staticmethod
+    def GetBaseName(ticker_full):
+        """
+        The file name (without extension) for a ticker: the ticker with the special characters replaced by "_".
+
+        That is not one-to-one ("F@A.B", "F@A/B" and "F@A_B" all become "F_A_B"), so the name is only used as is if
+        the ticker can be read back from it (the "@" is the only character replaced, and there was no "_" in the
+        provider code). Otherwise, a hash of the full ticker is added on.
+
+        :param ticker_full: str
+        :return: str
+        """
+        ticker_full = str(ticker_full)
+        base_name = econ_platform_core.utils.convert_ticker_to_variable(ticker_full)
+        if base_name.replace('_', '@', 1) != ticker_full:
+            base_name += '_' + hashlib.sha1(ticker_full.encode('utf-8')).hexdigest()[0:16]
+        return base_name
+
     def Exists(self, ticker_full):
         self.CheckDirectory()
+        if hasattr(ticker_full, 'ticker_full'):
+            ticker_full = ticker_full.ticker_full
+        if self.InManifest(ticker_full):
+            return True
+        # Not in the manifest; only costs a stat.
         full_file = self.GetFileName(ticker_full, full_path=True)
         return os.path.exists(full_file)
 
-    def Retrieve(self, series_meta):
+    def InManifest(self, ticker_full):
+        """
+        Is the series in the manifest, with its file still there? If the file was deleted (by hand), the entry is
+        dropped.
+
+        :param ticker_full: TickerFull
+        :return: bool
+        """
+        manifest = self.LoadManifest()
+        if str(ticker_full) not in manifest:
+            return False
+        if os.path.exists(os.path.join(self.Directory, manifest[str(ticker_full)]['file_name'])):
+            return True
+        self.DropManifestEntry(ticker_full)
+        return False
+
+    def GetManifestFileName(self):
+        return os.path.join(self.Directory, self.ManifestName)
+
+    def LoadManifest(self):
+        """
+        Get the manifest (as a dict keyed by full ticker); re-reads the file only if it changed. If there is no
+        manifest file, it is rebuilt from the directory.
+
+        :return: dict
+        """
+        self.CheckDirectory()
+        fname = self.GetManifestFileName()
+        if not os.path.exists(fname):
+            if not os.path.isdir(self.Directory):
+                return {}
+            return self.RebuildManifest()
+        signature = econ_platform_core.utils.get_file_signature(fname)
+        if self.Manifest is not None and signature == self.ManifestSignature:
+            return self.Manifest
+        manifest = {}
+        num_lines = 0
+        with open(fname, 'r', encoding='utf-8') as f:
+            next(f, None)
+            for line in f:
+                num_lines += 1
+                row = line.rstrip('\n').split('\t')
+                if len(row) != len(self.ManifestColumns):
+                    # Partial line from an interrupted append.
+                    continue
+                entry = dict(zip(self.ManifestColumns, row))
+                entry['mtime'] = float(entry['mtime'])
+                entry['row_count'] = int(entry['row_count'])
+                manifest[entry['ticker_full']] = entry
+        self.Manifest = manifest
+        self.ManifestSignature = signature
+        self.ManifestLines = num_lines
+        self.CompactManifest()
+        return manifest
+
+    def CompactManifest(self):
+        """
+        Rewrite the manifest with one line per series, if it has more than ManifestCompactRatio lines per series.
+        :return:
+        """
+        if self.ManifestLines > self.ManifestCompactRatio * max(len(self.Manifest), 1):
+            econ_platform_core.log_debug('Compacting manifest: %d lines, %d series', self.ManifestLines,
+                                         len(self.Manifest))
+            self.WriteManifest(self.Manifest)
+
+    def WriteManifest(self, manifest):
+        """
+        Replace the manifest file (written to a temporary file, then renamed).
+
+        :param manifest: dict
+        :return:
+        """
+        fname = self.GetManifestFileName()
+        with open(fname + '.tmp', 'w', encoding='utf-8') as f:
+            f.write('\t'.join(self.ManifestColumns) + '\n')
+            for ticker in sorted(manifest):
+                f.write(self._FormatManifestLine(manifest[ticker]))
+        os.replace(fname + '.tmp', fname)
+        self.Manifest = manifest
+        self.ManifestSignature = econ_platform_core.utils.get_file_signature(fname)
+        self.ManifestLines = len(manifest)
+
+    def DropManifestEntry(self, ticker_full):
+        """
+        Remove a series from the manifest (the file is rewritten).
+
+        :param ticker_full: TickerFull
+        :return:
+        """
+        manifest = self.LoadManifest()
+        if str(ticker_full) in manifest:
+            manifest = dict(manifest)
+            del manifest[str(ticker_full)]
+            self.WriteManifest(manifest)
+
+    def RebuildManifest(self):
+        """
+        Scan the directory and rewrite the manifest file. Slow: reads every series.
+
+        :return: dict
+        """
+        self.CheckDirectory()
+        manifest = {}
+        for fname in sorted(os.listdir(self.Directory)):
+            if fname == self.ManifestName or os.path.splitext(fname)[1] not in self.FileExtensions.values():
+                continue
+            full_name = os.path.join(self.Directory, fname)
+            try:
+                meta = self.GetMetaFromFile(full_name)
+                ser = self.ReadFile(full_name)
+            except Exception:
+                continue
+            entry = self._CreateManifestEntry(meta.ticker_full, full_name, ser)
+            if entry['ticker_full'] in manifest:
+                # Both formats on disk; keep the newer.
+                if manifest[entry['ticker_full']]['mtime'] > entry['mtime']:
+                    continue
+            manifest[entry['ticker_full']] = entry
+        self.WriteManifest(manifest)
+        return manifest
+
+    def _CreateManifestEntry(self, ticker_full, full_name, ser=None):
+        """
+        Create a manifest entry for a file. If ser is None (the file was just touched), the series information
+        is copied from the existing entry.
+
+        :param ticker_full: TickerFull
+        :param full_name: str
+        :param ser: pandas.Series
+        :return: dict
+        """
+        entry = {'ticker_full': str(ticker_full), 'file_name': os.path.basename(full_name),
+                 'mtime': os.path.getmtime(full_name), 'row_count': 0, 'first_date': '', 'last_date': ''}
+        if ser is None:
+            old = (self.Manifest or {}).get(str(ticker_full))
+            if old is not None:
+                for k in ('row_count', 'first_date', 'last_date'):
+                    entry[k] = old[k]
+        elif len(ser) > 0:
+            entry['row_count'] = len(ser)
+            entry['first_date'] = econ_platform_core.utils.coerce_date_to_string(ser.index[0])
+            entry['last_date'] = econ_platform_core.utils.coerce_date_to_string(ser.index[-1])
+        return entry
+
+    def _FormatManifestLine(self, entry):
+        return '\t'.join(repr(entry[x]) if x == 'mtime' else str(entry[x]) for x in self.ManifestColumns) + '\n'
+
+    def UpdateManifest(self, ticker_full, full_name, ser=None):
+        """
+        Append the entry for a file that was just written (or touched) to the manifest.
+
+        :param ticker_full: TickerFull
+        :param full_name: str
+        :param ser: pandas.Series
+        :return:
+        """
+        manifest = self.LoadManifest()
+        entry = self._CreateManifestEntry(ticker_full, full_name, ser)
+        line = self._FormatManifestLine(entry).encode('utf-8')
+        fname = self.GetManifestFileName()
+        with open(fname, 'ab') as f:
+            f.write(line)
+        manifest[entry['ticker_full']] = entry
+        signature = econ_platform_core.utils.get_file_signature(fname)
+        if signature[0] == self.ManifestSignature[0] + len(line):
+            self.ManifestSignature = signature
+            self.ManifestLines += 1
+            self.CompactManifest()
+        else:
+            # Someone else appended as well; re-read next time.
+            self.ManifestSignature = None
+
+    def _Retrieve(self, series_meta):
         self.CheckDirectory()
         full_name = self.GetFileName(series_meta, full_path=True)
         econ_platform_core.log_debug('Loading from %s', full_name)
+        try:
+            return self.ReadFile(full_name)
+        except FileNotFoundError:
+            # Deleted by hand; the manifest is out of date.
+            self.DropManifestEntry(series_meta.ticker_full)
+            raise econ_platform_core.entity_and_errors.TickerNotFoundError(
+                'File for {0} is missing: {1}'.format(series_meta.ticker_full, full_name)) from None
+
+    def ReadFile(self, full_name):
+        """
+        Read a series file (either format).
+
+        :param full_name: str
+        :return: pandas.Series
+        """
+        if full_name.endswith(self.FileExtensions['binary']):
+            return self.ReadBinary(full_name)
         df = pandas.read_csv(filepath_or_buffer=full_name, sep='\t', parse_dates=True, index_col=0)
         ser = pandas.Series(df[df.columns[0]])
         return ser
 
+    def ReadBinaryHeader(self, f, full_name):
+        """
+        Read the header of a binary file; returns (full ticker, index type, number of observations).
+
+        :param f: file
+        :param full_name: str
+        :return: tuple
+        """
+        try:
+            magic, version, index_type, ticker_len = struct.unpack('<4sBBH', f.read(8))
+            if magic != self.BinaryMagic or version != self.BinaryVersion:
+                raise ValueError()
+            full_ticker = f.read(ticker_len).decode('utf-8')
+            (num_obs,) = struct.unpack('<q', f.read(8))
+        except (struct.error, ValueError, UnicodeDecodeError):
+            raise econ_platform_core.entity_and_errors.PlatformError('Corrupt file: {0}'.format(full_name)) from None
+        return full_ticker, index_type, num_obs
+
+    def ReadBinary(self, full_name):
+        """
+        Read a series from a binary file.
+
+        :param full_name: str
+        :return: pandas.Series
+        """
+        with open(full_name, 'rb') as f:
+            full_ticker, index_type, num_obs = self.ReadBinaryHeader(f, full_name)
+            if index_type == 0:
+                index = numpy.fromfile(f, dtype='<i8', count=num_obs)
+            else:
+                index = numpy.fromfile(f, dtype='<f8', count=num_obs)
+            values = numpy.fromfile(f, dtype='<f8', count=num_obs)
+        if len(values) != num_obs:
+            raise econ_platform_core.entity_and_errors.PlatformError('Corrupt file: {0}'.format(full_name))
+        if index_type == 0:
+            index = pandas.DatetimeIndex(index.astype('datetime64[D]').astype('datetime64[ns]'))
+        else:
+            index = pandas.Index(index)
+        return pandas.Series(values, index=index, name=full_ticker)
+
+    def WriteBinary(self, ser, full_ticker, full_name):
+        """
+        Write a series to a binary file.
+
+        :param ser: pandas.Series
+        :param full_ticker: str
+        :param full_name: str
+        :return:
+        """
+        if pandas.api.types.is_numeric_dtype(ser.index):
+            index = numpy.asarray(ser.index, dtype='<f8')
+            index_type = 1
+        else:
+            try:
+                index = pandas.DatetimeIndex(pandas.to_datetime(ser.index)).values.astype('datetime64[D]')
+            except (ValueError, TypeError):
+                raise econ_platform_core.entity_and_errors.PlatformError(
+                    'Cannot convert the series index to dates') from None
+            index = index.astype('<i8')
+            index_type = 0
+        values = numpy.asarray(ser.values, dtype='<f8')
+        ticker_bytes = full_ticker.encode('utf-8')
+        with open(full_name, 'wb') as f:
+            f.write(struct.pack('<4sBBH', self.BinaryMagic, self.BinaryVersion, index_type, len(ticker_bytes)))
+            f.write(ticker_bytes)
+            f.write(struct.pack('<q', len(values)))
+            index.tofile(f)
+            values.tofile(f)
+
     def _GetMetaFromFullTicker(self, full_ticker):
         self.CheckDirectory()
+        if self.InManifest(full_ticker):
+            return self._CreateMeta(str(full_ticker))
         full_name = self.GetFileName(full_ticker, full_path=True)
         if not os.path.exists(full_name):
             raise econ_platform_core.entity_and_errors.TickerNotFoundError('Unknown ticker: {0}'.format(full_ticker))
-        return self.GetMetaFromFile(full_name)
+        meta = self.GetMetaFromFile(full_name)
+        # The file could belong to another ticker with the same file name.
+        if str(meta.ticker_full) != str(full_ticker):
+            raise econ_platform_core.entity_and_errors.TickerNotFoundError('Unknown ticker: {0}'.format(full_ticker))
+        return meta
 
     def GetMetaFromFile(self, full_name):
-        # Just read the first line.
-        f = open(full_name, 'r')
-        header = f.readline()
-        header = header.rstrip()
-        try:
-            dummy, full_ticker = header.split('\t')
-        except:
-            raise econ_platform_core.entity_and_errors.PlatformError('Corrupt file: {0}'.format(full_name))
+        if full_name.endswith(self.FileExtensions['binary']):
+            with open(full_name, 'rb') as f:
+                full_ticker = self.ReadBinaryHeader(f, full_name)[0]
+        else:
+            # Just read the first line.
+            with open(full_name, 'r') as f:
+                header = f.readline()
+            header = header.rstrip()
+            try:
+                dummy, full_ticker = header.split('\t')
+            except:
+                raise econ_platform_core.entity_and_errors.PlatformError('Corrupt file: {0}'.format(full_name))
+        return self._CreateMeta(full_ticker)
+
+    @staticmethod
+    def _CreateMeta(full_ticker):
         meta = econ_platform_core.series_metadata.SeriesMetadata()
         meta.ticker_full = econ_platform_core.tickers.TickerFull(full_ticker)
         meta.Exists = True
@@ -101,7 +465,7 @@ class DatabaseText(econ_platform_core.DatabaseManager):
             raise econ_platform_core.entity_and_errors.PlatformError('Invalid full ticker')
         return meta
 
-    def Write(self, ser, series_meta, overwrite=True):
+    def _Write(self, ser, series_meta, overwrite=True):
         """
 
         :param ser: pandas.Series
@@ -112,9 +476,19 @@ class DatabaseText(econ_platform_core.DatabaseManager):
         self.CheckDirectory()
         if not overwrite:
             raise NotImplementedError()
-        full_name = self.GetFileName(series_meta.ticker_full, full_path=True)
+        full_name = self.GetFileName(series_meta.ticker_full, full_path=True, fmt=self.Format)
         econ_platform_core.log_debug('Writing to %s', full_name)
-        ser.to_csv(path_or_buf=full_name, sep='\t', header=True)
+        if self.Format == 'binary':
+            self.WriteBinary(ser, str(series_meta.ticker_full), full_name)
+        else:
+            # The header has to be the full ticker, for GetMetaFromFile().
+            ser.to_csv(path_or_buf=full_name, sep='\t', header=[str(series_meta.ticker_full)])
+        # Get rid of the file in the other format, if it exists.
+        for fmt in self.FileExtensions:
+            other_name = self.GetFileName(series_meta.ticker_full, full_path=True, fmt=fmt)
+            if fmt != self.Format and os.path.exists(other_name):
+                os.remove(other_name)
+        self.UpdateManifest(series_meta.ticker_full, full_name, ser)
 
     def GetAllValidSeriesTickers(self):
         """
@@ -124,15 +498,7 @@ class DatabaseText(econ_platform_core.DatabaseManager):
         :return: list
         """
         self.CheckDirectory()
-        flist = os.listdir(self.Directory)
-        out = []
-        for fname in flist:
-            try:
-                meta = self.GetMetaFromFile(os.path.join(self.Directory, fname))
-                out.append(meta.ticker_full)
-            except:
-                pass
-        return out
+        return [econ_platform_core.tickers.TickerFull(x) for x in sorted(self.LoadManifest().keys())]
 
     def GetLastRefresh(self, ticker_full):
         """
@@ -141,11 +507,16 @@ class DatabaseText(econ_platform_core.DatabaseManager):
         :return: datetime.datatime
         """
         self.CheckDirectory()
+        if hasattr(ticker_full, 'ticker_full'):
+            ticker_full = ticker_full.ticker_full
+        manifest = self.LoadManifest()
+        if str(ticker_full) in manifest:
+            return datetime.datetime.fromtimestamp(manifest[str(ticker_full)]['mtime'])
         file_name = self.GetFileName(ticker_full, full_path=True)
         t = os.path.getmtime(file_name)
         return datetime.datetime.fromtimestamp(t)
 
-    def SetLastRefresh(self, ticker_full, time_stamp=None):
+    def _SetLastRefresh(self, ticker_full, time_stamp=None):
         """
         Set the last refresh date (touch the file). Does not support non-None time_stamp...
         :param ticker_full: TickerFull
@@ -157,8 +528,9 @@ class DatabaseText(econ_platform_core.DatabaseManager):
         if time_stamp is not None:
             raise NotImplementedError('This database does not support setting the refresh date to arbitrary times.')
         pathlib.Path(file_name).touch(exist_ok=True)
+        self.UpdateManifest(ticker_full, file_name)
 
-    def SetLastUpdate(self, ticker_full, time_stamp=None):
+    def _SetLastUpdate(self, ticker_full, time_stamp=None):
         """
         This method should not be called, since this class has SetsLastUpdateAutomatically=True.
         Does the same thing as SetLastRefresh() [which it just calls]
@@ -167,5 +539,5 @@ class DatabaseText(econ_platform_core.DatabaseManager):
         :param time_stamp: datetime.datetime
         :return:
         """
-        self.SetLastRefresh(ticker_full, time_stamp)
+        self._SetLastRefresh(ticker_full, time_stamp)
 
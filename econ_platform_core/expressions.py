@@ -0,0 +1,284 @@
+"""
+expressions.py
+
+Derived series defined by an expression, such as
+
+EXPR(100 * {F@GDPC1} / {F@GDP})
+EXPR(annualised({F@CPIAUCSL}, 12, 12))
+EXPR(splice({F@NEW_SERIES}, {F@OLD_SERIES}))
+
+The User provider handles tickers of the form U@EXPR(...), so that fetch('U@EXPR(...)') creates the series on the
+database like any other User series.
+
+Series are referred to with their full ticker in braces. The expression is parsed into a DAG (identical
+subexpressions become the same node, so they are only evaluated once), all the series are fetched with a single
+fetch_many() call, aligned once on the union of their dates, and then the nodes are evaluated on numpy arrays.
+
+Operators: +, -, *, /, ** and parentheses; numbers are constants.
+
+Functions (see BuiltinFunctions):
+- lag(x, n=1), diff(x, n=1), pct(x, n=1) (percent change), annualised(x, n, periods_per_year) (annualised percent
+  change over n periods), rolling_mean(x, n): these work on the observations of x, not the aligned dates (so that
+  lag(x, 1) of a monthly series is the previous month, even if another series in the expression is daily).
+- log(x), exp(x), abs(x).
+- sum(...), mean(...), min(...), max(...): element by element across the arguments. Missing values are not
+  skipped: the sum of regions only exists where all the regions do.
+- splice(new, old): new, extended back in time with old, scaled to match new at the first common date.
+
+Missing values propagate; the final series has them dropped.
+
+The series in the expression are read from the database that the expression series is written to (for
+fetch('U@EXPR(...)', database='SQL'), the leaves come from 'SQL' as well).
+
+Copyright 2019 Brian Romanchuk
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import ast
+import re
+
+import numpy
+import pandas
+
+import econ_platform_core
+from econ_platform_core.entity_and_errors import PlatformEntity, PlatformError
+
+
+def _lag_observations(x, n):
+    """
+    Shift x by n observations, ignoring the missing values (which stay missing).
+
+    :param x: numpy.ndarray
+    :param n: int
+    :return: numpy.ndarray
+    """
+    mask = ~numpy.isnan(x)
+    vals = x[mask]
+    shifted = numpy.full(len(vals), numpy.nan)
+    if n == 0:
+        shifted = vals
+    elif n > 0:
+        shifted[n:] = vals[:-n]
+    else:
+        shifted[:n] = vals[-n:]
+    out = numpy.full(len(x), numpy.nan)
+    out[mask] = shifted
+    return out
+
+
+def _lag(x, n=1):
+    return _lag_observations(x, _as_int(n))
+
+
+def _diff(x, n=1):
+    return x - _lag_observations(x, _as_int(n))
+
+
+def _pct(x, n=1):
+    return 100. * (x / _lag_observations(x, _as_int(n)) - 1.)
+
+
+def _annualised(x, n, periods_per_year):
+    n = _as_int(n)
+    return 100. * (numpy.power(x / _lag_observations(x, n), float(periods_per_year) / n) - 1.)
+
+
+def _rolling_mean(x, n):
+    n = _as_int(n)
+    if n < 1:
+        raise PlatformError('rolling_mean() window must be positive')
+    mask = ~numpy.isnan(x)
+    vals = x[mask]
+    means = numpy.full(len(vals), numpy.nan)
+    if len(vals) >= n:
+        cumsum = numpy.cumsum(numpy.concatenate(([0.], vals)))
+        means[n - 1:] = (cumsum[n:] - cumsum[:-n]) / n
+    out = numpy.full(len(x), numpy.nan)
+    out[mask] = means
+    return out
+
+
+def _stack(args):
+    return numpy.vstack(numpy.broadcast_arrays(*args))
+
+
+def _splice(new, old):
+    both = ~numpy.isnan(new) & ~numpy.isnan(old)
+    if not both.any():
+        raise PlatformError('splice(): the series have no dates in common')
+    first = numpy.argmax(both)
+    scaled = old * (new[first] / old[first])
+    out = new.copy()
+    out[:first] = scaled[:first]
+    return out
+
+
+def _as_int(n):
+    if isinstance(n, numpy.ndarray) or float(n) != int(n):
+        raise PlatformError('Expected an integer number of periods, got {0}'.format(n))
+    return int(n)
+
+
+# name -> (function, minimum number of arguments, maximum number (None = no limit))
+BuiltinFunctions = {
+    'lag': (_lag, 1, 2),
+    'diff': (_diff, 1, 2),
+    'pct': (_pct, 1, 2),
+    'annualised': (_annualised, 3, 3),
+    'rolling_mean': (_rolling_mean, 2, 2),
+    'log': (numpy.log, 1, 1),
+    'exp': (numpy.exp, 1, 1),
+    'abs': (numpy.abs, 1, 1),
+    'sum': (lambda *args: _stack(args).sum(axis=0), 1, None),
+    'mean': (lambda *args: _stack(args).mean(axis=0), 1, None),
+    'min': (lambda *args: _stack(args).min(axis=0), 1, None),
+    'max': (lambda *args: _stack(args).max(axis=0), 1, None),
+    'splice': (_splice, 2, 2),
+}
+
+_BinaryOperators = {ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/', ast.Pow: '**'}
+
+_OperatorFunctions = {'+': numpy.add, '-': numpy.subtract, '*': numpy.multiply, '/': numpy.divide,
+                      '**': numpy.power}
+
+
+class SeriesExpression(PlatformEntity):
+    """
+    A parsed expression.
+
+    Nodes is a dict: key -> node, where the key is a canonical text version of the subexpression (so identical
+    subexpressions share a node), and the node is a tuple:
+    ('leaf', ticker), ('const', value), ('op', symbol, left_key, right_key), ('neg', key), ('call', name, keys).
+    Order has the keys in evaluation order (children before parents).
+    """
+    LeafPattern = re.compile(r'\{([^{}]+)\}')
+
+    def __init__(self, text):
+        super().__init__()
+        self.Text = str(text).strip()
+        if self.Text.upper().startswith('EXPR(') and self.Text.endswith(')'):
+            self.Text = self.Text[5:-1].strip()
+        self.Leaves = []
+        self.Nodes = {}
+        self.Order = []
+        self.RootKey = None
+        self.Parse()
+
+    def Parse(self):
+        """
+        Replace the {ticker} leaves with variable names, parse with the Python parser, and build the DAG.
+        :return:
+        """
+        names = {}
+
+        def replacer(match):
+            ticker = match.group(1).strip()
+            if ticker not in names:
+                names[ticker] = '_leaf{0}'.format(len(names))
+                self.Leaves.append(ticker)
+            return names[ticker]
+        python_text = self.LeafPattern.sub(replacer, self.Text)
+        if len(self.Leaves) == 0:
+            raise PlatformError('Expression has no series (tickers go in braces): {0}'.format(self.Text))
+        try:
+            tree = ast.parse(python_text, mode='eval')
+        except SyntaxError:
+            raise PlatformError('Cannot parse expression: {0}'.format(self.Text)) from None
+        leaf_names = dict((v, k) for k, v in names.items())
+        self.RootKey = self._Compile(tree.body, leaf_names)
+
+    def _AddNode(self, key, node):
+        if key not in self.Nodes:
+            self.Nodes[key] = node
+            self.Order.append(key)
+        return key
+
+    def _Compile(self, node, leaf_names):
+        """
+        Add the node (and its children) to the DAG, return its key.
+
+        :param node: ast.AST
+        :param leaf_names: dict
+        :return: str
+        """
+        if isinstance(node, ast.Name) and node.id in leaf_names:
+            ticker = leaf_names[node.id]
+            return self._AddNode('{' + ticker + '}', ('leaf', ticker))
+        if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+            return self._AddNode(repr(float(node.value)), ('const', float(node.value)))
+        if isinstance(node, ast.BinOp) and type(node.op) in _BinaryOperators:
+            symbol = _BinaryOperators[type(node.op)]
+            left = self._Compile(node.left, leaf_names)
+            right = self._Compile(node.right, leaf_names)
+            return self._AddNode('(' + left + symbol + right + ')', ('op', symbol, left, right))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            child = self._Compile(node.operand, leaf_names)
+            if isinstance(node.op, ast.UAdd):
+                return child
+            return self._AddNode('(-' + child + ')', ('neg', child))
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and len(node.keywords) == 0:
+            name = node.func.id
+            if name not in BuiltinFunctions:
+                raise PlatformError('Unknown function in expression: {0}'.format(name))
+            _, min_args, max_args = BuiltinFunctions[name]
+            if len(node.args) < min_args or (max_args is not None and len(node.args) > max_args):
+                raise PlatformError('Wrong number of arguments for {0}() in expression: {1}'.format(name, self.Text))
+            keys = [self._Compile(x, leaf_names) for x in node.args]
+            return self._AddNode(name + '(' + ','.join(keys) + ')', ('call', name, keys))
+        raise PlatformError('Not supported in expressions: {0}'.format(ast.dump(node)))
+
+    def Evaluate(self, database='Default'):
+        """
+        Fetch the series (one fetch_many() call) and evaluate.
+
+        :param database: str
+        :return: pandas.Series
+        """
+        data = econ_platform_core.fetch_many(self.Leaves, database=database, return_dict=True)
+        return self.EvaluateData(data)
+
+    def EvaluateData(self, data):
+        """
+        Evaluate, given a dict of the series (keyed by ticker).
+
+        :param data: dict
+        :return: pandas.Series
+        """
+        df = pandas.DataFrame(dict((x, data[x]) for x in self.Leaves)).sort_index()
+        values = {}
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            for key in self.Order:
+                node = self.Nodes[key]
+                if node[0] == 'leaf':
+                    values[key] = df[node[1]].values.astype(float)
+                elif node[0] == 'const':
+                    values[key] = node[1]
+                elif node[0] == 'op':
+                    values[key] = _OperatorFunctions[node[1]](values[node[2]], values[node[3]])
+                elif node[0] == 'neg':
+                    values[key] = -values[node[1]]
+                else:
+                    fn = BuiltinFunctions[node[1]][0]
+                    try:
+                        values[key] = fn(*[values[x] for x in node[2]])
+                    except (TypeError, IndexError):
+                        # Constants passed where a series was expected.
+                        raise PlatformError('Invalid arguments in expression: {0}'.format(key)) from None
+        out = values[self.RootKey]
+        if not isinstance(out, numpy.ndarray):
+            out = numpy.full(len(df.index), out)
+        ser = pandas.Series(out, index=df.index)
+        ser = ser[numpy.isfinite(ser.values)]
+        ser.name = 'EXPR(' + self.Text + ')'
+        return ser
@@ -5,6 +5,11 @@ Place all modules that extend the platform (including monkey-patching the base c
 
 This module creates an load_extensions() function that imports *all* python source (*.py) modules in this directory.
 
+Extensions that just hook in providers or databases can declare the names (the keys in the [ProviderList] and
+[DatabaseList] config sections) in module-level lists: provider_names, database_names. If [Options] LazyExtensions
+is True, main() is not called at start up; it is called the first time one of the codes is used. For this to do
+any good, the heavy imports (provider packages, etc.) need to be inside main(), not at the top of the module.
+
 Will come up more options (a user-configurable list?) later.
 
 Obviously, use at own risk!
@@ -29,9 +34,16 @@ limitations under the License.
 
 import importlib
 import os
+import time
+
+import pandas
 
 import econ_platform_core
 
+# If this environment variable is set (to anything but an empty string), the startup profile entries are also
+# sent to the log as they are recorded.
+ProfileEnvironmentVariable = 'PLATFORM_STARTUP_PROFILE'
+
 
 # This function will be replaced with straight import statements. Only leaving this dynamic
 # since the design is changing rapidly at this stage. Once the core has stabilised, we will just import
@@ -45,6 +57,11 @@ class ExtensionManager(econ_platform_core.PlatformEntity):
 
     This class just offers the interface (for code completion purposes; the real extension manager will be
     defined in extensions.__init__.py
+
+    LazyExtensions holds the names of extensions that have been registered, but whose main() has not been
+    called yet (they move to LoadedExtensions or FailedExtensions when first used).
+
+    StartupProfile holds the timings of the initialisation phases and extension loads (see GetStartupProfile()).
     """
 
     def __init__(self):
@@ -52,9 +69,128 @@ class ExtensionManager(econ_platform_core.PlatformEntity):
         self.LoadedExtensions = []
         self.FailedExtensions = []
         self.DecoratedFailedExtensions = []
+        self.LazyExtensions = []
+        self.StartupProfile = []
+
+    def AddProfileEntry(self, entry_type, name, wall_time, import_time=None, main_time=None, status='', info=''):
+        """
+        Record a timing (in seconds). entry_type is 'Phase' for the steps of init_package(), 'Extension' for
+        extensions.
+
+        :param entry_type: str
+        :param name: str
+        :param wall_time: float
+        :param import_time: float
+        :param main_time: float
+        :param status: str
+        :param info: str
+        :return:
+        """
+        self.StartupProfile.append((entry_type, name, wall_time, import_time, main_time, status, info))
+        if len(os.environ.get(ProfileEnvironmentVariable, '')) > 0:
+            econ_platform_core.log('Startup profile\t{0}\t{1}\twall={2:.4f}\timport={3}\tmain={4}\t{5}\t{6}'.format(
+                entry_type, name, wall_time, _format_time(import_time), _format_time(main_time), status, info))
+
+    def TimePhase(self, name, fn, *args, **kwargs):
+        """
+        Call fn(*args, **kwargs), and record the time as a 'Phase' entry.
+
+        :param name: str
+        :param fn: function
+        :return: whatever fn returns
+        """
+        start = time.perf_counter()
+        out = fn(*args, **kwargs)
+        self.AddProfileEntry('Phase', name, time.perf_counter() - start)
+        return out
+
+    def GetStartupProfile(self):
+        """
+        Return the startup profile as a DataFrame, with times in seconds. (Phase entries have no import/main
+        breakdown.)
+
+        :return: pandas.DataFrame
+        """
+        df = pandas.DataFrame(self.StartupProfile, columns=['Type', 'Name', 'WallTime', 'ImportTime', 'MainTime',
+                                                           'Status', 'Info'])
+        for col in ('WallTime', 'ImportTime', 'MainTime'):
+            df[col] = df[col].astype(float)
+        return df
+
+
+def _format_time(elapsed):
+    if elapsed is None:
+        return ''
+    return '{0:.4f}'.format(elapsed)
+
+
+def _make_lazy_loader(mod, ext_name):
+    """
+    Create the function that is called the first time one of the extension's codes is used.
+
+    :param mod: module
+    :param ext_name: str
+    :return: function
+    """
+    failure = []
+
+    def loader():
+        if len(failure) > 0:
+            # Do not keep retrying a broken import.
+            raise econ_platform_core.PlatformError(failure[0])
+        ext_list = econ_platform_core.ExtensionList
+        if ext_name in ext_list.LazyExtensions:
+            ext_list.LazyExtensions.remove(ext_name)
+        start = time.perf_counter()
+        try:
+            mod.main()
+        except Exception as ex:
+            elapsed = time.perf_counter() - start
+            ext_list.FailedExtensions.append(ext_name)
+            ext_list.DecoratedFailedExtensions.append((ext_name, str(ex)))
+            ext_list.AddProfileEntry('Extension', ext_name, elapsed, main_time=elapsed, status='FAILED',
+                                     info=str(ex))
+            failure.append('Failure loading extension {0}: {1}'.format(ext_name, str(ex)))
+            raise econ_platform_core.PlatformError(failure[0]) from ex
+        elapsed = time.perf_counter() - start
+        ext_list.AddProfileEntry('Extension', ext_name, elapsed, main_time=elapsed, status='Loaded on first use')
+        econ_platform_core.log_debug('Extension %s loaded on first use.', ext_name)
+        ext_list.LoadedExtensions.append(ext_name)
+    return loader
 
 
-def load_extensions():  # pragma: nocover
+def register_lazy_extension(mod, ext_name):
+    """
+    Register the provider and database codes of an extension, so that main() is called when one of them is
+    first used.
+
+    Returns False if the extension does not declare any codes, or a name is missing from the config
+    (in which case the extension should be loaded the usual way, so that any error is seen at start up).
+
+    :param mod: module
+    :param ext_name: str
+    :return: bool
+    """
+    provider_names = getattr(mod, 'provider_names', [])
+    database_names = getattr(mod, 'database_names', [])
+    if len(provider_names) + len(database_names) == 0:
+        return False
+    config = econ_platform_core.PlatformConfiguration
+    try:
+        provider_codes = [(config['ProviderList'][x], x) for x in provider_names]
+        database_codes = [(config['DatabaseList'][x], x) for x in database_names]
+    except KeyError:
+        return False
+    loader = _make_lazy_loader(mod, ext_name)
+    for code, name in provider_codes:
+        econ_platform_core.Providers.AddLazyProvider(code, name, loader)
+    for code, name in database_codes:
+        econ_platform_core.Databases.AddLazyDatabase(code, name, loader)
+    econ_platform_core.ExtensionList.LazyExtensions.append(ext_name)
+    return True
+
+
+def load_extensions(package_name='econ_platform_core.extensions', directory=None):  # pragma: nocover
     """
     Imports all *.py files in this directory (in alphabetical order).
 
@@ -71,24 +207,34 @@ def load_extensions():  # pragma: nocover
     (1) The import itself. If you wish, you can just put a script that is executed.
     (2) If the module has a variable (hopefully a string) with the name 'extension_name', that is used as the extension
     name for display, otherwise it is the name of the text file.
-    (3) If the module has a main() function, it is called.
+    (3) If the module has a main() function, it is called. (Unless the extension declares provider_names or
+    database_names, and LazyExtensions is on; in that case, main() is called on first use.)
+
+    Other packages (econ_platform) call this with their own package name and directory.
 
     Since logging is not yet initialised, things are dumped to console rather than logged. (If you really need logging
-    for debugging purposes, you could turn on logging in the extension.)
+    for debugging purposes, you could turn on logging in the extension.) The import and main() times are recorded
+    in econ_platform_core.ExtensionList (see econ_platform_core.get_startup_profile()).
 
+    :param package_name: str
+    :param directory: str
     :return: list
     """
+    if directory is None:
+        directory = os.path.dirname(__file__)
     # There might be some iteration tools in importlib, but no time to read documentation...
-    this_dir = os.path.dirname(__file__)
-    flist = os.listdir(this_dir)
+    flist = os.listdir(directory)
     # Do alphabetical order
     flist.sort()
     exclusion_list = ['__init__']
     loaded_extensions = []
     failed_extensions = []
     decorated_fails = []
-    use_monkey_example = econ_platform_core.PlatformConfiguration['Options'].getboolean('UseMonkeyPatchExample')
-    use_example_provider = econ_platform_core.PlatformConfiguration['Options'].getboolean('UseExampleProvider')
+    options = econ_platform_core.PlatformConfiguration['Options']
+    use_monkey_example = options.getboolean('UseMonkeyPatchExample')
+    use_example_provider = options.getboolean('UseExampleProvider')
+    use_lazy = options.getboolean('LazyExtensions', fallback=False)
+    profile = econ_platform_core.ExtensionList
     if not use_monkey_example:
         exclusion_list.append('monkey_patch_example')
     if not use_example_provider:
@@ -101,18 +247,35 @@ def load_extensions():  # pragma: nocover
         if fname in exclusion_list:
             continue
         # Import it!
+        start = time.perf_counter()
+        import_time = None
         try:
-            mod = importlib.import_module('econ_platform_core.extensions.' + fname)
+            mod = importlib.import_module(package_name + '.' + fname)
+            import_time = time.perf_counter() - start
             if hasattr(mod, 'extension_name'):
                 fname = str(mod.extension_name)
+            if use_lazy and register_lazy_extension(mod, fname):
+                print('Extension {0} registered.'.format(fname))
+                elapsed = time.perf_counter() - start
+                profile.AddProfileEntry('Extension', fname, elapsed, import_time, elapsed - import_time,
+                                        status='Registered')
+                continue
             # Try running main()
             if hasattr(mod, 'main'):
                 mod.main()
             print('Extension {0} loaded.'.format(fname))
             loaded_extensions.append(fname)
+            elapsed = time.perf_counter() - start
+            profile.AddProfileEntry('Extension', fname, elapsed, import_time, elapsed - import_time, status='Loaded')
         except Exception as ex:
+            elapsed = time.perf_counter() - start
             print('Failure loading extension:', fname)
             print(type(ex), str(ex))
             failed_extensions.append(fname)
             decorated_fails.append((fname, str(ex)))
-    return (loaded_extensions, failed_extensions, decorated_fails)
\ No newline at end of file
+            if import_time is None:
+                profile.AddProfileEntry('Extension', fname, elapsed, elapsed, status='FAILED', info=str(ex))
+            else:
+                profile.AddProfileEntry('Extension', fname, elapsed, import_time, elapsed - import_time,
+                                        status='FAILED', info=str(ex))
+    return (loaded_extensions, failed_extensions, decorated_fails)
@@ -18,15 +18,16 @@ limitations under the License.
 """
 
 import econ_platform_core
-import econ_platform_core.databases.database_text
 
 
 extension_name = 'Text File Database'
+database_names = ['Text File Database']
 
 def main():
     """
     Insert the provider into the platform list
     :return:
     """
+    import econ_platform_core.databases.database_text
     obj = econ_platform_core.databases.database_text.DatabaseText()
     econ_platform_core.Databases.AddDatabase(obj)
\ No newline at end of file
@@ -18,15 +18,16 @@ limitations under the License.
 """
 
 import econ_platform_core
-import econ_platform_core.providers.provider_cansim_csv
 
 
 extension_name = 'CANSIM (CSV)'
+provider_names = ['CANSIM_CSV']
 
 def main():
     """
     Insert the provider into the platform list
     :return:
     """
+    import econ_platform_core.providers.provider_cansim_csv
     obj = econ_platform_core.providers.provider_cansim_csv.ProviderCansim_Csv()
     econ_platform_core.Providers.AddProvider(obj)
\ No newline at end of file
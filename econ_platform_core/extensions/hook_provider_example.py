@@ -18,15 +18,16 @@ limitations under the License.
 """
 
 import econ_platform_core
-import econ_platform_core.providers.provider_example
 
 
 extension_name = 'Example Provider (for testing)'
+provider_names = ['Example Provider']
 
 def main():
     """
     Insert the provider into the platform list
     :return:
     """
+    import econ_platform_core.providers.provider_example
     obj = econ_platform_core.providers.provider_example.ProviderExample()
     econ_platform_core.Providers.AddProvider(obj)
\ No newline at end of file
@@ -15,12 +15,25 @@ but I hope that the BoC will get their act together...
 
 Assumes English webpages and file names.
 
-The workflow of this provider is now quite unusual. I save the list of vectors to a manifest file once the table is
-processed. If this manifest file exists, it is checked for the given vector: if it is not there, a TickerNotFound
-error is thrown. Otherwise, the full file would be scanned looking for the non-existent ticker.
+The workflow of this provider is now quite unusual. When a downloaded table is parsed, all the series in it are
+returned (TableWasFetched), and the files are moved to the archive subdirectory. At the same time, an index of the
+table is saved in the "index" subdirectory:
+- cansim_index.db (SQLite): the table version (CRC/size of the CSV), and for each VECTOR the row span and metadata;
+- <table>_dates.npy, <table>_values.npy: all the observations, sorted by vector and date.
+If there is no new download of a table, fetch() uses the index: an unknown vector raises TickerNotFoundError without
+touching any CSV, and a known vector only reads its own rows (the .npy files are memory-mapped).
 
 Once the update protocol is more advanced, this will be probably be rebuilt.
 
+Parsing modes ([P_STATSCAN] parse_mode):
+- "stream" (default): read the CSV member directly out of the zip file (or the extracted CSV, if it is there)
+  with pandas.read_csv() in chunks of chunk_rows rows. Dates and values are converted a chunk at a time, and the
+  observations are split by VECTOR in one pass at the end. Nothing is extracted to disk unless extract_zip is True.
+- "legacy": the original version; unzip to disk, then walk the CSV row by row (and write a _parsed.txt copy).
+
+The big StatsCan tables have tens of millions of rows, and the row-by-row version takes many minutes and
+several GB of memory.
+
 Copyright 2019 Brian Romanchuk
 
 Licensed under the Apache License, Version 2.0 (the "License");
@@ -40,9 +53,12 @@ limitations under the License.
 
 import zipfile
 import csv
+import json
 import os
+import sqlite3
 import pandas
 import glob
+import numpy
 
 import econ_platform_core
 import econ_platform_core.entity_and_errors
@@ -63,6 +79,13 @@ class ProviderCansim_Csv(econ_platform_core.ProviderWrapper):
         self.BorkedBankOfCanadaTables = ['10100139',]
         self.WebPage = 'https://www150.statcan.gc.ca/n1/en/type/data?MM=1'
         self.MetaMapper = {}
+        config = econ_platform_core.PlatformConfiguration['P_STATSCAN']
+        self.ParseMode = config.get('parse_mode', fallback='stream').lower()
+        if self.ParseMode not in ('stream', 'legacy'):
+            raise econ_platform_core.entity_and_errors.PlatformError(
+                'Unknown [P_STATSCAN] parse_mode: {0}'.format(self.ParseMode))
+        self.ExtractZip = config.getboolean('extract_zip', fallback=False)
+        self.ChunkRows = config.getint('chunk_rows', fallback=500000)
 
 
     def GetTableUrl(self, table):
@@ -106,7 +129,11 @@ class ProviderCansim_Csv(econ_platform_core.ProviderWrapper):
             raise econ_platform_core.entity_and_errors.TickerError('CANSIM_CSV ticker format: <table>|<vector>; invalid ticker = {0}'.format(
                                          query_ticker))
         target = os.path.join(self.DataDirectory, '{0}.csv'.format(table_name))
-        if not os.path.exists(target):
+        zip_name = os.path.join(self.DataDirectory, table_name + self.ZipTail)
+        if not (os.path.exists(target) or os.path.exists(zip_name)):
+            # No new download; use the index built when the table was last parsed.
+            return self.FetchFromIndex(table_name, vector, series_meta)
+        if (self.ParseMode == 'legacy' or self.ExtractZip) and not os.path.exists(target):
             econ_platform_core.log('Table file does not exist, attempting to unzip')
             try:
                 self.UnzipFile(table_name)
@@ -118,8 +145,12 @@ class ProviderCansim_Csv(econ_platform_core.ProviderWrapper):
         self.TableMeta = {}
         self.TableSeries = {}
         self.MetaMapper = {}
-        self.ParseUnzipped(table_name)
-        self.BuildSeries()
+        if self.ParseMode == 'legacy':
+            self.ParseUnzipped(table_name)
+            self.BuildSeries()
+        else:
+            self.ParseStream(table_name)
+        self.WriteIndex(table_name)
         self.ArchiveFiles(table_name)
         try:
             ser = self.TableSeries[str(series_meta.ticker_full)]
@@ -219,6 +250,135 @@ class ProviderCansim_Csv(econ_platform_core.ProviderWrapper):
                         raise ValueError('Huh')
                     f_meta.write('\t'.join(value) + '\n')
 
+    def OpenTableCSV(self, table_name):
+        """
+        Open the table CSV as a binary file object; use the extracted file if it exists, otherwise read the
+        member straight out of the zip file.
+
+        Returns (file object, zip file object or None); caller closes both.
+
+        :param table_name: str
+        :return: tuple
+        """
+        target = os.path.join(self.DataDirectory, '{0}.csv'.format(table_name))
+        if os.path.exists(target):
+            return open(target, 'rb'), None
+        zip_name = os.path.join(self.DataDirectory, table_name + self.ZipTail)
+        log('Reading %s directly from %s', table_name + '.csv', zip_name)
+        myzip = zipfile.ZipFile(zip_name, 'r')
+        try:
+            return myzip.open(table_name + '.csv'), myzip
+        except KeyError:
+            myzip.close()
+            raise econ_platform_core.entity_and_errors.PlatformError(
+                '{0} does not contain {1}.csv'.format(zip_name, table_name)) from None
+
+    @staticmethod
+    def ParseDatesVectorized(date_strings):
+        """
+        Vectorised version of ParseDate(): "YYYY-MM" is aligned to the first of the month, "YYYY-MM-DD" is
+        parsed as is.
+
+        :param date_strings: pandas.Series
+        :return: numpy.ndarray (datetime64[ns])
+        """
+        lengths = date_strings.str.len()
+        out = numpy.empty(len(date_strings), dtype='datetime64[ns]')
+        is_monthly = (lengths == 7).values
+        is_daily = (lengths == 10).values
+        if not (is_monthly | is_daily).all():
+            bad = date_strings[~(is_monthly | is_daily)].iloc[0]
+            raise NotImplementedError('Unknown CANSIM date format: {0}'.format(bad))
+        if is_monthly.any():
+            out[is_monthly] = pandas.to_datetime(date_strings[is_monthly], format='%Y-%m').values
+        if is_daily.any():
+            out[is_daily] = pandas.to_datetime(date_strings[is_daily], format='%Y-%m-%d').values
+        return out
+
+    def ParseStream(self, table_name):
+        """
+        Chunked, vectorised version of ParseUnzipped() + BuildSeries(). Fills TableSeries and TableMeta
+        (keyed by full ticker), and writes the _snapshot.txt file. Does not write a _parsed.txt copy.
+
+        :param table_name: str
+        :return:
+        """
+        is_borked_file = table_name in self.BorkedBankOfCanadaTables
+        # Accumulate the filtered columns chunk by chunk. Only the first row per vector (for the metadata) and the
+        # last row (for the snapshot file) are kept as text.
+        vector_chunks = []
+        date_chunks = []
+        value_chunks = []
+        first_rows = {}
+        last_rows = {}
+        header = None
+        f_csv, myzip = self.OpenTableCSV(table_name)
+        try:
+            # Everything is read as text, so that the metadata matches what the csv module produced.
+            reader = pandas.read_csv(f_csv, dtype=str, keep_default_na=False, chunksize=self.ChunkRows,
+                                     encoding='utf-8')
+            for chunk in reader:
+                if header is None:
+                    header = [x.replace('"', '') for x in chunk.columns]
+                    header = [econ_platform_core.utils.remove_non_ascii(x) for x in header]
+                    try:
+                        col_names = [header[econ_platform_core.utils.entry_lookup(x, header, case_sensitive=False)]
+                                     for x in ('vector', 'ref_date', 'value')]
+                    except KeyError:
+                        print('CANSIM CSV format changed!')
+                        raise
+                    vector_name, date_name, value_name = col_names
+                chunk.columns = header
+                values = pandas.to_numeric(chunk[value_name], errors='coerce').values
+                # If we cannot convert to float, drop the row. (Same for the 0's in borked files.)
+                keep = ~numpy.isnan(values)
+                if is_borked_file:
+                    keep &= (values != 0.)
+                chunk = chunk[keep]
+                if len(chunk) == 0:
+                    continue
+                vector_chunks.append(chunk[vector_name].values)
+                date_chunks.append(self.ParseDatesVectorized(chunk[date_name]))
+                value_chunks.append(values[keep])
+                vector_col = header.index(vector_name)
+                for row in chunk.drop_duplicates(vector_name, keep='first').itertuples(index=False, name=None):
+                    if row[vector_col] not in first_rows:
+                        first_rows[row[vector_col]] = row
+                for row in chunk.drop_duplicates(vector_name, keep='last').itertuples(index=False, name=None):
+                    last_rows[row[vector_col]] = row
+        finally:
+            f_csv.close()
+            if myzip is not None:
+                myzip.close()
+        if header is None:
+            raise econ_platform_core.entity_and_errors.PlatformError('Table {0} is empty'.format(table_name))
+        vector_list = sorted(last_rows.keys())
+        with open(os.path.join(self.DataDirectory, '{0}_snapshot.txt'.format(table_name)), 'w') as f_meta:
+            f_meta.write(('\t'.join(header)) + '\n')
+            for v in vector_list:
+                f_meta.write('\t'.join(last_rows[v]) + '\n')
+        if len(vector_list) == 0:
+            return
+        vectors = numpy.concatenate(vector_chunks)
+        dates = numpy.concatenate(date_chunks)
+        values = numpy.concatenate(value_chunks)
+        # Sort by (vector, date), then split on the vector boundaries.
+        codes, uniques = pandas.factorize(vectors)
+        order = numpy.lexsort((dates, codes))
+        codes = codes[order]
+        dates = dates[order]
+        values = values[order]
+        breaks = numpy.flatnonzero(numpy.diff(codes)) + 1
+        starts = numpy.concatenate(([0], breaks))
+        ends = numpy.concatenate((breaks, [len(codes)]))
+        for start, end in zip(starts, ends):
+            vector = uniques[codes[start]]
+            meta = self.CreateMetadata(table_name, first_rows[vector], header)
+            ticker_full = str(meta.ticker_full)
+            ser = pandas.Series(values[start:end], index=pandas.DatetimeIndex(dates[start:end]), name=ticker_full)
+            self.TableSeries[ticker_full] = ser
+            self.TableMeta[ticker_full] = meta
+
     def CreateMetadata(self, table_name, row, header):
         if len(self.MetaMapper) == 0:
             ignore_list = ('REF_DATE', 'VALUE')
@@ -289,6 +449,135 @@ class ProviderCansim_Csv(econ_platform_core.ProviderWrapper):
         self.TableMeta = new_meta
         self.TableSeries = new_series
 
+    def GetIndexDirectory(self):
+        return os.path.join(self.DataDirectory, 'index')
+
+    def ConnectIndex(self):
+        """
+        Open the SQLite index file (creating the directory and tables if needed).
+
+        :return: sqlite3.Connection
+        """
+        index_dir = self.GetIndexDirectory()
+        if not os.path.exists(index_dir):
+            os.mkdir(index_dir)
+        conn = sqlite3.connect(os.path.join(index_dir, 'cansim_index.db'))
+        conn.execute("""CREATE TABLE IF NOT EXISTS TableVersion (
+                        table_name TEXT PRIMARY KEY,
+                        version TEXT NOT NULL,
+                        num_rows INTEGER NOT NULL) WITHOUT ROWID""")
+        conn.execute("""CREATE TABLE IF NOT EXISTS VectorIndex (
+                        table_name TEXT NOT NULL,
+                        vector TEXT NOT NULL,
+                        row_start INTEGER NOT NULL,
+                        row_end INTEGER NOT NULL,
+                        meta TEXT NOT NULL,
+                        PRIMARY KEY (table_name, vector)) WITHOUT ROWID""")
+        return conn
+
+    def GetTableVersion(self, table_name):
+        """
+        Version string for the downloaded table CSV. Uses the CRC and size from the zip directory (no
+        decompression needed), or the size and modification time of an extracted CSV.
+
+        :param table_name: str
+        :return: str
+        """
+        target = os.path.join(self.DataDirectory, '{0}.csv'.format(table_name))
+        zip_name = os.path.join(self.DataDirectory, table_name + self.ZipTail)
+        if os.path.exists(zip_name):
+            with zipfile.ZipFile(zip_name, 'r') as myzip:
+                try:
+                    info = myzip.getinfo(table_name + '.csv')
+                    return 'zip:{0:08x}:{1}'.format(info.CRC, info.file_size)
+                except KeyError:
+                    pass
+        stat = os.stat(target)
+        return 'csv:{0}:{1}'.format(stat.st_size, stat.st_mtime_ns)
+
+    def WriteIndex(self, table_name):
+        """
+        Save the parsed table (TableSeries, TableMeta) to the index. Must be called before ArchiveFiles(),
+        since the version comes from the downloaded file.
+
+        :param table_name: str
+        :return:
+        """
+        version = self.GetTableVersion(table_name)
+        rows = []
+        date_chunks = []
+        value_chunks = []
+        pos = 0
+        for ticker_full in sorted(self.TableSeries.keys()):
+            ser = self.TableSeries[ticker_full]
+            meta = self.TableMeta[ticker_full]
+            # The legacy parser has ISO strings in the index.
+            date_chunks.append(pandas.DatetimeIndex(ser.index).values.astype('datetime64[D]'))
+            value_chunks.append(numpy.asarray(ser.values, dtype=numpy.float64))
+            info = {'ProviderMetadata': meta.ProviderMetadata, 'series_name': meta.series_name,
+                    'series_description': meta.series_description}
+            rows.append((table_name, meta.ProviderMetadata['VECTOR'], pos, pos + len(ser), json.dumps(info)))
+            pos += len(ser)
+        index_dir = self.GetIndexDirectory()
+        conn = self.ConnectIndex()
+        try:
+            for name, chunks, dtype in (('dates', date_chunks, 'datetime64[D]'),
+                                        ('values', value_chunks, numpy.float64)):
+                fname = os.path.join(index_dir, '{0}_{1}.npy'.format(table_name, name))
+                if len(chunks) > 0:
+                    arr = numpy.concatenate(chunks)
+                else:
+                    arr = numpy.empty(0, dtype=dtype)
+                numpy.save(fname + '.tmp.npy', arr)
+                os.replace(fname + '.tmp.npy', fname)
+            with conn:
+                conn.execute('DELETE FROM VectorIndex WHERE table_name = ?', (table_name,))
+                conn.executemany('INSERT INTO VectorIndex VALUES (?, ?, ?, ?, ?)', rows)
+                conn.execute('INSERT OR REPLACE INTO TableVersion VALUES (?, ?, ?)', (table_name, version, pos))
+        finally:
+            conn.close()
+        log('Indexed table %s: %i vectors, %i rows', table_name, len(rows), pos)
+
+    def FetchFromIndex(self, table_name, vector, series_meta):
+        """
+        Fetch a single vector using the index; only reads the rows for the vector.
+
+        :param table_name: str
+        :param vector: str
+        :param series_meta: econ_platform_core.SeriesMetadata
+        :return: tuple
+        """
+        conn = self.ConnectIndex()
+        try:
+            version = conn.execute('SELECT version FROM TableVersion WHERE table_name = ?', (table_name,)).fetchone()
+            row = conn.execute('SELECT row_start, row_end, meta FROM VectorIndex WHERE table_name = ? AND vector = ?',
+                               (table_name, vector)).fetchone()
+        finally:
+            conn.close()
+        if version is None:
+            raise econ_platform_core.entity_and_errors.PlatformError(
+                'Table {0} needs to be downloaded as a zip file into {1}'.format(table_name, self.DataDirectory))
+        if row is None:
+            raise econ_platform_core.entity_and_errors.TickerNotFoundError(
+                '{0} was not found (table {1} version {2})'.format(str(series_meta.ticker_full), table_name,
+                                                                   version[0]))
+        row_start, row_end, info = row
+        info = json.loads(info)
+        index_dir = self.GetIndexDirectory()
+        dates = numpy.load(os.path.join(index_dir, '{0}_dates.npy'.format(table_name)), mmap_mode='r')
+        values = numpy.load(os.path.join(index_dir, '{0}_values.npy'.format(table_name)), mmap_mode='r')
+        meta = econ_platform_core.series_metadata.SeriesMetadata()
+        meta.ProviderMetadata = info['ProviderMetadata']
+        meta.series_name = info['series_name']
+        meta.series_description = info['series_description']
+        meta.ticker_query = tickers.TickerFetch('{0}|{1}'.format(table_name, vector))
+        meta.series_provider_code = tickers.TickerProviderCode(self.ProviderCode)
+        meta.ticker_full = tickers.create_ticker_full(meta.series_provider_code, meta.ticker_query)
+        ser = pandas.Series(numpy.array(values[row_start:row_end]),
+                            index=pandas.DatetimeIndex(numpy.array(dates[row_start:row_end], dtype='datetime64[ns]')),
+                            name=str(meta.ticker_full))
+        return ser, meta
+
     def ArchiveFiles(self, table_name):
         """
         Move all the files associated with a table to the archive subdirectory.
@@ -6,6 +6,20 @@ your own class if this gets complicated.
 
 2021-06-21: Added the ability to create tickers that are "functions."
 
+User series are memoised: the provider records which series the function read (via
+econ_platform_core.DependencyRecorder), along with a hash of their data. (Not the last_update field: that moves
+every time a provider rewrites a series, even if nothing changed.) When the series is updated, the inputs are
+fetched (which updates them if needed); if none of them changed, NoDataError is raised, and the update protocol
+keeps the stored series.
+The memo is kept for each (database, full ticker), since each database has its own copy of the series. It also
+records the function that created the series (name and a hash of its code; the expression text for EXPR(...)),
+so that the series is recomputed if the function is changed.
+The memo is kept in the JSON file [P_USER] memo_file; set [P_USER] memoize=False to always recompute.
+
+Tickers of the form U@EXPR(...) are expressions of other series (see econ_platform_core.expressions), such as
+U@EXPR(100 * {F@GDPC1} / {F@GDP}). The series in the expression come from the same database as the expression
+series.
+
 Copyright 2019 Brian Romanchuk
 
 Licensed under the Apache License, Version 2.0 (the "License");
@@ -21,8 +35,17 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import hashlib
+import json
+import os
+import types
+
+import pandas
+
 import econ_platform_core
 import econ_platform_core.entity_and_errors
+import econ_platform_core.expressions
+import econ_platform_core.utils
 
 
 class ProviderUser(econ_platform_core.ProviderWrapper):
@@ -30,6 +53,13 @@ class ProviderUser(econ_platform_core.ProviderWrapper):
         super(ProviderUser, self).__init__(name='User')
         self.SeriesMapper = {}
         self.FunctionMapper = {}
+        # User series are built from other series, via fetch(); keep them in the main thread.
+        self.RefreshInParallel = False
+        # '<database code>\t<full ticker>' -> {'Function': identity of the function,
+        #                                     'Inputs': {'<database code>\t<full ticker>': hash}}
+        # Loaded from the memo file on first use.
+        self.Memo = None
+        self.MemoFile = None
 
     def MapTicker(self, query_ticker):
         """
@@ -51,6 +81,9 @@ class ProviderUser(econ_platform_core.ProviderWrapper):
         :return: pandas.Series
         """
         query_ticker = str(series_meta.ticker_query)
+        if query_ticker.upper().startswith('EXPR(') and query_ticker.endswith(')'):
+            return self.CallMemoised(series_meta, self.EvaluateExpression, series_meta, query_ticker,
+                                     function_id='EXPR:' + query_ticker)
         if '(' in query_ticker:
             # The series ticker corresponds to a function.
             try:
@@ -63,9 +96,188 @@ class ProviderUser(econ_platform_core.ProviderWrapper):
             except KeyError:
                 raise econ_platform_core.entity_and_errors.TickerNotFoundError(
                     'There is no function that handles the query ticker: {0}'.format(query_ticker)) from None
-            ser = fn(series_meta, fn_args)
-            return ser
+            return self.CallMemoised(series_meta, fn, series_meta, fn_args)
         else:
             fn = self.MapTicker(query_ticker)
-            ser = fn(series_meta)
-            return ser
+            return self.CallMemoised(series_meta, fn, series_meta)
+
+    @staticmethod
+    def EvaluateExpression(series_meta, expression):
+        """
+        Evaluate an EXPR(...) ticker. The series are fetched from the database that the expression series is
+        going to (the default database, if that is not known).
+
+        :param series_meta: econ_platform_core.SeriesMetadata
+        :param expression: str
+        :return: tuple
+        """
+        expr = econ_platform_core.expressions.SeriesExpression(expression)
+        ser = expr.Evaluate(database=series_meta.DatabaseCode or 'Default')
+        series_meta.series_name = expression
+        series_meta.series_description = 'Calculated series: ' + expression
+        return ser, series_meta
+
+    def CallMemoised(self, series_meta, fn, *args, function_id=None):
+        """
+        Call the user function, unless the series is on the database, the function is the same, and none of the
+        series it read last time have changed, in which case NoDataError is raised.
+
+        :param series_meta: econ_platform_core.SeriesMetadata
+        :param fn: function
+        :param args: arguments passed to fn
+        :param function_id: str (if None, from GetFunctionIdentity(fn))
+        :return: pandas.Series (or whatever fn returns)
+        """
+        if not self.GetMemoize():
+            return fn(*args)
+        memo_key = series_meta.DatabaseCode + '\t' + str(series_meta.ticker_full)
+        if function_id is None:
+            function_id = self.GetFunctionIdentity(fn)
+        if series_meta.Exists and self.InputsUnchanged(memo_key, function_id):
+            raise econ_platform_core.entity_and_errors.NoDataError(
+                'Inputs of {0} have not changed'.format(series_meta.ticker_full))
+        with econ_platform_core.DependencyRecorder() as recorder:
+            out = fn(*args)
+        memo = self.GetMemo()
+        if len(recorder.Dependencies) > 0:
+            memo[memo_key] = {'Function': function_id, 'Inputs': self.GetStamps(recorder.Dependencies)}
+            self.SaveMemo()
+        elif memo_key in memo:
+            del memo[memo_key]
+            self.SaveMemo()
+        return out
+
+    @staticmethod
+    def GetFunctionIdentity(fn):
+        """
+        Identify a user function: module, name and a hash of its code (including the constants and any nested
+        functions). Objects without code get their repr(), which usually changes every session (so the series is
+        recomputed once per session).
+
+        :param fn: function
+        :return: str
+        """
+        code = getattr(fn, '__code__', None)
+        if code is None:
+            return repr(fn)
+        hasher = hashlib.sha1()
+
+        def add_code(code_obj):
+            hasher.update(code_obj.co_code)
+            hasher.update(repr(code_obj.co_names).encode('utf-8'))
+            for const in code_obj.co_consts:
+                if isinstance(const, types.CodeType):
+                    add_code(const)
+                else:
+                    hasher.update(repr(const).encode('utf-8'))
+        add_code(code)
+        return '{0}.{1}:{2}'.format(getattr(fn, '__module__', ''), getattr(fn, '__qualname__', ''),
+                                    hasher.hexdigest())
+
+    def InputsUnchanged(self, memo_key, function_id):
+        """
+        Fetch the inputs recorded for a series (so that they are updated if needed), and compare their hashes
+        to the memo. Any problem means that the series is recomputed (which will raise the error, if it persists).
+
+        :param memo_key: str
+        :param function_id: str
+        :return: bool
+        """
+        entry = self.GetMemo().get(memo_key)
+        # Entries from older versions are not dicts with a 'Function'.
+        if not isinstance(entry, dict) or entry.get('Function') != function_id:
+            return False
+        old_stamps = entry.get('Inputs')
+        if not old_stamps:
+            return False
+        by_database = {}
+        for k in old_stamps:
+            database_code, input_ticker = k.split('\t', 1)
+            by_database.setdefault(database_code, []).append(input_ticker)
+        # noinspection PyPep8
+        try:
+            dependencies = {}
+            # If this series is being read by another user series, its inputs are not inputs of the other series,
+            # so keep them out of the active recorder.
+            with econ_platform_core.DependencyRecorder():
+                for database_code, input_tickers in by_database.items():
+                    fetched = econ_platform_core.fetch_many(input_tickers, database=database_code,
+                                                            return_dict=True)
+                    for input_ticker in input_tickers:
+                        dependencies[(database_code, input_ticker)] = fetched[input_ticker]
+            new_stamps = self.GetStamps(dependencies)
+        except:
+            econ_platform_core.log_last_error(just_info=True)
+            return False
+        return new_stamps == old_stamps
+
+    @staticmethod
+    def GetStamps(dependencies):
+        """
+        Get the stamps (hash of the dates and values) for a set of series that were read.
+
+        The same series can come back with a different index type (datetime.date objects from a provider, a
+        DatetimeIndex from the database) or dtype, so the dates are hashed as datetime64[ns] and the values as float.
+
+        :param dependencies: dict
+        :return: dict
+        """
+        out = {}
+        for (database_code, input_ticker), ser in dependencies.items():
+            ser = ser.dropna()
+            hasher = hashlib.sha1()
+            try:
+                hasher.update(pandas.to_datetime(ser.index).values.astype('datetime64[ns]').tobytes())
+            except (TypeError, ValueError):
+                # Not a date axis.
+                hasher.update(pandas.util.hash_pandas_object(ser.index, index=False).values.tobytes())
+            hasher.update(ser.values.astype(float).tobytes())
+            out[database_code + '\t' + input_ticker] = hasher.hexdigest()
+        return out
+
+    def GetMemoize(self):
+        """
+        Is memoisation on? ([P_USER] memoize)
+        :return: bool
+        """
+        try:
+            return econ_platform_core.PlatformConfiguration['P_USER'].getboolean('memoize', fallback=False)
+        except KeyError:
+            return False
+
+    def GetMemo(self):
+        """
+        Get the memo dict, loading it from the memo file the first time.
+        :return: dict
+        """
+        if self.Memo is None:
+            self.Memo = {}
+            try:
+                self.MemoFile = econ_platform_core.utils.parse_config_path(
+                    econ_platform_core.PlatformConfiguration['P_USER']['memo_file'])
+            except KeyError:
+                self.MemoFile = ''
+            if len(self.MemoFile) > 0 and os.path.exists(self.MemoFile):
+                # noinspection PyPep8
+                try:
+                    with open(self.MemoFile, 'r') as f:
+                        self.Memo = json.load(f)
+                except:
+                    econ_platform_core.log_warning('Could not read user series memo file %s', self.MemoFile)
+        return self.Memo
+
+    def SaveMemo(self):
+        """
+        Write the memo file (if there is one). Written to a temporary file first, so that a crash does not
+        leave a truncated file.
+        :return:
+        """
+        if not self.MemoFile:
+            return
+        directory = os.path.dirname(self.MemoFile)
+        if len(directory) > 0 and not os.path.exists(directory):
+            os.makedirs(directory)
+        tmp_name = self.MemoFile + '.tmp'
+        with open(tmp_name, 'w') as f:
+            json.dump(self.Memo, f, indent=1, sort_keys=True)
+        os.replace(tmp_name, self.MemoFile)
@@ -0,0 +1,249 @@
+"""
+refresh_engine.py
+
+Bulk refresh of stale series, with the provider fetches running in a thread pool.
+
+Use econ_platform_core.refresh(ticker_list) or econ_platform_core.refresh_all() rather than creating the
+RefreshEngine directly.
+
+How it works:
+- The metadata are resolved in bulk (GetMetaMany()), and the update protocol decides which series are stale
+  (UpdateProtocol.NeedsUpdate()). Series that are not on the database are always fetched.
+- Each stale series is handed to a worker thread, which reads the stored series for an incremental fetch
+  (UpdateProtocol.GetIncrementalStart()) and calls the provider (UpdateProtocol.FetchFromProvider()). The
+  number of simultaneous fetches for each provider is limited by a semaphore, set in the config file.
+- The main thread is the only writer: it writes each result to the database (UpdateProtocol.WriteFetched())
+  as it comes back. (This also keeps the database connections in the thread that created them.)
+- Providers with RefreshInParallel set to False (such as the User provider, which builds series from other
+  series) are handled in the main thread, after the parallel fetches are done.
+
+Config:
+
+[Refresh]
+max_workers = 16
+default_concurrency = 1
+[RefreshConcurrency]
+F = 8
+D = 4
+
+The default concurrency is 1 per provider, so that providers that fetch entire tables
+(which is done with data members on the provider object) are safe. Only raise the limit for providers
+whose fetch() does not keep state on the object.
+
+Copyright 2019 Brian Romanchuk
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import concurrent.futures
+import threading
+from logging import debug as log_debug
+
+import econ_platform_core
+from econ_platform_core.entity_and_errors import PlatformEntity, NoDataError
+
+
+class RefreshEngine(PlatformEntity):
+    """
+    Refresh a list of series. After Refresh() is called, the status of each ticker is in Results:
+
+    - 'fresh': not stale, nothing done.
+    - 'updated': fetched and written.
+    - 'unchanged': fetched, but no new data (marked as refreshed).
+    - 'table': written as part of a table fetched for another series.
+    - 'skipped': push-only series.
+    - 'failed': see Errors[ticker] for the exception.
+    """
+    def __init__(self, database='Default'):
+        super().__init__()
+        self.DatabaseManager = econ_platform_core.Databases[database]
+        self.Protocol = econ_platform_core.UpdateProtocolList['DEFAULT']
+        config = econ_platform_core.PlatformConfiguration
+        try:
+            self.MaxWorkers = config['Refresh'].getint('max_workers', fallback=16)
+            self.DefaultConcurrency = config['Refresh'].getint('default_concurrency', fallback=1)
+        except KeyError:
+            self.MaxWorkers = 16
+            self.DefaultConcurrency = 1
+        self.ProviderConcurrency = {}
+        try:
+            for code, limit in config['RefreshConcurrency'].items():
+                self.ProviderConcurrency[code.upper()] = int(limit)
+        except KeyError:
+            pass
+        self.Semaphores = {}
+        self.Results = {}
+        self.Errors = {}
+        # Full tickers that have been covered by a table fetch (updated by the worker threads).
+        self.TableTickers = set()
+        self.TableLock = threading.Lock()
+
+    def GetSemaphore(self, provider_code):
+        """
+        Get the semaphore that limits concurrent fetches for a provider.
+
+        :param provider_code: str
+        :return: threading.Semaphore
+        """
+        provider_code = str(provider_code).upper()
+        if provider_code not in self.Semaphores:
+            limit = self.ProviderConcurrency.get(provider_code, self.DefaultConcurrency)
+            self.Semaphores[provider_code] = threading.Semaphore(max(limit, 1))
+        return self.Semaphores[provider_code]
+
+    def FindStale(self, ticker_list):
+        """
+        Get the (ticker, series_meta) pairs that need to be fetched. Fresh series are marked in Results.
+
+        :param ticker_list: list
+        :return: list
+        """
+        ticker_list = list(dict.fromkeys([str(x) for x in ticker_list]))
+        meta_list = self.DatabaseManager.GetMetaMany(ticker_list)
+        out = []
+        for ticker, series_meta in zip(ticker_list, meta_list):
+            series_meta.AssertValid()
+            if series_meta.Exists and not self.Protocol.NeedsUpdate(series_meta, self.DatabaseManager):
+                self.Results[ticker] = 'fresh'
+            else:
+                out.append((ticker, series_meta))
+        return out
+
+    def Refresh(self, ticker_list):
+        """
+        Refresh the stale series in ticker_list.
+
+        :param ticker_list: list
+        :return: dict
+        """
+        stale = self.FindStale(ticker_list)
+        parallel = []
+        serial = []
+        for ticker, series_meta in stale:
+            provider_manager = econ_platform_core._get_provider(series_meta.series_provider_code)
+            if provider_manager.PushOnly:
+                self.Results[ticker] = 'skipped'
+            elif provider_manager.RefreshInParallel:
+                parallel.append((ticker, series_meta, provider_manager))
+            else:
+                serial.append((ticker, series_meta, provider_manager))
+        log_debug('Refresh: %d stale series in parallel, %d in serial', len(parallel), len(serial))
+        if len(parallel) > 0:
+            self._RefreshParallel(parallel)
+        for ticker, series_meta, provider_manager in serial:
+            if str(series_meta.ticker_full) in self.TableTickers:
+                self.Results[ticker] = 'table'
+                continue
+            try:
+                stored, start_date = self.Protocol.GetIncrementalStart(series_meta, provider_manager,
+                                                                       self.DatabaseManager)
+                result = self.Protocol.FetchFromProvider(ticker, series_meta, provider_manager, stored, start_date,
+                                                         database_code=self.DatabaseManager.Code)
+            except Exception as ex:
+                result = ex
+            self._Write(ticker, series_meta, result)
+        return self.Results
+
+    def _RefreshParallel(self, parallel):
+        """
+        Dispatch the fetches to the thread pool, and write the results as they come back.
+
+        :param parallel: list
+        :return:
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(self.MaxWorkers, 1)) as pool:
+            futures = {}
+            for ticker, series_meta, provider_manager in parallel:
+                # Create the semaphore here, not in the workers.
+                self.GetSemaphore(series_meta.series_provider_code)
+                fut = pool.submit(self._Worker, ticker, series_meta, provider_manager)
+                futures[fut] = (ticker, series_meta)
+            for fut in concurrent.futures.as_completed(futures):
+                ticker, series_meta = futures[fut]
+                try:
+                    result = fut.result()
+                except Exception as ex:
+                    result = ex
+                self._Write(ticker, series_meta, result)
+
+    def _Worker(self, ticker, series_meta, provider_manager):
+        """
+        Runs in a worker thread: read the stored series (if the fetch is incremental), wait for the provider
+        semaphore, then fetch. Only reads the database.
+
+        Returns None if the series was covered by a table fetched for another series.
+        """
+        try:
+            # The read is outside the semaphore, so that it is not limited by the provider concurrency.
+            stored, start_date = self.Protocol.GetIncrementalStart(series_meta, provider_manager,
+                                                                   self.DatabaseManager)
+            with self.GetSemaphore(series_meta.series_provider_code):
+                with self.TableLock:
+                    if str(series_meta.ticker_full) in self.TableTickers:
+                        return None
+                result = self.Protocol.FetchFromProvider(ticker, series_meta, provider_manager, stored,
+                                                         start_date, database_code=self.DatabaseManager.Code)
+                if result.TableWasFetched:
+                    with self.TableLock:
+                        self.TableTickers.update([str(x) for x in result.TableSeries])
+                return result
+        finally:
+            self.CloseThreadConnection()
+
+    def CloseThreadConnection(self):
+        """
+        Close the database connection of the current (worker) thread. Advanced databases open one connection per
+        thread, and nothing else would close the ones opened by the pool threads.
+
+        :return:
+        """
+        if self.DatabaseManager.IsAdvanced:
+            self.DatabaseManager.Close()
+
+    def _Write(self, ticker, series_meta, result):
+        """
+        Main thread: write a fetch result, and record the status.
+
+        :param ticker: str
+        :param series_meta: econ_platform_core.SeriesMetadata
+        :param result: FetchResult (or the exception raised by the fetch, or None)
+        :return:
+        """
+        if result is None:
+            self.Results[ticker] = 'table'
+            return
+        try:
+            if isinstance(result, Exception):
+                raise result
+            self.Protocol.WriteFetched(result, self.DatabaseManager)
+            self.Results[ticker] = 'updated'
+        except NoDataError:
+            try:
+                self.DatabaseManager.SetLastRefresh(series_meta.ticker_full)
+                self.Results[ticker] = 'unchanged'
+            except Exception as ex:
+                self._Failed(ticker, ex)
+        except Exception as ex:
+            self._Failed(ticker, ex)
+
+    def _Failed(self, ticker, ex):
+        """
+        Record a failed series. One bad series should not stop an overnight refresh.
+
+        :param ticker: str
+        :param ex: Exception
+        :return:
+        """
+        econ_platform_core.log_warning('Refresh of %s failed: %s', ticker, ex)
+        self.Results[ticker] = 'failed'
+        self.Errors[ticker] = ex
@@ -0,0 +1,207 @@
+"""
+series_cache.py
+
+In-memory cache of series that sits in front of the DatabaseManager objects.
+
+Interactive sessions (and R, via fetch_df()) pull the same series over and over. The DatabaseManager.Retrieve()
+method checks this cache before going to the database implementation (_Retrieve()). The cache is keyed
+by (database code, full ticker), and is emptied in least-recently-used order once the memory budget is hit.
+
+Write(), Delete() and SetLastUpdate() on a DatabaseManager invalidate the entry for the series. Since the
+reads can happen in other threads (the refresh engine, afetch_many()), a reader could get the old series from the
+database before a write, and then Put() it after the write invalidated the cache. To stop that, Invalidate() bumps
+a generation counter; readers get the generation with GetGeneration() before reading the database, and Put() is
+skipped if it changed in the meantime. There is one counter for the whole cache (rather than one per series, which
+would grow with every ticker ever written), so a write also skips the Put() of other series being read at the
+same time; they are just read from the database again next time. Note that
+the cache only knows about changes made within this Python process; if another process writes to the
+database, the cached series will be stale until it is evicted (or Clear() is called).
+
+The budget is set in the config file:
+
+[Cache]
+max_megabytes = 256
+
+Setting max_megabytes to 0 turns off the cache. The cache is also off until the platform is initialised,
+and databases that were not added to the Databases list (so that they have no code) are never cached.
+
+Copyright 2019 Brian Romanchuk
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import collections
+import threading
+
+from econ_platform_core.entity_and_errors import PlatformEntity
+
+
+class SeriesCache(PlatformEntity):
+    """
+    Least-recently-used cache of pandas.Series, with a memory budget (in bytes).
+
+    The cache hands out copies of the series, so that callers cannot modify the cached version.
+
+    Counters (Hits, Misses, Evictions) are available from GetStatistics().
+    """
+    def __init__(self, max_bytes=0):
+        super().__init__()
+        self.MaxBytes = max_bytes
+        self.CurrentBytes = 0
+        self.Hits = 0
+        self.Misses = 0
+        self.Evictions = 0
+        # key -> (series, size)
+        self.Entries = collections.OrderedDict()
+        # Number of times invalidated (any series). Not reset, so that it stays valid for readers in progress.
+        self.Generation = 0
+        self.Lock = threading.Lock()
+
+    def Initialise(self, config):
+        """
+        Set the memory budget from the [Cache] section of the config.
+
+        :param config: econ_platform_core.configuration.ConfigParserWrapper
+        :return:
+        """
+        try:
+            max_mb = config['Cache'].getfloat('max_megabytes')
+        except KeyError:
+            # Older config files: leave the cache turned off.
+            max_mb = 0.
+        self.SetBudget(int(max_mb * 1024 * 1024))
+
+    def SetBudget(self, max_bytes):
+        """
+        Change the memory budget. Evicts series if needed.
+        :param max_bytes: int
+        :return:
+        """
+        with self.Lock:
+            self.MaxBytes = max_bytes
+            self._Evict()
+
+    @staticmethod
+    def GetKey(database_code, ticker_full):
+        return str(database_code), str(ticker_full)
+
+    def GetGeneration(self, database_code, ticker_full):
+        """
+        Get the generation to pass to Put() after reading the series from the database. (The counter is shared by
+        all series; the arguments are kept so that callers do not depend on that.)
+
+        :param database_code: str
+        :param ticker_full: TickerFull
+        :return: int
+        """
+        with self.Lock:
+            return self.Generation
+
+    def Get(self, database_code, ticker_full):
+        """
+        Get a copy of the cached series, or None if it is not in the cache.
+
+        :param database_code: str
+        :param ticker_full: TickerFull
+        :return: pandas.Series
+        """
+        if self.MaxBytes <= 0 or len(database_code) == 0:
+            return None
+        key = self.GetKey(database_code, ticker_full)
+        with self.Lock:
+            try:
+                ser, size = self.Entries[key]
+            except KeyError:
+                self.Misses += 1
+                return None
+            self.Entries.move_to_end(key)
+            self.Hits += 1
+        return ser.copy()
+
+    def Put(self, database_code, ticker_full, ser, generation=None):
+        """
+        Store a copy of a series.
+
+        If generation is given (from GetGeneration(), before the database read), the series is not stored if
+        anything has been invalidated since then (it may be the version from before a write).
+
+        :param database_code: str
+        :param ticker_full: TickerFull
+        :param ser: pandas.Series
+        :param generation: int
+        :return:
+        """
+        if self.MaxBytes <= 0 or len(database_code) == 0:
+            return
+        size = int(ser.memory_usage(index=True, deep=True))
+        if size > self.MaxBytes:
+            # Would evict everything else, for nothing.
+            return
+        key = self.GetKey(database_code, ticker_full)
+        ser = ser.copy()
+        with self.Lock:
+            if generation is not None and generation != self.Generation:
+                return
+            if key in self.Entries:
+                self.CurrentBytes -= self.Entries[key][1]
+            self.Entries[key] = (ser, size)
+            self.Entries.move_to_end(key)
+            self.CurrentBytes += size
+            self._Evict()
+
+    def Invalidate(self, database_code, ticker_full):
+        """
+        Remove a series from the cache (if it is there).
+
+        :param database_code: str
+        :param ticker_full: TickerFull
+        :return:
+        """
+        key = self.GetKey(database_code, ticker_full)
+        with self.Lock:
+            self.Generation += 1
+            if key in self.Entries:
+                self.CurrentBytes -= self.Entries[key][1]
+                del self.Entries[key]
+
+    def Clear(self):
+        """
+        Empty the cache. Counters are not reset.
+        :return:
+        """
+        with self.Lock:
+            self.Entries.clear()
+            self.CurrentBytes = 0
+
+    def GetStatistics(self):
+        """
+        Return the cache counters as a dict.
+        :return: dict
+        """
+        with self.Lock:
+            return {'Hits': self.Hits,
+                    'Misses': self.Misses,
+                    'Evictions': self.Evictions,
+                    'NumSeries': len(self.Entries),
+                    'Bytes': self.CurrentBytes,
+                    'MaxBytes': self.MaxBytes}
+
+    def _Evict(self):
+        """
+        Drop least recently used entries until within budget. Lock must be held.
+        :return:
+        """
+        while self.CurrentBytes > self.MaxBytes and len(self.Entries) > 0:
+            key, (ser, size) = self.Entries.popitem(last=False)
+            self.CurrentBytes -= size
+            self.Evictions += 1
@@ -77,6 +77,8 @@ self.last_update""".replace('self.', '').split('\n')
         self.last_refresh = None
         self.last_update = None
         self.ProviderMetadata = {}
+        # Code of the database that the series is being fetched for (set by UpdateProtocol.FetchFromProvider()).
+        self.DatabaseCode = ''
 
     def AssertValid(self):
         """
@@ -17,8 +17,12 @@ limitations under the License.
 """
 from logging import debug as log_debug
 
+import numpy
+import pandas
+
 import econ_platform_core
 from econ_platform_core import PlatformEntity, PlatformError, TickerNotFoundError
+from econ_platform_core.entity_and_errors import NoDataError
 
 
 class UpdateProtocol(PlatformEntity):
@@ -43,59 +47,213 @@ class UpdateProtocol(PlatformEntity):
         """
         raise NotImplementedError()
 
+    # noinspection PyMethodMayBeStatic,PyUnusedLocal
+    def NeedsUpdate(self, series_meta, database_manager):
+        """
+        Does a series that exists on the database need to go through Update()? If False, the series can
+        be taken straight from the database. (Used by fetch_many() to retrieve fresh series in bulk.)
+
+        The base class answer is True, so that subclasses that do not override this method always see
+        the Update() call.
+
+        :param series_meta: SeriesMetadata
+        :param database_manager: DatabaseManager
+        :return: bool
+        """
+        return True
+
     def FetchAndWrite(self, ticker, series_meta, provider_manager, database_manager):
         """
         Fetch a series from an external provider, and write it to the database. Should not
         need to override this method.
 
+        If the provider supports incremental fetches (ProviderWrapper.SupportsIncremental), and the series
+        is already on the database, only the tail of the series is fetched, and then spliced onto the
+        stored series. (See GetIncrementalStart().)
+
+        The work is split into FetchFromProvider() (which does not touch the database) and WriteFetched(),
+        so that the refresh engine can run the fetches in worker threads.
+
         :param ticker: str
         :param series_meta: econ_platform_core.SeriesMetaData
         :param provider_manager: econ_platform_core.ProviderWrapper
         :param database_manager: econ_platform_core.DatabaseManager
         :return:
         """
-        if provider_manager.IsExternal:
-            _hook_fetch_external(provider_manager, ticker)
         if provider_manager.PushOnly:
             raise PlatformError(
                 'Series {0} does not exist on {1}. Its ticker indicates that it is push-only series.'.format(
                    ticker, database_manager.Code)) from None
+        stored, start_date = self.GetIncrementalStart(series_meta, provider_manager, database_manager)
+        result = self.FetchFromProvider(ticker, series_meta, provider_manager, stored, start_date,
+                                        database_code=database_manager.Code)
+        return self.WriteFetched(result, database_manager)
+
+    def FetchFromProvider(self, ticker, series_meta, provider_manager, stored=None, start_date=None,
+                          database_code=None):
+        """
+        The provider half of FetchAndWrite(): fetch, and splice onto the stored series if this is an
+        incremental fetch. The database is not touched, so this can run in a worker thread.
+
+        The database_code (of the database the series will be written to) is put into series_meta.DatabaseCode,
+        for providers that need to know (the User provider keeps its memo for each database).
+
+        If the provider fetched a table, the table is copied into the result, so that the provider
+        object can be re-used before the result is written.
+
+        :param ticker: str
+        :param series_meta: econ_platform_core.SeriesMetaData
+        :param provider_manager: econ_platform_core.ProviderWrapper
+        :param stored: pandas.Series
+        :param start_date: datetime.date
+        :param database_code: str
+        :return: FetchResult
+        """
+        if database_code is not None:
+            series_meta.DatabaseCode = database_code
+        if provider_manager.IsExternal:
+            _hook_fetch_external(provider_manager, ticker)
         log_debug('Fetching %s', ticker)
         # Force this to False, so that ProviderManager extension writers do not need to
         # remember to do so.
         provider_manager.TableWasFetched = False
         if econ_platform_core.Providers.EchoAccess:
-            print('Going to {0} to fetch {1}'.format(provider_manager.Name, ticker))
+            if start_date is None:
+                print('Going to {0} to fetch {1}'.format(provider_manager.Name, ticker))
+            else:
+                print('Going to {0} to fetch {1} from {2}'.format(provider_manager.Name, ticker, start_date))
+        result = FetchResult(ticker, series_meta)
         try:
-            out = provider_manager.fetch(series_meta)
-        except TickerNotFoundError:
+            if start_date is None:
+                out = provider_manager.fetch(series_meta)
+            else:
+                out = provider_manager.fetch(series_meta, start_date=start_date)
+        except TickerNotFoundError as ex:
             # If the table was fetched, write the table, even if the specific series was not there...
-            if provider_manager.TableWasFetched:
-                self.WriteTable(provider_manager, database_manager)
-            raise
+            if not provider_manager.TableWasFetched:
+                raise
+            out = None
+            result.Error = ex
+        if provider_manager.TableWasFetched:
+            result.TableWasFetched = True
+            result.TableSeries = dict(provider_manager.TableSeries)
+            result.TableMeta = dict(provider_manager.TableMeta)
+        if out is None:
+            return result
         if type(out) is not tuple:
             ser = out
         else:
-            ser, series_meta = out
+            ser, result.SeriesMeta = out
         ser = ser.dropna()
-        log_debug('Writing %s', ticker)
-        if not provider_manager.TableWasFetched:
-            database_manager.Write(ser, series_meta)
+        if start_date is not None and not result.TableWasFetched:
+            ser = self.SpliceTail(stored, ser, start_date)
+        result.Series = ser
+        return result
+
+    def WriteFetched(self, result, database_manager):
+        """
+        The database half of FetchAndWrite().
+
+        If the fetch ended with a TickerNotFoundError after fetching a table, the table is written, and then
+        the error is raised.
+
+        :param result: FetchResult
+        :param database_manager: econ_platform_core.DatabaseManager
+        :return: pandas.Series
+        """
+        log_debug('Writing %s', result.Ticker)
+        if result.TableWasFetched:
+            self.WriteTable(result, database_manager)
+        if result.Error is not None:
+            raise result.Error
+        if not result.TableWasFetched:
+            database_manager.Write(result.Series, result.SeriesMeta)
             if not database_manager.SetsLastUpdateAutomatically:
-                database_manager.SetLastUpdate(series_meta.ticker_full)
-        else:
-            self.WriteTable(provider_manager, database_manager)
-        return ser
+                database_manager.SetLastUpdate(result.SeriesMeta.ticker_full)
+        return result.Series
+
+    # noinspection PyMethodMayBeStatic
+    def GetIncrementalStart(self, series_meta, provider_manager, database_manager):
+        """
+        Find the start date for an incremental fetch.
+
+        The fetch starts [UpdateProtocol] IncrementalOverlap observations before the last stored
+        observation, so that revisions to recent data are picked up. Earlier revisions are missed; set
+        Incremental=False in the config to always fetch the whole series.
+
+        Returns (None, None) if the whole series needs to be fetched: the provider does not support
+        incremental fetches, the series is not on the database, or it does not have a calendar date axis.
+
+        :param series_meta: econ_platform_core.SeriesMetaData
+        :param provider_manager: econ_platform_core.ProviderWrapper
+        :param database_manager: econ_platform_core.DatabaseManager
+        :return: tuple
+        """
+        if not (provider_manager.SupportsIncremental and series_meta.Exists):
+            return None, None
+        config = econ_platform_core.PlatformConfiguration['UpdateProtocol']
+        if not config.getboolean('Incremental', fallback=True):
+            return None, None
+        overlap = max(config.getint('IncrementalOverlap', fallback=5), 1)
+        try:
+            stored = database_manager.Retrieve(series_meta)
+        except TickerNotFoundError:
+            return None, None
+        if len(stored) <= overlap or not isinstance(stored.index, pandas.DatetimeIndex):
+            return None, None
+        return stored, stored.index[-overlap].date()
+
+    @staticmethod
+    def SpliceTail(stored, tail, start_date):
+        """
+        Replace the observations from start_date onwards in the stored series with the fetched tail.
+
+        Raises NoDataError if the result is the same as the stored series, so that the
+        series is marked as refreshed but not updated.
+
+        :param stored: pandas.Series
+        :param tail: pandas.Series
+        :param start_date: datetime.date
+        :return: pandas.Series
+        """
+        tail = tail.copy()
+        tail.index = pandas.DatetimeIndex(tail.index)
+        tail = tail[tail.index >= pandas.Timestamp(start_date)]
+        head = stored[stored.index < pandas.Timestamp(start_date)]
+        out = pandas.concat([head, tail.astype(float)])
+        out.name = stored.name
+        if out.index.equals(stored.index) and numpy.array_equal(out.values, stored.values):
+            raise NoDataError('No new data')
+        return out
 
     @staticmethod
     def WriteTable(provider_manager, database_manager):
-        for k in provider_manager.TableSeries:
-            t_ser = provider_manager.TableSeries[k]
-            t_meta = provider_manager.TableMeta[k]
-            database_manager.Write(t_ser, t_meta)
-            if not database_manager.SetsLastUpdateAutomatically:
-                database_manager.SetLastUpdate(t_meta.ticker_full)
+        """
+        Write all the series in a fetched table, with a single WriteMany() call.
 
+        :param provider_manager: econ_platform_core.ProviderWrapper (or FetchResult: anything with TableSeries,
+        TableMeta)
+        :param database_manager: econ_platform_core.DatabaseManager
+        :return:
+        """
+        database_manager.WriteMany((provider_manager.TableSeries[k], provider_manager.TableMeta[k])
+                                   for k in provider_manager.TableSeries)
+
+
+
+class FetchResult(PlatformEntity):
+    """
+    What came back from UpdateProtocol.FetchFromProvider(), waiting to be written to the database.
+    """
+    def __init__(self, ticker, series_meta):
+        super().__init__()
+        self.Ticker = ticker
+        self.SeriesMeta = series_meta
+        self.Series = None
+        self.TableWasFetched = False
+        self.TableSeries = {}
+        self.TableMeta = {}
+        self.Error = None
 
 
 class UpdateProtocolManager(PlatformEntity):
@@ -151,6 +309,17 @@ class NoUpdateProtocol(UpdateProtocol):
     def __init__(self):
         super().__init__(name='No Updates For You!')
 
+    # noinspection PyMethodMayBeStatic,PyUnusedLocal
+    def NeedsUpdate(self, series_meta, database_manager):
+        """
+        Never update.
+
+        :param series_meta: SeriesMetadata
+        :param database_manager: DatabaseManager
+        :return: bool
+        """
+        return False
+
     # noinspection PyMethodMayBeStatic,PyUnusedLocal
     def Update(self, ticker, series_meta, provider_wrapper, database_manager):
         """
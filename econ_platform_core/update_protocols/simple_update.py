@@ -38,19 +38,15 @@ class SimpleUpdate(UpdateProtocol):
         super().__init__(name='Simple Update')
         self.NumHours = None
 
-    def Update(self, ticker, series_meta, provider_wrapper, database_manager):
+    def NeedsUpdate(self, series_meta, database_manager):
         """
-        Procedure to handle updates. The default behaviour is to not update; just retrieve from the
-        database.
+        Is the series stale? (Older than [UpdateProtocol] SimpleHours.)
 
-        :param ticker: str
         :param series_meta: econ_platform_core.SeriesMetadata
-        :param provider_wrapper: econ_platform_core.ProviderWrapper
         :param database_manager: econ_platform_core.DatabaseManager
-        :return:
+        :return: bool
         """
         last_refresh = series_meta.last_refresh
-        ticker_str = ticker
         if last_refresh is None:
             last_refresh = database_manager.GetLastRefresh(series_meta.ticker_full)
         # If the developer is too lazy to parse strings...
@@ -60,7 +56,21 @@ class SimpleUpdate(UpdateProtocol):
         if self.NumHours is None:
             self.NumHours = econ_platform_core.PlatformConfiguration['UpdateProtocol'].getint('SimpleHours')
         age = math.floor(((nnow - last_refresh).total_seconds()) / (60 * 60))
-        if age < self.NumHours:
+        return age >= self.NumHours
+
+    def Update(self, ticker, series_meta, provider_wrapper, database_manager):
+        """
+        Procedure to handle updates. The default behaviour is to not update; just retrieve from the
+        database.
+
+        :param ticker: str
+        :param series_meta: econ_platform_core.SeriesMetadata
+        :param provider_wrapper: econ_platform_core.ProviderWrapper
+        :param database_manager: econ_platform_core.DatabaseManager
+        :return:
+        """
+        ticker_str = ticker
+        if not self.NeedsUpdate(series_meta, database_manager):
             log_debug('Series {0} not stale, going to {1}'.format(ticker_str, database_manager.Code))
             return database_manager.Retrieve(series_meta)
         else:
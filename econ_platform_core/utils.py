@@ -20,12 +20,14 @@ limitations under the License.
 
 """
 
+import concurrent.futures
 import logging
 import sys
 import os
 import re
 import datetime
 import pathlib
+import pickle
 
 from econ_platform_core.entity_and_errors import PlatformEntity
 
@@ -263,6 +265,111 @@ def archive_file(full_filename, archive_subdir='archive'):
     os.rename(full_filename, targ_file)
 
 
+def get_file_signature(full_filename):
+    """
+    (size, modification time in ns) of a file; used to check whether a cache of a parsed file is stale.
+
+    :param full_filename: str
+    :return: tuple
+    """
+    stat = os.stat(full_filename)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def read_sidecar_cache(full_filename, cache_subdir='cache', cache_version=1):
+    """
+    Load the cached parse of a file (saved by write_sidecar_cache()). Returns None if there is no cache, if the
+    file has changed since (size or modification time), or if the cache was created with a different
+    cache_version (bump the version when the parsing code changes).
+
+    :param full_filename: str
+    :param cache_subdir: str
+    :param cache_version: int
+    :return: object
+    """
+    orig_dir, file = os.path.split(full_filename)
+    cache_file = os.path.join(orig_dir, cache_subdir, file + '.pkl')
+    if not os.path.exists(cache_file):
+        return None
+    try:
+        with open(cache_file, 'rb') as f:
+            info = pickle.load(f)
+        if info['signature'] != get_file_signature(full_filename) or info['version'] != cache_version:
+            return None
+        return info['payload']
+    except Exception:
+        # Corrupt or from an incompatible version of Python/pandas; just re-parse.
+        return None
+
+
+def write_sidecar_cache(full_filename, payload, cache_subdir='cache', cache_version=1):
+    """
+    Save the parsed contents of a file (anything that can be pickled) to <directory>/<cache_subdir>/<file>.pkl.
+
+    :param full_filename: str
+    :param payload: object
+    :param cache_subdir: str
+    :param cache_version: int
+    :return:
+    """
+    orig_dir, file = os.path.split(full_filename)
+    cache_dir = os.path.join(orig_dir, cache_subdir)
+    if not os.path.exists(cache_dir):
+        os.mkdir(cache_dir)
+    cache_file = os.path.join(cache_dir, file + '.pkl')
+    info = {'signature': get_file_signature(full_filename), 'version': cache_version, 'payload': payload}
+    with open(cache_file + '.tmp', 'wb') as f:
+        pickle.dump(info, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(cache_file + '.tmp', cache_file)
+
+
+def get_parse_processes(provider_code):
+    """
+    The number of worker processes for parsing files: parse_processes in the [P_{provider_code}] section
+    (1 if it is not set).
+
+    :param provider_code: str
+    :return: int
+    """
+    import econ_platform_core
+    try:
+        section = econ_platform_core.PlatformConfiguration['P_' + str(provider_code)]
+    except KeyError:
+        return 1
+    return section.getint('parse_processes', fallback=1)
+
+
+def _init_process_worker(config_sections):
+    """
+    ProcessPoolExecutor initializer: worker processes that are spawned (not forked) do not have the
+    configuration, which is needed to create provider objects.
+
+    :param config_sections: dict
+    :return:
+    """
+    import econ_platform_core
+    import econ_platform_core.configuration
+    config = econ_platform_core.configuration.ConfigParserWrapper()
+    config.ConfigParser.read_dict(config_sections)
+    econ_platform_core.PlatformConfiguration = config
+
+
+def create_process_pool(max_workers):
+    """
+    Create a ProcessPoolExecutor whose workers have the current configuration.
+
+    (econ_platform_core is imported inside these functions, so that importing this module stays safe.)
+
+    :param max_workers: int
+    :return: concurrent.futures.ProcessPoolExecutor
+    """
+    import econ_platform_core
+    parser = econ_platform_core.PlatformConfiguration.ConfigParser
+    config_sections = dict((x, dict(parser.items(x, raw=True))) for x in parser.sections())
+    return concurrent.futures.ProcessPoolExecutor(max_workers=max_workers, initializer=_init_process_worker,
+                                                  initargs=(config_sections,))
+
+
 
 
 #--------------------------------------------------------------
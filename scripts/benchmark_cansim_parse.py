@@ -0,0 +1,77 @@
+"""
+Benchmark for the CANSIM CSV parsing modes ([P_STATSCAN] parse_mode).
+
+Creates a synthetic StatsCan-style table zip file in a temporary directory (monthly data), and times the
+"legacy" (unzip + row-by-row) and "stream" (chunked read out of the zip) parsers on it.
+
+Usage:
+python benchmark_cansim_parse.py [number_of_vectors] [observations_per_vector]
+"""
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+
+import econ_platform_core
+import econ_platform_core.configuration
+import econ_platform_core.providers.provider_cansim_csv
+
+TABLE_NAME = '99990001'
+
+
+def make_table(directory, num_vectors, num_obs):
+    buf = io.StringIO()
+    buf.write('"REF_DATE","GEO","DGUID","Series","UOM","UOM_ID","SCALAR_FACTOR","SCALAR_ID","VECTOR",'
+              '"COORDINATE","VALUE","STATUS","SYMBOL","TERMINATED","DECIMALS"\n')
+    for v in range(0, num_vectors):
+        for i in range(0, num_obs):
+            year = 1950 + i // 12
+            month = 1 + i % 12
+            buf.write('"{0}-{1:02}","Canada","2016A000011124","Series {2}","Dollars","81","units","0",'
+                      '"v{2}","1.{2}","{3}","","","","1"\n'.format(year, month, v, 0.5 * i + v))
+    with zipfile.ZipFile(os.path.join(directory, TABLE_NAME + '-eng.zip'), 'w',
+                         compression=zipfile.ZIP_DEFLATED) as myzip:
+        myzip.writestr(TABLE_NAME + '.csv', buf.getvalue())
+
+
+def time_mode(directory, parse_mode, num_vectors, num_obs):
+    make_table(directory, num_vectors, num_obs)
+    econ_platform_core.PlatformConfiguration['P_STATSCAN']['parse_mode'] = parse_mode
+    obj = econ_platform_core.providers.provider_cansim_csv.ProviderCansim_Csv()
+    obj.ProviderCode = 'STATCAN'
+    obj.DataDirectory = directory
+    start = time.perf_counter()
+    if parse_mode == 'legacy':
+        obj.UnzipFile(TABLE_NAME)
+        obj.ParseUnzipped(TABLE_NAME)
+        obj.BuildSeries()
+    else:
+        obj.ParseStream(TABLE_NAME)
+    elapsed = time.perf_counter() - start
+    obj.ArchiveFiles(TABLE_NAME)
+    return elapsed, len(obj.TableSeries)
+
+
+def main():
+    num_vectors = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    num_obs = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    econ_platform_core.PlatformConfiguration = econ_platform_core.configuration.load_platform_configuration(
+        display_steps=False)
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        print('Rows: {0} ({1} vectors)'.format(num_vectors * num_obs, num_vectors))
+        t_legacy, n_legacy = time_mode(tmp_dir, 'legacy', num_vectors, num_obs)
+        print('legacy: {0:.2f} s ({1} series)'.format(t_legacy, n_legacy))
+        t_stream, n_stream = time_mode(tmp_dir, 'stream', num_vectors, num_obs)
+        print('stream: {0:.2f} s ({1} series)  (speedup {2:.1f}x)'.format(t_stream, n_stream,
+                                                                         t_legacy / t_stream))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark for the SQLite connection settings ([D_SQLITE] journal_mode, synchronous, etc.).
+
+Compares the SQLite defaults (rollback journal, synchronous=FULL) with the settings in the config file:
+(1) A write-heavy refresh: write a number of series, one commit per series (like an update run).
+(2) Concurrent reads: reader threads retrieve series while a writer thread keeps rewriting them.
+
+The database files are created in a temporary directory; results depend heavily on the disk.
+
+Usage:
+python benchmark_sqlite_pragmas.py [number_of_series] [observations_per_series]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import numpy
+import pandas
+
+import econ_platform_core
+import econ_platform_core.configuration
+import econ_platform_core.databases.database_sqlite3
+
+
+def make_db(fname, pragmas):
+    db = econ_platform_core.databases.database_sqlite3.DatabaseSqlite3()
+    db.DatabaseFile = fname
+    db.Pragmas = dict(pragmas)
+    return db
+
+
+def make_series(num_obs, offset=0.):
+    return pandas.Series(numpy.random.randn(num_obs) + offset,
+                         index=pandas.date_range('1990-01-01', periods=num_obs, freq='D'))
+
+
+def bench_writes(fname, pragmas, num_series, num_obs):
+    db = make_db(fname, pragmas)
+    start = time.perf_counter()
+    for i in range(0, num_series):
+        db.Write(make_series(num_obs), db.GetMeta('BENCH@s{0}'.format(i)))
+    elapsed = time.perf_counter() - start
+    db.Connection.close()
+    return elapsed
+
+
+def bench_concurrent(fname, pragmas, num_series, num_obs, num_readers=4, run_time=3.):
+    stop = threading.Event()
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    def reader():
+        # Each thread needs its own connection.
+        db = make_db(fname, pragmas)
+        i = 0
+        while not stop.is_set():
+            try:
+                db.Retrieve(db.GetMeta('BENCH@s{0}'.format(i % num_series)))
+                with lock:
+                    counts['reads'] += 1
+            except Exception:
+                with lock:
+                    counts['errors'] += 1
+            i += 1
+        db.Connection.close()
+
+    def writer():
+        db = make_db(fname, pragmas)
+        i = 0
+        while not stop.is_set():
+            try:
+                db.Write(make_series(num_obs, offset=float(i)), db.GetMeta('BENCH@s{0}'.format(i % num_series)))
+                with lock:
+                    counts['writes'] += 1
+            except Exception:
+                with lock:
+                    counts['errors'] += 1
+            i += 1
+        db.Connection.close()
+
+    threads = [threading.Thread(target=reader) for _ in range(0, num_readers)]
+    threads.append(threading.Thread(target=writer))
+    for t in threads:
+        t.start()
+    time.sleep(run_time)
+    stop.set()
+    for t in threads:
+        t.join()
+    return counts
+
+
+def main():
+    num_series = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    num_obs = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    econ_platform_core.PlatformConfiguration = econ_platform_core.configuration.load_platform_configuration(
+        display_steps=False)
+    tuned = make_db(':memory:', {}).GetPragmasFromConfig()
+    settings = [('SQLite defaults', {'journal_mode': 'DELETE', 'synchronous': 'FULL'}),
+                ('Config: ' + str(tuned), tuned)]
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        for label, pragmas in settings:
+            fname = os.path.join(tmp_dir, 'bench_{0}.db'.format(len(os.listdir(tmp_dir))))
+            print(label)
+            elapsed = bench_writes(fname, pragmas, num_series, num_obs)
+            print('  Write {0} series x {1} obs: {2:.2f} s ({3:.1f} ms/series)'.format(
+                num_series, num_obs, elapsed, 1000. * elapsed / num_series))
+            counts = bench_concurrent(fname, pragmas, num_series, num_obs)
+            print('  Concurrent (4 readers, 1 writer, 3 s): {0} reads, {1} writes, {2} errors'.format(
+                counts['reads'], counts['writes'], counts['errors']))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark for DatabaseSqlite3 retrieval of long series.
+
+Writes a long daily series to an in-memory SQLite database (both schema versions), and times the whole retrieval
+(ticker lookup, SELECT and conversion to a pandas.Series): the old version (per-row date mapper on the
+fetchall() result, copied below) against the current _Retrieve(), which fills numpy arrays from the cursor.
+
+The SELECT itself (SQLite stepping through the rows) is a large part of the total, and is the same for both
+versions, so the end-to-end speedup is well below the speedup of the conversion alone. Most of the gain needs
+schema version 2: version 1 dates are strings, which still have to be parsed.
+
+(Daily dates start in 1700, so that the maximum number of rows is about 200,000 before hitting the limits
+of pandas timestamps.)
+
+Usage:
+python benchmark_sqlite_retrieve.py [number_of_rows]
+"""
+
+import datetime
+import sys
+import timeit
+
+import numpy
+import pandas
+
+import econ_platform_core
+import econ_platform_core.utils
+import econ_platform_core.databases.database_sqlite3
+
+
+def legacy_retrieve(db, series_meta):
+    """
+    The old DatabaseSqlite3 retrieval: fetchall(), per-row date mapper, and tuple sorting for float axes.
+    """
+    ticker_full = str(series_meta.ticker_full)
+    series_id = db.GetSeriesID(ticker_full)
+    cmd = 'SELECT series_dates, series_values FROM {0} WHERE series_id = ?'.format(db.TableData)
+    res = db.Execute(cmd, series_id, commit_after=False).fetchall()
+
+    def mapper(s):
+        try:
+            return econ_platform_core.utils.iso_string_to_date(s)
+        except:
+            return float(s)
+    dates = [mapper(x[0]) for x in res]
+    valz = [x[1] for x in res]
+    if len(dates) > 0 and type(dates[0]) == float:
+        data = [(x, y) for x, y in zip(dates, valz)]
+        data.sort()
+        dates = [x[0] for x in data]
+        valz = [x[1] for x in data]
+        ser = pandas.Series(valz)
+        ser.index = dates
+    else:
+        ser = pandas.Series(valz)
+        ser.index = pandas.DatetimeIndex(dates)
+    ser.name = ticker_full
+    return ser
+
+
+def run_one(schema_version, num_rows, repeat=5):
+    db = econ_platform_core.databases.database_sqlite3.DatabaseSqlite3()
+    db.DatabaseFile = ':memory:'
+    db.NewSchemaVersion = schema_version
+    ser = pandas.Series(numpy.random.randn(num_rows),
+                        index=pandas.date_range(datetime.date(1700, 1, 1), periods=num_rows, freq='D'))
+    meta = db.GetMeta('BENCH@long_daily')
+    db.Write(ser, meta)
+    if schema_version < 2:
+        t_legacy = min(timeit.repeat(lambda: legacy_retrieve(db, meta), number=1, repeat=repeat))
+    else:
+        t_legacy = None
+    t_new = min(timeit.repeat(lambda: db._Retrieve(meta), number=1, repeat=repeat))
+    check = db._Retrieve(meta)
+    assert (check.values == ser.values).all()
+    assert (check.index == ser.index).all()
+    return t_legacy, t_new
+
+
+def main():
+    if len(sys.argv) > 1:
+        num_rows = int(sys.argv[1])
+    else:
+        num_rows = 50000
+    econ_platform_core.init_package()
+    print('Rows: {0}'.format(num_rows))
+    t_legacy, t_new_v1 = run_one(1, num_rows)
+    print('Legacy _Retrieve() (v1): {0:.4f} s'.format(t_legacy))
+    print('_Retrieve() (v1): {0:.4f} s  (speedup {1:.1f}x)'.format(t_new_v1, t_legacy / t_new_v1))
+    _, t_new_v2 = run_one(2, num_rows)
+    print('_Retrieve() (v2): {0:.4f} s  (speedup {1:.1f}x versus legacy v1)'.format(t_new_v2, t_legacy / t_new_v2))
+
+
+if __name__ == '__main__':
+    main()
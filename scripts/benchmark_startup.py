@@ -0,0 +1,70 @@
+"""
+Benchmark for the platform cold start time (import econ_platform.start).
+
+Runs the import in a fresh Python process a number of times, with [Options] LazyExtensions set to True and
+then False, and reports the best/median wall time and the number of modules that were imported. The option is
+set by writing a temporary user configuration file, which is pointed to by the user config environment variable
+(so this replaces any user configuration file you normally use).
+
+Since the timing includes the Python interpreter start up, the difference between the two cases is what matters.
+
+Usage:
+python benchmark_startup.py [number_of_runs]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import econ_platform_core
+import econ_platform_core.configuration
+
+CHILD_CODE = """
+import sys
+import time
+start = time.perf_counter()
+import econ_platform.start
+elapsed = time.perf_counter() - start
+print('RESULT {0} {1}'.format(elapsed, len(sys.modules)))
+"""
+
+
+def run_once(env):
+    res = subprocess.run([sys.executable, '-c', CHILD_CODE], env=env, stdout=subprocess.PIPE,
+                         stderr=subprocess.DEVNULL, universal_newlines=True)
+    for line in res.stdout.split('\n'):
+        if line.startswith('RESULT'):
+            _, elapsed, num_modules = line.split()
+            return float(elapsed), int(num_modules)
+    raise ValueError('Child process did not report a result:\n' + res.stdout)
+
+
+def time_mode(lazy, num_runs):
+    econ_platform_core.PlatformConfiguration = econ_platform_core.configuration.load_platform_configuration(
+        display_steps=False)
+    var_name = econ_platform_core.PlatformConfiguration['Options']['UserConfigEnvironmentVariableName']
+    handle, fname = tempfile.mkstemp(suffix='.txt')
+    try:
+        with os.fdopen(handle, 'w') as f:
+            f.write('[Options]\nLazyExtensions={0}\n'.format(lazy))
+        env = dict(os.environ)
+        env[var_name] = fname
+        results = [run_once(env) for _ in range(0, num_runs)]
+    finally:
+        os.remove(fname)
+    times = [x[0] for x in results]
+    return min(times), statistics.median(times), results[-1][1]
+
+
+def main():
+    num_runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for lazy in (False, True):
+        best, median, num_modules = time_mode(lazy, num_runs)
+        print('LazyExtensions={0}: best {1:.3f} s, median {2:.3f} s, {3} modules imported'.format(
+            lazy, best, median, num_modules))
+
+
+if __name__ == '__main__':
+    main()
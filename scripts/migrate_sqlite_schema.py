@@ -0,0 +1,36 @@
+"""
+Script to migrate a SQLite database file to the latest schema version (numeric date storage), and add the
+TickerAlias lookup table.
+
+Usage: python migrate_sqlite_schema.py [database code]
+
+The database code defaults to SQLITE; use the codes in [D_SQLITE_EXTRA] for the extra database files.
+
+Back up the database file first!
+"""
+
+import os
+import sys
+
+import econ_platform.start
+import econ_platform_core.databases.database_sqlite3
+
+
+
+def main():
+    econ_platform_core.LogInfo.LogDirectory = os.path.dirname(__file__)
+    econ_platform_core.start_log()
+    if len(sys.argv) > 1:
+        code = sys.argv[1]
+    else:
+        code = 'SQLITE'
+    econ_platform_core.log('Migrating SQLite database %s', code)
+    print('Migrating SQLite database {0} to schema version 2, with the TickerAlias table'.format(code))
+    try:
+        econ_platform_core.databases.database_sqlite3.migrate_sqlite3_schema(code, target_version=2)
+    except:
+        econ_platform_core.log_last_error()
+        raise
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""
+Script to rebuild the manifest file (_manifest.tsv) of the TEXT database, by scanning all the series files.
+
+Needed if the manifest is lost, or if series files were added or deleted by hand.
+
+Usage: python rebuild_text_manifest.py [database code]
+
+The database code defaults to TEXT.
+"""
+
+import os
+import sys
+
+import econ_platform.start
+import econ_platform_core
+
+
+
+def main():
+    econ_platform_core.LogInfo.LogDirectory = os.path.dirname(__file__)
+    econ_platform_core.start_log()
+    if len(sys.argv) > 1:
+        code = sys.argv[1]
+    else:
+        code = 'TEXT'
+    econ_platform_core.log('Rebuilding manifest for database %s', code)
+    try:
+        manifest = econ_platform_core.Databases[code].RebuildManifest()
+    except:
+        econ_platform_core.log_last_error()
+        raise
+    print('Manifest for {0} rebuilt: {1} series'.format(code, len(manifest)))
+
+if __name__ == '__main__':
+    main()
@@ -55,3 +55,12 @@ def delete_data_file(fname):
     if os.path.exists(targ):
         os.remove(targ)
 
+
+def delete_series_file(ticker_full):
+    """
+    Delete the text database file for a series (if it exists) from the data directory.
+    :param ticker_full: str
+    :return:
+    """
+    import econ_platform_core.databases.database_text
+    delete_data_file(econ_platform_core.databases.database_text.DatabaseText.GetBaseName(ticker_full) + '.txt')
@@ -0,0 +1,221 @@
+"""
+Tests for afetch()/afetch_many().
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+import threading
+import time
+
+import pandas
+
+import loc_utils
+import econ_platform_core
+from econ_platform_core.entity_and_errors import TickerNotFoundError
+import econ_platform_core.databases.database_sqlite3 as database_sqlite3
+from econ_platform_core.async_fetch import AsyncFetchEngine
+from econ_platform_core.update_protocols import NoUpdateProtocol
+
+
+class SlowProvider(econ_platform_core.ProviderWrapper):
+    """
+    Provider that takes a while, and tracks how many fetches are running at once.
+    """
+    def __init__(self):
+        super().__init__(name='AsyncTestProvider', default_code='AT')
+        self.Running = 0
+        self.MaxRunning = 0
+        self.Calls = 0
+        self.Lock = threading.Lock()
+
+    def fetch(self, series_meta):
+        with self.Lock:
+            self.Calls += 1
+            self.Running += 1
+            self.MaxRunning = max(self.MaxRunning, self.Running)
+        time.sleep(0.1)
+        with self.Lock:
+            self.Running -= 1
+        if str(series_meta.ticker_query) == 'missing':
+            raise TickerNotFoundError('not here')
+        value = float(str(series_meta.ticker_query))
+        return pandas.Series([value, value + 1.], index=pandas.date_range('2000-01-01', periods=2, freq='MS'))
+
+
+class TestAsyncFetch(unittest.TestCase):
+    def setUp(self):
+        loc_utils.use_test_configuration()
+        econ_platform_core.UpdateProtocolList.Initialise()
+        self.db = database_sqlite3.DatabaseSqlite3()
+        self.db.DatabaseFile = ':memory:'
+        econ_platform_core.Databases.AddDatabase(self.db, 'ASYNC_TEST')
+        self.provider = SlowProvider()
+        econ_platform_core.Providers.AddProvider(self.provider)
+
+    def test_afetch_many(self):
+        tickers = ['AT@{0}'.format(x) for x in range(0, 6)]
+        df = asyncio.run(econ_platform_core.afetch_many(tickers, database='ASYNC_TEST'))
+        self.assertEqual(tickers, list(df.columns))
+        for x in range(0, 6):
+            self.assertEqual([float(x), x + 1.], list(df['AT@{0}'.format(x)].values))
+        # Six fetches, three at a time.
+        self.assertEqual(3, self.provider.MaxRunning)
+        self.assertEqual(6, self.provider.Calls)
+        # Written to the database; the second time around, nothing is fetched.
+        self.assertEqual(sorted(tickers), self.db.GetAllValidSeriesTickers())
+        out = asyncio.run(econ_platform_core.afetch_many(tickers, database='ASYNC_TEST', return_dict=True))
+        self.assertEqual(6, self.provider.Calls)
+        expected = econ_platform_core.fetch_many(tickers, database='ASYNC_TEST', return_dict=True)
+        for t in tickers:
+            self.assertEqual(list(expected[t].values), list(out[t].values))
+
+    def test_afetch(self):
+        ser = asyncio.run(econ_platform_core.afetch('AT@7', database='ASYNC_TEST'))
+        self.assertEqual([7., 8.], list(ser.values))
+        with self.assertRaises(TickerNotFoundError):
+            asyncio.run(econ_platform_core.afetch_many(['AT@1', 'AT@missing'], database='ASYNC_TEST'))
+
+    def test_loop_not_blocked(self):
+        db = ThreadRecordingDatabase()
+        db.DatabaseFile = ':memory:'
+        econ_platform_core.Databases.AddDatabase(db, 'ASYNC_TEST2')
+        serial = WaitingProvider()
+        econ_platform_core.Providers.AddProvider(serial)
+        protocol = ThreadRecordingProtocol()
+
+        async def run(ticker_list):
+            engine = AsyncFetchEngine('ASYNC_TEST2')
+            engine.Protocol = protocol
+            task = asyncio.ensure_future(engine.FetchMany(ticker_list))
+            # The serial fetch waits until the loop lets it go, which only works if it is not on the loop thread.
+            while not task.done():
+                if serial.Waiting.is_set():
+                    serial.Go.set()
+                await asyncio.sleep(0.01)
+            return task.result()
+
+        out = asyncio.run(run(['AT@1', 'AW@2']))
+        self.assertTrue(serial.Released)
+        self.assertEqual([2., 3.], list(out['AW@2'].values))
+        self.assertEqual([1., 2.], list(out['AT@1'].values))
+        # Second time around, read from the database.
+        out = asyncio.run(run(['AT@1']))
+        self.assertEqual([1., 2.], list(out['AT@1'].values))
+        self.assertEqual(1, self.provider.Calls)
+        main_thread = threading.get_ident()
+        for method in ('GetMetaMany', 'RetrieveMany', 'Write'):
+            self.assertIn(method, db.Threads)
+        for method in ('GetIncrementalStart', 'WriteFetched'):
+            self.assertIn(method, protocol.Threads)
+        for method, threads in list(db.Threads.items()) + list(protocol.Threads.items()):
+            self.assertNotIn(main_thread, threads, method)
+
+    def test_worker_connections(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        db = database_sqlite3.DatabaseSqlite3()
+        db.DatabaseFile = os.path.join(directory, 'async.db')
+        self.addCleanup(db.CloseAll)
+        econ_platform_core.Databases.AddDatabase(db, 'ASYNC_TEST3')
+        econ_platform_core.Providers.AddProvider(IncrementalProvider())
+        tickers = ['AI@{0}'.format(x) for x in range(0, 6)]
+        counts = []
+        for dummy in range(0, 4):
+            # Make the reads go to the database.
+            econ_platform_core.Cache.Clear()
+            engine = AsyncFetchEngine('ASYNC_TEST3')
+            engine.Protocol = AlwaysUpdateProtocol()
+            out = asyncio.run(engine.FetchMany(tickers))
+            self.assertEqual(10, len(out['AI@0']))
+            econ_platform_core.Cache.Clear()
+            out = asyncio.run(econ_platform_core.afetch_many(tickers, database='ASYNC_TEST3', return_dict=True))
+            self.assertEqual(10, len(out['AI@5']))
+            counts.append(len(db.AllConnections))
+        # Nothing is left open by the pool threads.
+        self.assertEqual([0, 0, 0, 0], counts)
+
+
+class IncrementalProvider(econ_platform_core.ProviderWrapper):
+    def __init__(self):
+        super().__init__(name='AsyncIncrementalProvider', default_code='AI')
+        self.SupportsIncremental = True
+
+    def fetch(self, series_meta, start_date=None):
+        return pandas.Series([float(x) for x in range(0, 10)],
+                             index=pandas.date_range('2000-01-01', periods=10, freq='MS'))
+
+
+class AlwaysUpdateProtocol(NoUpdateProtocol):
+    def NeedsUpdate(self, series_meta, database_manager):
+        return True
+
+
+class WaitingProvider(econ_platform_core.ProviderWrapper):
+    """
+    Provider that runs in serial (like the User provider), and waits to be let go.
+    """
+    def __init__(self):
+        super().__init__(name='AsyncWaitingProvider', default_code='AW')
+        self.RefreshInParallel = False
+        self.Waiting = threading.Event()
+        self.Go = threading.Event()
+        self.Released = False
+
+    def fetch(self, series_meta):
+        self.Waiting.set()
+        self.Released = self.Go.wait(timeout=5.)
+        value = float(str(series_meta.ticker_query))
+        return pandas.Series([value, value + 1.], index=pandas.date_range('2000-01-01', periods=2, freq='MS'))
+
+
+class ThreadRecordingDatabase(database_sqlite3.DatabaseSqlite3):
+    """
+    Records the threads that call the database: method name -> set of thread idents.
+    """
+    def __init__(self):
+        super().__init__()
+        self.Threads = {}
+
+    def Record(self, method):
+        self.Threads.setdefault(method, set()).add(threading.get_ident())
+
+    def GetMetaMany(self, ticker_list):
+        self.Record('GetMetaMany')
+        return super().GetMetaMany(ticker_list)
+
+    def Retrieve(self, series_meta):
+        self.Record('Retrieve')
+        return super().Retrieve(series_meta)
+
+    def RetrieveMany(self, meta_list):
+        self.Record('RetrieveMany')
+        return super().RetrieveMany(meta_list)
+
+    def Write(self, ser, series_meta, overwrite=True):
+        self.Record('Write')
+        return super().Write(ser, series_meta, overwrite)
+
+    def SetLastRefresh(self, ticker_full, time_stamp=None):
+        self.Record('SetLastRefresh')
+        return super().SetLastRefresh(ticker_full, time_stamp)
+
+
+class ThreadRecordingProtocol(NoUpdateProtocol):
+    def __init__(self):
+        super().__init__()
+        self.Threads = {}
+
+    def GetIncrementalStart(self, series_meta, provider_manager, database_manager):
+        self.Threads.setdefault('GetIncrementalStart', set()).add(threading.get_ident())
+        return super().GetIncrementalStart(series_meta, provider_manager, database_manager)
+
+    def WriteFetched(self, result, database_manager):
+        self.Threads.setdefault('WriteFetched', set()).add(threading.get_ident())
+        return super().WriteFetched(result, database_manager)
+
+
+if __name__ == '__main__':
+    unittest.main()
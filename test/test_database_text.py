@@ -0,0 +1,173 @@
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas
+
+import econ_platform_core
+import econ_platform_core.databases.database_text as database_text
+import econ_platform_core.providers.provider_example as provider_example
+import loc_utils
+
+
+class TestDatabaseText(unittest.TestCase):
+    def setUp(self):
+        self.Config = loc_utils.use_test_configuration()
+        self.Directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.Directory)
+
+    def make_db(self, fmt):
+        self.Config.ConfigParser.read_dict({'D_TEXT': {'format': fmt}})
+        obj = database_text.DatabaseText()
+        obj.Directory = self.Directory
+        return obj
+
+    def test_binary_round_trip(self):
+        obj = self.make_db('binary')
+        ser = pandas.Series([1.5, 2., float('nan')], index=pandas.date_range('2000-01-01', periods=3, freq='MS'))
+        meta = obj.GetMeta('TEST@bin_1')
+        self.assertFalse(meta.Exists)
+        obj.Write(ser, meta)
+        self.assertTrue(os.path.exists(os.path.join(self.Directory, 'TEST_bin_1.bin')))
+        meta = obj.GetMeta('TEST@bin_1')
+        self.assertTrue(meta.Exists)
+        ser2 = obj.Retrieve(meta)
+        self.assertEqual(list(ser.index), list(ser2.index))
+        self.assertTrue(ser.equals(ser2))
+        self.assertEqual(['TEST@bin_1'], [str(x) for x in obj.GetAllValidSeriesTickers()])
+        # Numeric axis.
+        ser = pandas.Series([1., 2.], index=[0.5, 1.5])
+        obj.Write(ser, obj.GetMeta('TEST@bin_2'))
+        self.assertEqual([0.5, 1.5], list(obj.Retrieve(obj.GetMeta('TEST@bin_2')).index))
+
+    def test_switch_format(self):
+        obj = self.make_db('text')
+        ser = pandas.Series([1., 2.], index=[datetime.date(2000, 1, 1), datetime.date(2000, 2, 1)])
+        obj.Write(ser, obj.GetMeta('TEST@switch'))
+        self.assertTrue(os.path.exists(os.path.join(self.Directory, 'TEST_switch.txt')))
+        # The binary database can still read the text file; writing replaces it.
+        obj = self.make_db('binary')
+        self.assertEqual([1., 2.], list(obj.Retrieve(obj.GetMeta('TEST@switch')).values))
+        obj.Write(ser * 2., obj.GetMeta('TEST@switch'))
+        self.assertFalse(os.path.exists(os.path.join(self.Directory, 'TEST_switch.txt')))
+        self.assertEqual([2., 4.], list(obj.Retrieve(obj.GetMeta('TEST@switch')).values))
+
+
+    def test_manifest(self):
+        obj = self.make_db('binary')
+        ser = pandas.Series([1., 2., 3.], index=pandas.date_range('2000-01-01', periods=3, freq='MS'))
+        obj.Write(ser, obj.GetMeta('TEST@m_1'))
+        obj.Write(ser, obj.GetMeta('TEST@m_2'))
+        obj.Write(ser.iloc[0:2], obj.GetMeta('TEST@m_1'))
+        manifest = obj.LoadManifest()
+        self.assertEqual(2, manifest['TEST@m_1']['row_count'])
+        self.assertEqual('2000-03-01', manifest['TEST@m_2']['last_date'])
+        # A new object reads the manifest file (later lines win).
+        obj2 = self.make_db('binary')
+        self.assertEqual(['TEST@m_1', 'TEST@m_2'], [str(x) for x in obj2.GetAllValidSeriesTickers()])
+        self.assertEqual(2, obj2.LoadManifest()['TEST@m_1']['row_count'])
+        self.assertTrue(obj2.GetMeta('TEST@m_2').Exists)
+        self.assertFalse(obj2.GetMeta('TEST@m_3').Exists)
+        # Lose the manifest: rebuilt from the files.
+        os.remove(os.path.join(self.Directory, obj.ManifestName))
+        obj3 = self.make_db('binary')
+        self.assertEqual(['TEST@m_1', 'TEST@m_2'], [str(x) for x in obj3.GetAllValidSeriesTickers()])
+        self.assertEqual(2, obj3.LoadManifest()['TEST@m_1']['row_count'])
+
+    def count_manifest_lines(self):
+        with open(os.path.join(self.Directory, database_text.DatabaseText.ManifestName)) as f:
+            return len(f.readlines()) - 1
+
+    def test_manifest_compaction(self):
+        obj = self.make_db('text')
+        ser = pandas.Series([1., 2.], index=pandas.date_range('2000-01-01', periods=2, freq='MS'))
+        obj.Write(ser, obj.GetMeta('TEST@c_1'))
+        obj.Write(ser, obj.GetMeta('TEST@c_2'))
+        for i in range(0, 10):
+            obj.SetLastRefresh('TEST@c_1')
+            self.assertLessEqual(self.count_manifest_lines(), 2 * 2)
+        # Lines appended by another object are compacted when the manifest is read.
+        obj2 = self.make_db('text')
+        obj2.LoadManifest()
+        manifest_name = os.path.join(self.Directory, obj.ManifestName)
+        with open(manifest_name) as f:
+            lines = f.readlines()
+        with open(manifest_name, 'a') as f:
+            f.writelines(lines[1:] * 5)
+        self.assertEqual(['TEST@c_1', 'TEST@c_2'], [str(x) for x in obj.GetAllValidSeriesTickers()])
+        self.assertEqual(2, self.count_manifest_lines())
+        self.assertEqual(2, obj.LoadManifest()['TEST@c_2']['row_count'])
+
+    def test_manifest_missing_file(self):
+        obj = self.make_db('text')
+        ser = pandas.Series([1., 2.], index=pandas.date_range('2000-01-01', periods=2, freq='MS'))
+        obj.Write(ser, obj.GetMeta('TEST@gone'))
+        obj.Write(ser, obj.GetMeta('TEST@here'))
+        meta = obj.GetMeta('TEST@gone')
+        os.remove(os.path.join(self.Directory, 'TEST_gone.txt'))
+        with self.assertRaises(econ_platform_core.entity_and_errors.TickerNotFoundError):
+            obj.Retrieve(meta)
+        self.assertFalse(obj.GetMeta('TEST@gone').Exists)
+        self.assertEqual(['TEST@here'], [str(x) for x in obj.GetAllValidSeriesTickers()])
+        # The entry is gone from the file as well.
+        obj2 = self.make_db('text')
+        self.assertEqual(['TEST@here'], [str(x) for x in obj2.GetAllValidSeriesTickers()])
+
+    def test_delete_then_fetch(self):
+        # Deleting the file is how users force a fetch from the provider.
+        econ_platform_core.UpdateProtocolList.Initialise()
+        econ_platform_core.Providers.AddProvider(provider_example.ProviderExample())
+        obj = self.make_db('text')
+        econ_platform_core.Databases.AddDatabase(obj, 'TEXT_DELETE')
+        ser = econ_platform_core.fetch('TEST@TEST1', database='TEXT_DELETE')
+        os.remove(os.path.join(self.Directory, 'TEST_TEST1.txt'))
+        self.assertFalse(obj.Exists('TEST@TEST1'))
+        self.assertEqual(list(ser.values), list(econ_platform_core.fetch('TEST@TEST1', database='TEXT_DELETE').values))
+        self.assertTrue(os.path.exists(os.path.join(self.Directory, 'TEST_TEST1.txt')))
+        # Through GetMeta() as well.
+        os.remove(os.path.join(self.Directory, 'TEST_TEST1.txt'))
+        self.assertFalse(obj.GetMeta('TEST@TEST1').Exists)
+        self.assertEqual([], obj.GetAllValidSeriesTickers())
+
+    def test_expression_file_names(self):
+        # Expressions that only differ by an operator.
+        obj = self.make_db('text')
+        tickers = ['U@EXPR(2 * {TEST@TEST1})', 'U@EXPR(2 / {TEST@TEST1})', 'U@EXPR(2 + {TEST@TEST1})']
+        index = pandas.date_range('2000-01-01', periods=2, freq='MS')
+        for value, ticker in enumerate(tickers):
+            self.assertFalse(obj.GetMeta(ticker).Exists)
+            obj.Write(pandas.Series([float(value), 1.], index=index), obj.GetMeta(ticker))
+        self.assertEqual(3, len(set(obj.GetFileName(x, full_path=False) for x in tickers)))
+        # Same results with or without the manifest.
+        for use_manifest in (True, False):
+            if not use_manifest:
+                os.remove(os.path.join(self.Directory, obj.ManifestName))
+                obj = self.make_db('text')
+            for value, ticker in enumerate(tickers):
+                meta = obj.GetMeta(ticker)
+                self.assertEqual(ticker, str(meta.ticker_full))
+                self.assertEqual([float(value), 1.], list(obj.Retrieve(meta).values))
+
+    def test_file_names(self):
+        obj = self.make_db('text')
+        # These all become "TEST_A_B" when the special characters are replaced.
+        tickers = ['TEST@A_B', 'TEST@A.B', 'TEST@A/B', 'TEST_A@B']
+        index = pandas.date_range('2000-01-01', periods=2, freq='MS')
+        for value, ticker in enumerate(tickers):
+            obj.Write(pandas.Series([float(value), 1.], index=index), obj.GetMeta(ticker))
+        file_names = [obj.GetFileName(x, full_path=False) for x in tickers]
+        self.assertEqual(4, len(set(file_names)))
+        # The simple ticker keeps its readable name.
+        self.assertEqual('TEST_A_B.txt', file_names[0])
+        os.remove(os.path.join(self.Directory, obj.ManifestName))
+        obj = self.make_db('text')
+        for value, ticker in enumerate(tickers):
+            self.assertEqual([float(value), 1.], list(obj.Retrieve(obj.GetMeta(ticker)).values))
+
+
+if __name__ == '__main__':
+    unittest.main()
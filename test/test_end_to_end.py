@@ -54,6 +54,193 @@ class dummy_test(unittest.TestCase):
         ser = econ_platform_core.fetch('TEST@TEST1', database='TEXT')
         self.assertTrue(targ.equals(ser))
 
+    def test_fetch_many(self):
+        config_wrapper = loc_utils.use_test_configuration()
+        econ_platform_core.PlatformConfiguration = config_wrapper
+        econ_platform_core.init_package()
+        loc_utils.delete_data_file('TEST_TEST1.txt')
+        df = econ_platform_core.fetch_many(['TEST@TEST1'], database='TEXT')
+        targ = get_test_series('TEST1')
+        self.assertEqual(list(targ.values), list(df['TEST@TEST1'].values))
+        # Second time: from the database.
+        out = econ_platform_core.fetch_many(['TEST@TEST1', 'TEST@TEST1'], database='TEXT', return_dict=True)
+        self.assertEqual(['TEST@TEST1'], list(out.keys()))
+        self.assertEqual(list(targ.values), list(out['TEST@TEST1'].values))
+
+    def test_lazy_extensions(self):
+        config_wrapper = loc_utils.use_test_configuration()
+        econ_platform_core.PlatformConfiguration = config_wrapper
+        econ_platform_core.init_package()
+        ext_name = 'Example Provider (for testing)'
+        self.assertIn(ext_name, econ_platform_core.ExtensionList.LazyExtensions)
+        self.assertIn('TEST', econ_platform_core.Providers.LazyProviders)
+        self.assertNotIn('TEST', econ_platform_core.Providers.ProviderDict)
+        provider = econ_platform_core.Providers['TEST']
+        self.assertEqual('Example Provider', provider.Name)
+        self.assertIn(ext_name, econ_platform_core.ExtensionList.LoadedExtensions)
+        self.assertNotIn(ext_name, econ_platform_core.ExtensionList.LazyExtensions)
+        self.assertNotIn('TEST', econ_platform_core.Providers.LazyProviders)
+        # Turn it off: everything loaded at start.
+        config_wrapper.ConfigParser.read_dict({'Options': {'LazyExtensions': 'False'}})
+        econ_platform_core.init_package()
+        self.assertEqual([], econ_platform_core.ExtensionList.LazyExtensions)
+        self.assertIn('TEST', econ_platform_core.Providers.ProviderDict)
+
+    def test_startup_profile(self):
+        config_wrapper = loc_utils.use_test_configuration()
+        econ_platform_core.PlatformConfiguration = config_wrapper
+        econ_platform_core.init_package()
+        df = econ_platform_core.get_startup_profile()
+        phases = list(df[df['Type'] == 'Phase']['Name'])
+        self.assertIn('Databases.Initialise', phases)
+        self.assertIn('Load extensions (econ_platform_core)', phases)
+        ext = df[df['Type'] == 'Extension'].set_index('Name')
+        self.assertEqual('Loaded', ext.loc['SQLite Database (sqlite3)', 'Status'])
+        self.assertEqual('Registered', ext.loc['Example Provider (for testing)', 'Status'])
+        self.assertTrue((df['WallTime'] >= 0.).all())
+        # Loading on first use adds a row.
+        econ_platform_core.Providers['TEST']
+        df = econ_platform_core.get_startup_profile()
+        self.assertEqual(['Registered', 'Loaded on first use'],
+                         list(df[df['Name'] == 'Example Provider (for testing)']['Status']))
+
+    def test_user_memo(self):
+        config_wrapper = loc_utils.use_test_configuration()
+        econ_platform_core.PlatformConfiguration = config_wrapper
+        econ_platform_core.init_package()
+        loc_utils.delete_data_file('TEST_TEST1.txt')
+        loc_utils.delete_series_file('U@memo_fn(0)')
+        loc_utils.delete_data_file('U_memo.json')
+        calls = []
+
+        def memo_fn(meta, fn_args):
+            calls.append(fn_args)
+            return 2. * econ_platform_core.fetch('TEST@TEST1', database='TEXT')
+
+        user_provider = econ_platform_core.Providers.UserProvider
+        user_provider.FunctionMapper['memo_fn'] = memo_fn
+        ser = econ_platform_core.fetch('U@memo_fn(0)', database='TEXT')
+        self.assertEqual(1, len(calls))
+        self.assertEqual(list(2. * get_test_series('TEST1').values), list(ser.values))
+        self.assertEqual(['TEXT\tTEST@TEST1'], list(user_provider.Memo['TEXT\tU@memo_fn(0)']['Inputs'].keys()))
+        self.assertTrue(os.path.exists(os.path.join(os.path.dirname(__file__), 'data', 'U_memo.json')))
+        # Inputs unchanged: no call. (The update protocol sets DatabaseCode when it calls the provider.)
+        database = econ_platform_core.Databases['TEXT']
+        meta = database.GetMeta('U@memo_fn(0)')
+        meta.DatabaseCode = 'TEXT'
+        with self.assertRaises(econ_platform_core.entity_and_errors.NoDataError):
+            user_provider.fetch(meta)
+        self.assertEqual(1, len(calls))
+        # Change the input.
+        database.Write(get_test_series('TEST1') + 1., database.GetMeta('TEST@TEST1'))
+        ser = user_provider.fetch(meta)
+        self.assertEqual(2, len(calls))
+        self.assertEqual(list(2. * (get_test_series('TEST1').values + 1.)), list(ser.values))
+        # Change the function (same name, different code): recomputed, even though the inputs did not change.
+
+        def memo_fn(meta, fn_args):
+            calls.append(fn_args)
+            return 3. * econ_platform_core.fetch('TEST@TEST1', database='TEXT')
+        user_provider.FunctionMapper['memo_fn'] = memo_fn
+        ser = user_provider.fetch(meta)
+        self.assertEqual(3, len(calls))
+        self.assertEqual(list(3. * (get_test_series('TEST1').values + 1.)), list(ser.values))
+        with self.assertRaises(econ_platform_core.entity_and_errors.NoDataError):
+            user_provider.fetch(meta)
+        self.assertEqual(3, len(calls))
+
+    def test_user_memo_databases(self):
+        config_wrapper = loc_utils.use_test_configuration()
+        econ_platform_core.PlatformConfiguration = config_wrapper
+        econ_platform_core.init_package()
+        loc_utils.delete_data_file('TEST_TEST1.txt')
+        loc_utils.delete_series_file('U@memo_db(0)')
+        loc_utils.delete_data_file('U_memo.json')
+        calls = []
+
+        def memo_db(meta, fn_args):
+            calls.append(fn_args)
+            return 2. * econ_platform_core.fetch('TEST@TEST1', database='TEXT')
+
+        user_provider = econ_platform_core.Providers.UserProvider
+        user_provider.FunctionMapper['memo_db'] = memo_db
+        econ_platform_core.fetch('U@memo_db(0)', database='TEXT')
+        self.assertEqual(1, len(calls))
+        # Another database has an old copy of the series. The inputs have not changed since the series was
+        # computed for TEXT, but that does not make the other copy up to date.
+        import econ_platform_core.databases.database_sqlite3 as database_sqlite3
+        other = database_sqlite3.DatabaseSqlite3()
+        other.DatabaseFile = ':memory:'
+        econ_platform_core.Databases.AddDatabase(other, 'MEMO_TEST')
+        other.Write(get_test_series('TEST1') * 0., other.GetMeta('U@memo_db(0)'))
+        meta = other.GetMeta('U@memo_db(0)')
+        meta.DatabaseCode = 'MEMO_TEST'
+        ser = user_provider.fetch(meta)
+        self.assertEqual(2, len(calls))
+        self.assertEqual(list(2. * econ_platform_core.fetch('TEST@TEST1', database='TEXT').values), list(ser.values))
+        self.assertIn('MEMO_TEST\tU@memo_db(0)', user_provider.Memo)
+        self.assertIn('TEXT\tU@memo_db(0)', user_provider.Memo)
+
+    def test_user_memo_nested(self):
+        config_wrapper = loc_utils.use_test_configuration()
+        econ_platform_core.PlatformConfiguration = config_wrapper
+        econ_platform_core.init_package()
+        loc_utils.delete_data_file('TEST_TEST1.txt')
+        loc_utils.delete_series_file('U@memo_inner(0)')
+        loc_utils.delete_series_file('U@memo_outer(0)')
+        loc_utils.delete_data_file('U_memo.json')
+
+        def memo_inner(meta, fn_args):
+            return 2. * econ_platform_core.fetch('TEST@TEST1', database='TEXT')
+
+        def memo_outer(meta, fn_args):
+            return 3. * econ_platform_core.fetch('U@memo_inner(0)', database='TEXT')
+
+        user_provider = econ_platform_core.Providers.UserProvider
+        user_provider.FunctionMapper['memo_inner'] = memo_inner
+        user_provider.FunctionMapper['memo_outer'] = memo_outer
+        econ_platform_core.fetch('U@memo_inner(0)', database='TEXT')
+        # Every series is stale, so that the inner series checks its inputs while the outer one is computed.
+        protocol_list = econ_platform_core.UpdateProtocolList
+        self.addCleanup(setattr, protocol_list, 'Default', protocol_list.Default)
+        self.addCleanup(setattr, protocol_list['SIMPLE'], 'NumHours', protocol_list['SIMPLE'].NumHours)
+        protocol_list.Default = 'SIMPLE'
+        protocol_list['SIMPLE'].NumHours = 0
+        econ_platform_core.fetch('U@memo_outer(0)', database='TEXT')
+        # Only the series that the outer function read, not the inputs of the inner series.
+        self.assertEqual(['TEXT\tU@memo_inner(0)'],
+                         list(user_provider.Memo['TEXT\tU@memo_outer(0)']['Inputs'].keys()))
+        self.assertEqual(['TEXT\tTEST@TEST1'], list(user_provider.Memo['TEXT\tU@memo_inner(0)']['Inputs'].keys()))
+
+    def test_user_expression(self):
+        config_wrapper = loc_utils.use_test_configuration()
+        econ_platform_core.PlatformConfiguration = config_wrapper
+        econ_platform_core.init_package()
+        loc_utils.delete_data_file('TEST_TEST1.txt')
+        loc_utils.delete_series_file('U@EXPR(2 * {TEST@TEST1})')
+        ser = econ_platform_core.fetch('U@EXPR(2 * {TEST@TEST1})', database='TEXT')
+        targ = get_test_series('TEST1')
+        self.assertEqual(list(2. * targ.values), list(ser.values))
+        # The leaf was fetched with fetch_many(), and recorded as an input.
+        memo = econ_platform_core.Providers.UserProvider.Memo
+        entry = memo['TEXT\tU@EXPR(2 * {TEST@TEST1})']
+        self.assertEqual(['TEXT\tTEST@TEST1'], list(entry['Inputs'].keys()))
+        self.assertEqual('EXPR:EXPR(2 * {TEST@TEST1})', entry['Function'])
+
+    def test_user_expression_database(self):
+        config_wrapper = loc_utils.use_test_configuration()
+        econ_platform_core.PlatformConfiguration = config_wrapper
+        econ_platform_core.init_package()
+        db = econ_platform_core.Databases['SQLITE']
+        db.Delete(db.GetMeta('U@EXPR(3 * {TEST@TEST1})'), warn_if_non_existent=False)
+        ser = econ_platform_core.fetch('U@EXPR(3 * {TEST@TEST1})', database='SQLITE')
+        targ = get_test_series('TEST1')
+        self.assertEqual(list(3. * targ.values), list(ser.values))
+        # The leaf comes from the same database as the expression, not the default.
+        memo = econ_platform_core.Providers.UserProvider.Memo
+        entry = memo['SQLITE\tU@EXPR(3 * {TEST@TEST1})']
+        self.assertEqual(['SQLITE\tTEST@TEST1'], list(entry['Inputs'].keys()))
+
     def test_user_function(self):
         config_wrapper = loc_utils.use_test_configuration()
         econ_platform_core.PlatformConfiguration = config_wrapper
@@ -0,0 +1,81 @@
+import unittest
+
+import numpy
+import pandas
+
+from econ_platform_core.entity_and_errors import PlatformError
+from econ_platform_core.expressions import SeriesExpression
+
+
+def monthly(values, start='2000-01-01'):
+    return pandas.Series(values, index=pandas.date_range(start, periods=len(values), freq='MS'), dtype=float)
+
+
+class TestParse(unittest.TestCase):
+    def test_leaves(self):
+        expr = SeriesExpression('EXPR({F@A} / {F@B} + {F@A})')
+        self.assertEqual(['F@A', 'F@B'], expr.Leaves)
+        self.assertEqual('{F@A} / {F@B} + {F@A}', expr.Text)
+
+    def test_shared_subexpressions(self):
+        expr = SeriesExpression('pct({F@A}, 1) * pct({F@A}, 1) - pct({F@A}, 1)')
+        # One leaf, one constant, one pct() node, then the two operators.
+        self.assertEqual(5, len(expr.Nodes))
+        self.assertEqual(expr.Order[-1], expr.RootKey)
+
+    def test_errors(self):
+        with self.assertRaises(PlatformError):
+            SeriesExpression('1 + 2')
+        with self.assertRaises(PlatformError):
+            SeriesExpression('{F@A} +')
+        with self.assertRaises(PlatformError):
+            SeriesExpression('unknown({F@A})')
+        with self.assertRaises(PlatformError):
+            SeriesExpression('__import__("os")')
+        with self.assertRaises(PlatformError):
+            SeriesExpression('lag({F@A}, 1, 2)')
+        with self.assertRaises(PlatformError):
+            SeriesExpression('{F@A}.real')
+
+
+class TestEvaluate(unittest.TestCase):
+    def test_arithmetic(self):
+        a = monthly([1., 2., 4.])
+        b = monthly([2., 2.], start='2000-02-01')
+        ser = SeriesExpression('100 * {F@A} / {F@B} - -1').EvaluateData({'F@A': a, 'F@B': b})
+        self.assertEqual([101., 201.], list(ser.values))
+        self.assertEqual(list(b.index), list(ser.index))
+
+    def test_transforms_use_own_observations(self):
+        a = monthly([100., 110., 121.])
+        # Daily series: the aligned index has many dates where a is missing.
+        d = pandas.Series(1., index=pandas.date_range('2000-01-01', '2000-03-01', freq='D'))
+        data = {'F@A': a, 'F@D': d}
+        ser = SeriesExpression('pct({F@A}) * {F@D}').EvaluateData(data)
+        self.assertEqual(2, len(ser))
+        self.assertTrue(numpy.allclose([10., 10.], ser.values))
+        ser = SeriesExpression('diff({F@A}, 2)').EvaluateData(data)
+        self.assertEqual([21.], list(ser.values))
+        ser = SeriesExpression('annualised({F@A}, 1, 12)').EvaluateData(data)
+        self.assertAlmostEqual(100. * (1.1 ** 12 - 1.), ser.values[0])
+        ser = SeriesExpression('rolling_mean({F@A}, 2)').EvaluateData(data)
+        self.assertEqual([105., 115.5], list(ser.values))
+
+    def test_aggregates(self):
+        a = monthly([1., 2., 3.])
+        b = monthly([10., 20.])
+        data = {'F@A': a, 'F@B': b}
+        ser = SeriesExpression('sum({F@A}, {F@B}, 1)').EvaluateData(data)
+        self.assertEqual([12., 23.], list(ser.values))
+        ser = SeriesExpression('max({F@A}, 2)').EvaluateData(data)
+        self.assertEqual([2., 2., 3.], list(ser.values))
+
+    def test_splice(self):
+        old = monthly([1., 2., 4.])
+        new = monthly([20., 40., 50.], start='2000-02-01')
+        ser = SeriesExpression('splice({F@NEW}, {F@OLD})').EvaluateData({'F@NEW': new, 'F@OLD': old})
+        self.assertEqual([10., 20., 40., 50.], list(ser.values))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+import pandas
+
+import econ_platform_core
+import econ_platform_core.providers.provider_cansim_csv
+from econ_platform_core.entity_and_errors import PlatformError, TickerNotFoundError
+from econ_platform_core.series_metadata import SeriesMetadata
+import econ_platform_core.tickers as tickers
+import loc_utils
+
+# A cut-down version of a StatsCan table; the first row has the encoding marker.
+TABLE_CSV = '﻿"REF_DATE","GEO","DGUID","Prices","UOM","UOM_ID","VECTOR","COORDINATE","VALUE","STATUS"\n' + \
+    '"2000-02","Canada","2016A000011124","Nominal","Dollars","81","v1","1.1","2.5",""\n' + \
+    '"2000-01","Canada","2016A000011124","Nominal","Dollars","81","v1","1.1","1.5",""\n' + \
+    '"2000-01","Canada","2016A000011124","Real","Dollars","81","v2","1.2","10",""\n' + \
+    '"2000-02","Canada","2016A000011124","Real","Dollars","81","v2","1.2","..",".."\n' + \
+    '"2000-03","Canada","2016A000011124","Real","Dollars","81","v2","1.2","12","E"\n' + \
+    '"2000-03","Canada","2016A000011124","Nominal","Dollars","81","v1","1.1","3.5",""\n'
+
+
+class TestCansimParse(unittest.TestCase):
+    def setUp(self):
+        self.Config = loc_utils.use_test_configuration()
+        self.TempDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.TempDir)
+
+    def make_zip(self, table_name='12345678'):
+        with zipfile.ZipFile(os.path.join(self.TempDir, table_name + '-eng.zip'), 'w') as myzip:
+            myzip.writestr(table_name + '.csv', TABLE_CSV.encode('utf-8'))
+
+    def run_fetch(self, parse_mode, chunk_rows=2, vector='v2'):
+        self.Config.ConfigParser.read_dict({'P_STATSCAN': {'parse_mode': parse_mode,
+                                                           'chunk_rows': str(chunk_rows)}})
+        obj = econ_platform_core.providers.provider_cansim_csv.ProviderCansim_Csv()
+        obj.ProviderCode = 'CCSV'
+        obj.DataDirectory = self.TempDir
+        meta = SeriesMetadata()
+        meta.ticker_query = tickers.TickerFetch('12345678|' + vector)
+        meta.series_provider_code = tickers.TickerProviderCode('CCSV')
+        meta.ticker_full = tickers.create_ticker_full(meta.series_provider_code, meta.ticker_query)
+        ser, meta = obj.fetch(meta)
+        return obj, ser, meta
+
+    def test_stream_matches_legacy(self):
+        self.make_zip()
+        obj_legacy, _, _ = self.run_fetch('legacy')
+        self.make_zip()
+        obj, ser, meta = self.run_fetch('stream')
+        # Nothing was extracted; the zip was archived.
+        self.assertFalse(os.path.exists(os.path.join(self.TempDir, '12345678.csv')))
+        self.assertTrue(os.path.exists(os.path.join(self.TempDir, 'archive', '12345678-eng.zip')))
+        self.assertEqual(['2000-01-01', '2000-03-01'], [x.strftime('%Y-%m-%d') for x in ser.index])
+        self.assertEqual([10., 12.], list(ser.values))
+        self.assertEqual(sorted(obj_legacy.TableSeries.keys()), sorted(obj.TableSeries.keys()))
+        for ticker, legacy_ser in obj_legacy.TableSeries.items():
+            new_ser = obj.TableSeries[ticker]
+            self.assertEqual(list(legacy_ser.values), list(new_ser.values))
+            self.assertEqual(list(pandas.DatetimeIndex(legacy_ser.index)), list(new_ser.index))
+            self.assertEqual(obj_legacy.TableMeta[ticker].series_name, obj.TableMeta[ticker].series_name)
+            self.assertEqual(obj_legacy.TableMeta[ticker].ProviderMetadata, obj.TableMeta[ticker].ProviderMetadata)
+
+    def test_stream_not_found(self):
+        self.make_zip()
+        with self.assertRaises(TickerNotFoundError):
+            self.run_fetch('stream', vector='v99')
+        # Second time, fails from the index.
+        with self.assertRaises(TickerNotFoundError):
+            self.run_fetch('stream', vector='v99')
+
+    def test_index(self):
+        # Nothing downloaded, nothing indexed.
+        with self.assertRaises(PlatformError):
+            self.run_fetch('stream')
+        self.make_zip()
+        obj, ser, meta = self.run_fetch('stream')
+        self.assertTrue(obj.TableWasFetched)
+        # Zip is archived; the next fetch uses the index.
+        self.assertFalse(os.path.exists(os.path.join(self.TempDir, '12345678-eng.zip')))
+        obj2, ser2, meta2 = self.run_fetch('stream', vector='v1')
+        self.assertFalse(obj2.TableWasFetched)
+        self.assertEqual([1.5, 2.5, 3.5], list(ser2.values))
+        self.assertEqual(list(obj.TableSeries['CCSV@12345678|v1'].index), list(ser2.index))
+        self.assertEqual(str(obj.TableMeta['CCSV@12345678|v1'].ticker_full), str(meta2.ticker_full))
+        self.assertEqual(obj.TableMeta['CCSV@12345678|v1'].series_name, meta2.series_name)
+        self.assertEqual(obj.TableMeta['CCSV@12345678|v1'].ProviderMetadata, meta2.ProviderMetadata)
+        with self.assertRaises(TickerNotFoundError):
+            self.run_fetch('stream', vector='v99')
+
+if __name__ == '__main__':
+    unittest.main()
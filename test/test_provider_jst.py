@@ -0,0 +1,147 @@
+"""
+Tests for the JST Macrohistory provider, with pandas.read_excel() patched (so no openpyxl needed).
+"""
+
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+import numpy
+import pandas
+
+import econ_platform_core
+import econ_platform_core.series_metadata
+import econ_platform_core.tickers as tickers
+from econ_platform_core.entity_and_errors import TickerNotFoundError
+import econ_platform.providers.provider_jst_macrohistory as provider_jst_macrohistory
+import loc_utils
+
+
+def make_data_sheet():
+    # Canada has fewer years than the US.
+    rows = [(1870, 'United States', 'USA', 111, 100., 1.),
+            (1871, 'United States', 'USA', 111, 101., numpy.nan),
+            (1872, 'United States', 'USA', 111, 102., 3.),
+            (1873, 'United States', 'USA', 111, 103., 4.),
+            (1871, 'Canada', 'CAN', 156, 10., 0.5),
+            (1872, 'Canada', 'CAN', 156, 11., 0.6)]
+    return pandas.DataFrame(rows, columns=['year', 'country', 'iso', 'ifs', 'gdp', 'cpi'])
+
+
+class FakeExcel(object):
+    def __init__(self):
+        self.Calls = []
+        self.DataSheet = None
+
+    def __call__(self, fname, sheet_name=None, header=None, index_col=None):
+        self.Calls.append(sheet_name)
+        if sheet_name == 'Data':
+            if self.DataSheet is not None:
+                return self.DataSheet.copy()
+            return make_data_sheet()
+        return pandas.DataFrame({1: ['Real GDP', 'Consumer prices']}, index=['gdp', 'cpi'])
+
+
+def old_table(data_sheet, description_sheet, provider_code):
+    """
+    The table built by the fetch() code before the data sheet was pivoted.
+    """
+    out = {}
+    for country in set(data_sheet['country']):
+        df = data_sheet.loc[data_sheet['country'] == country]
+        iso_code = df['iso'][df.index[0]]
+        cal_dates = [datetime.date(x, 1, 1) for x in df['year']]
+        for c in df.columns:
+            if c in ('year', 'iso', 'country', 'ifs'):
+                continue
+            ser = pandas.Series(df[c])
+            ser.index = cal_dates
+            full_ticker = str(tickers.create_ticker_full(provider_code, '{0} {1}'.format(iso_code, c)))
+            out[full_ticker] = (ser, '{0} {1}'.format(country, description_sheet.at[c, 1]))
+    return out
+
+
+class TestJST(unittest.TestCase):
+    def setUp(self):
+        config = loc_utils.use_test_configuration()
+        config.ConfigParser.read_dict({'ProviderList': {'JST_Macrohistory': 'JST'}})
+        self.Directory = tempfile.mkdtemp()
+        self.FileName = os.path.join(self.Directory, 'JSTdatasetR4.xlsx')
+        with open(self.FileName, 'w') as f:
+            f.write('not really a workbook')
+        self.Excel = FakeExcel()
+        patcher = unittest.mock.patch('pandas.read_excel', self.Excel)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.Directory)
+
+    def make_provider(self):
+        obj = provider_jst_macrohistory.ProviderJSTMacrohistory()
+        obj.Directory = self.Directory
+        return obj
+
+    @staticmethod
+    def make_meta(query):
+        meta = econ_platform_core.series_metadata.SeriesMetadata()
+        meta.ticker_full = tickers.create_ticker_full('JST', query)
+        return meta
+
+    def test_same_as_old(self):
+        obj = self.make_provider()
+        obj.fetch(self.make_meta('USA gdp'))
+        expected = old_table(make_data_sheet(), FakeExcel()(None, 'Variable description'), 'JST')
+        self.assertEqual(sorted(expected), sorted(obj.TableSeries))
+        for ticker, (old_ser, old_name) in expected.items():
+            ser = obj.TableSeries[ticker]
+            self.assertEqual(old_name, obj.TableMeta[ticker].series_name)
+            # Same values on the dates of the old series...
+            self.assertTrue(numpy.array_equal(old_ser.values.astype(float), ser[old_ser.index].values,
+                                              equal_nan=True), ticker)
+            # ... and only missing values on the other dates.
+            self.assertTrue(ser.drop(old_ser.index).isnull().all(), ticker)
+
+    def test_union_of_years(self):
+        obj = self.make_provider()
+        ser, meta = obj.fetch(self.make_meta('CAN gdp'))
+        # The index is the years for all countries, not just Canada.
+        self.assertEqual([datetime.date(x, 1, 1) for x in range(1870, 1874)], list(ser.index))
+        self.assertTrue(numpy.array_equal([numpy.nan, 10., 11., numpy.nan], ser.values, equal_nan=True))
+        self.assertEqual([10., 11.], list(ser.dropna().values))
+        self.assertEqual('Canada Real GDP', meta.series_name)
+
+    def test_duplicate_rows(self):
+        data_sheet = make_data_sheet()
+        duplicate = pandas.DataFrame([(1872, 'Canada', 'CAN', 156, 12., 0.7)], columns=data_sheet.columns)
+        self.Excel.DataSheet = pandas.concat([data_sheet, duplicate], ignore_index=True)
+        obj = self.make_provider()
+        ser, meta = obj.fetch(self.make_meta('CAN gdp'))
+        # The last row for the year is used.
+        self.assertEqual([10., 12.], list(ser.dropna().values))
+        self.assertEqual([100., 101., 102., 103.], list(obj.TableSeries['JST@USA gdp'].values))
+
+    def test_cache(self):
+        obj = self.make_provider()
+        obj.fetch(self.make_meta('USA cpi'))
+        self.assertEqual(['Data', 'Variable description'], self.Excel.Calls)
+        # Same object: kept in memory, even for a miss.
+        with self.assertRaises(TickerNotFoundError):
+            obj.fetch(self.make_meta('USA nothing'))
+        # New object: read from the cache subdirectory.
+        obj2 = self.make_provider()
+        ser, _ = obj2.fetch(self.make_meta('USA cpi'))
+        self.assertEqual(2, len(self.Excel.Calls))
+        self.assertTrue(obj.TableSeries['JST@USA cpi'].equals(ser))
+        # Changed workbook: read again.
+        with open(self.FileName, 'w') as f:
+            f.write('a new version of the workbook')
+        obj2.fetch(self.make_meta('USA cpi'))
+        self.assertEqual(4, len(self.Excel.Calls))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,266 @@
+"""
+Tests for the XLS providers, without xlrd: the workbooks are dummy files, and the parsing is done by a subclass
+(or pandas.read_excel() is patched).
+"""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+import pandas
+
+import econ_platform_core
+import econ_platform_core.series_metadata
+import econ_platform_core.tickers as tickers
+import econ_platform_core.utils
+from econ_platform_core.entity_and_errors import TickerNotFoundError
+import econ_platform.providers.provider_abs_xls as provider_abs_xls
+import econ_platform.providers.provider_xls_grab as provider_xls_grab
+import loc_utils
+
+
+class SyntheticXlsGrab(provider_xls_grab.ProviderXlsGrab):
+    """
+    ParseWorkbook() makes up two series per workbook, based on the file name: "<name>_A" (only in that
+    workbook) and "SHARED" (in all of them, with one date per workbook).
+    """
+    def __init__(self):
+        super().__init__(name='SYNTHETIC_XLS', default_code='XT')
+        self.Dialect = 'Australian'
+        self.ParseCount = 0
+
+    def ParseWorkbook(self, fname):
+        self.ParseCount += 1
+        base = os.path.splitext(os.path.basename(fname))[0]
+        with open(fname, 'r') as f:
+            value = float(len(f.read()))
+        out = []
+        shared_date = '200{0}-01-01'.format(base[-1])
+        for query, dates in ((base + '_A', ['2000-01-01', '2000-02-01']), ('SHARED', [shared_date])):
+            meta = econ_platform_core.series_metadata.SeriesMetadata()
+            meta.ticker_full = tickers.create_ticker_full(self.ProviderCode, query)
+            meta.series_provider_code = tickers.TickerProviderCode(self.ProviderCode)
+            meta.ticker_query = tickers.TickerFetch(query)
+            meta.series_name = 'Name ' + query
+            meta.series_description = 'Description ' + query
+            ser = pandas.Series([value] * len(dates), index=pandas.to_datetime(dates))
+            out.append((ser, meta))
+        return out
+
+
+def build_table(provider):
+    provider.TableSeries = {}
+    provider.TableMeta = {}
+    provider.BuildTable()
+    return provider.TableSeries
+
+
+class TestXlsGrabCache(unittest.TestCase):
+    def setUp(self):
+        loc_utils.use_test_configuration()
+        self.Directory = tempfile.mkdtemp()
+        for name, text in (('book1', 'abc'), ('book2', 'defg')):
+            with open(os.path.join(self.Directory, name + '.xls'), 'w') as f:
+                f.write(text)
+
+    def tearDown(self):
+        shutil.rmtree(self.Directory)
+
+    def make_provider(self):
+        obj = SyntheticXlsGrab()
+        obj.Directory = self.Directory
+        return obj
+
+    def assertSameTable(self, expected, actual):
+        self.assertEqual(sorted(expected), sorted(actual))
+        for ticker in expected:
+            self.assertTrue(expected[ticker].equals(actual[ticker]), ticker)
+
+    def test_cache(self):
+        obj = self.make_provider()
+        fresh = build_table(obj)
+        self.assertEqual(2, obj.ParseCount)
+        self.assertEqual(['XT@SHARED', 'XT@book1_A', 'XT@book2_A'], sorted(fresh))
+        self.assertEqual(2, len(fresh['XT@SHARED']))
+        # New object: everything comes from the cache.
+        obj = self.make_provider()
+        cached = build_table(obj)
+        self.assertEqual(0, obj.ParseCount)
+        self.assertSameTable(fresh, cached)
+        self.assertEqual('Name book1_A', obj.TableMeta['XT@book1_A'].series_name)
+        # Same as without the cache.
+        obj = self.make_provider()
+        obj.UseWorkbookCache = False
+        self.assertSameTable(fresh, build_table(obj))
+
+    def test_parse_processes(self):
+        for name in ('book3', 'book4'):
+            with open(os.path.join(self.Directory, name + '.xls'), 'w') as f:
+                f.write(name * 3)
+        obj = self.make_provider()
+        obj.UseWorkbookCache = False
+        serial = build_table(obj)
+        self.assertEqual(4, obj.ParseCount)
+        obj = self.make_provider()
+        obj.ParseProcesses = 2
+        parallel = build_table(obj)
+        # Parsed in the workers.
+        self.assertEqual(0, obj.ParseCount)
+        self.assertSameTable(serial, parallel)
+        self.assertEqual(4, len(parallel['XT@SHARED']))
+        for ticker in serial:
+            self.assertEqual(obj.TableMeta[ticker].series_description, 'Description ' + ticker[3:])
+        # The worker payloads were cached.
+        obj = self.make_provider()
+        self.assertSameTable(serial, build_table(obj))
+        self.assertEqual(0, obj.ParseCount)
+
+    def test_parse_processes_config(self):
+        config = loc_utils.use_test_configuration()
+        obj = self.make_provider()
+        obj.SetParseProcesses()
+        self.assertEqual(1, obj.ParseProcesses)
+        config.ConfigParser.read_dict({'P_XT': {'parse_processes': '3'}})
+        obj.SetParseProcesses()
+        self.assertEqual(3, obj.ParseProcesses)
+        self.assertEqual(1, econ_platform_core.utils.get_parse_processes('ABSXLS'))
+
+    def test_cache_invalidation(self):
+        obj = self.make_provider()
+        build_table(obj)
+        fname = os.path.join(self.Directory, 'book1.xls')
+        # Size change
+        with open(fname, 'w') as f:
+            f.write('abcdefgh')
+        obj = self.make_provider()
+        table = build_table(obj)
+        self.assertEqual(1, obj.ParseCount)
+        self.assertEqual(8., table['XT@book1_A'].iloc[0])
+        # Same size, different modification time.
+        with open(fname, 'w') as f:
+            f.write('hgfedcba')
+        stat = os.stat(fname)
+        os.utime(fname, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        obj = self.make_provider()
+        build_table(obj)
+        self.assertEqual(1, obj.ParseCount)
+        # Bumping the cache version re-parses everything.
+        obj = self.make_provider()
+        obj.WorkbookCacheVersion += 1
+        build_table(obj)
+        self.assertEqual(2, obj.ParseCount)
+        obj.ParseCount = 0
+        build_table(obj)
+        self.assertEqual(0, obj.ParseCount)
+
+
+def abs_sheet(series):
+    """
+    Build an ABS data sheet, as read_excel(header=None, index_col=0) returns it: the first row has the series
+    names, then the labels, then the dates.
+    """
+    dates = list(pandas.date_range('2000-01-01', periods=3, freq='MS'))
+    index = ['Title', 'Unit', 'Series ID'] + dates
+    columns = {}
+    for col, (name, series_id, start) in enumerate(series, start=1):
+        columns[col] = [name, 'Number', series_id, start, start + 1., start + 2.]
+    return pandas.DataFrame(columns, index=index)
+
+
+class FakeExcel(object):
+    """
+    Stands in for pandas.read_excel(); records the calls.
+    """
+    def __init__(self):
+        self.Calls = []
+        index_sheet = pandas.DataFrame({1: ['Index', 'Not data']}, index=['Contents', 'Other'])
+        self.Sheets = {'Index': index_sheet,
+                       'Data1': abs_sheet([('Jobs ;  Total', 'A100X', 1.), ('Jobs ;  Male', 'A101X', 10.)]),
+                       'Data2': abs_sheet([('Wages', 'A200X', 100.), ('Jobs again', 'A100X', 50.)])}
+
+    def __call__(self, fname, sheet_name=None, header=None, index_col=None):
+        self.Calls.append((os.path.basename(fname), sheet_name))
+        if sheet_name is None:
+            return dict((k, v.copy()) for k, v in self.Sheets.items())
+        return self.Sheets[sheet_name].copy()
+
+
+class TestAbsXlsIndex(unittest.TestCase):
+    def setUp(self):
+        loc_utils.use_test_configuration()
+        self.Directory = tempfile.mkdtemp()
+        with open(os.path.join(self.Directory, '6202001.xls'), 'w') as f:
+            f.write('not really a workbook')
+        self.Excel = FakeExcel()
+        patcher = unittest.mock.patch('pandas.read_excel', self.Excel)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.Directory)
+
+    def make_provider(self):
+        obj = provider_abs_xls.ProviderAbsXls()
+        obj.Directory = self.Directory
+        return obj
+
+    @staticmethod
+    def make_meta(series_id):
+        meta = econ_platform_core.series_metadata.SeriesMetadata()
+        meta.ticker_full = tickers.create_ticker_full('ABSXLS', series_id)
+        meta.ticker_query = tickers.TickerFetch(series_id)
+        return meta
+
+    def test_index(self):
+        obj = self.make_provider()
+        fname = os.path.join(self.Directory, '6202001.xls')
+        index = obj.GetWorkbookIndex(fname)
+        self.assertEqual([('6202001.xls', None)], self.Excel.Calls)
+        # The Index sheet is skipped; a duplicate Series ID keeps the first.
+        self.assertEqual({'A100X': ('Data1', 1, 'Jobs ;  Total'),
+                          'A101X': ('Data1', 2, 'Jobs ;  Male'),
+                          'A200X': ('Data2', 1, 'Wages')}, index)
+        # Unchanged workbook: the saved index is used.
+        obj = self.make_provider()
+        self.assertEqual(index, obj.GetWorkbookIndex(fname))
+        self.assertEqual(1, len(self.Excel.Calls))
+        self.assertEqual({'A200X': ('6202001.xls', 'Data2', 'Wages')},
+                         dict((k, v) for k, v in obj.GetSeriesIndex().items() if k == 'A200X'))
+        self.assertEqual(1, len(self.Excel.Calls))
+
+    def test_fetch(self):
+        obj = self.make_provider()
+        obj.GetSeriesIndex()
+        self.Excel.Calls = []
+        ser = obj.fetch(self.make_meta('A200X'))
+        # Only the sheet with the series is read.
+        self.assertEqual([('6202001.xls', 'Data2')], self.Excel.Calls)
+        self.assertEqual([100., 101., 102.], list(ser.values))
+        self.assertEqual('ABSXLS@A200X', ser.name)
+        self.Excel.Calls = []
+        with self.assertRaises(TickerNotFoundError):
+            obj.fetch(self.make_meta('NOT_THERE'))
+        self.assertEqual([], self.Excel.Calls)
+
+    @unittest.skipUnless(multiprocessing.get_start_method() == 'fork', 'Worker processes need the patched read_excel')
+    def test_index_processes(self):
+        with open(os.path.join(self.Directory, '6202002.xls'), 'w') as f:
+            f.write('not really a workbook either')
+        obj = self.make_provider()
+        obj.ParseProcesses = 2
+        index = obj.GetSeriesIndex()
+        # Indexed (and saved) by the workers.
+        self.assertEqual([], self.Excel.Calls)
+        self.assertEqual(('6202001.xls', 'Data2', 'Wages'), index['A200X'])
+        self.assertEqual({'A100X': ('Data1', 1, 'Jobs ;  Total'),
+                          'A101X': ('Data1', 2, 'Jobs ;  Male'),
+                          'A200X': ('Data2', 1, 'Wages')},
+                         obj.GetWorkbookIndex(os.path.join(self.Directory, '6202002.xls')))
+        self.assertEqual([], self.Excel.Calls)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+"""
+Tests for the parallel refresh engine.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import threading
+import time
+
+import pandas
+
+import loc_utils
+import econ_platform_core
+from econ_platform_core.entity_and_errors import TickerNotFoundError, NoDataError, PlatformError
+from econ_platform_core.refresh_engine import RefreshEngine
+from econ_platform_core.update_protocols import NoUpdateProtocol
+import econ_platform_core.databases.database_sqlite3 as database_sqlite3
+
+
+class SlowProvider(econ_platform_core.ProviderWrapper):
+    """
+    Provider that takes a while, and tracks how many fetches are running at once.
+    """
+    def __init__(self):
+        super().__init__(name='RefreshTestProvider', default_code='RT')
+        self.Running = 0
+        self.MaxRunning = 0
+        self.Lock = threading.Lock()
+        self.Threads = set()
+
+    def fetch(self, series_meta):
+        with self.Lock:
+            self.Running += 1
+            self.MaxRunning = max(self.MaxRunning, self.Running)
+            self.Threads.add(threading.get_ident())
+        time.sleep(0.05)
+        with self.Lock:
+            self.Running -= 1
+        if str(series_meta.ticker_query) == 'missing':
+            raise TickerNotFoundError('not here')
+        if str(series_meta.ticker_query) == 'nodata':
+            raise NoDataError('nothing new')
+        return pandas.Series([1., 2.], index=pandas.date_range('2000-01-01', periods=2, freq='MS'))
+
+
+class TestRefreshEngine(unittest.TestCase):
+    def test_refresh(self):
+        loc_utils.use_test_configuration()
+        econ_platform_core.UpdateProtocolList.Initialise()
+        db = database_sqlite3.DatabaseSqlite3()
+        db.DatabaseFile = ':memory:'
+        econ_platform_core.Databases.AddDatabase(db, 'REFRESH_TEST')
+        provider = SlowProvider()
+        econ_platform_core.Providers.AddProvider(provider)
+        tickers = ['RT@{0}'.format(x) for x in range(0, 6)] + ['RT@missing']
+        engine = RefreshEngine('REFRESH_TEST')
+        engine.Protocol = NoUpdateProtocol()
+        engine.ProviderConcurrency['RT'] = 3
+        results = engine.Refresh(tickers)
+        self.assertEqual(3, provider.MaxRunning)
+        self.assertNotIn(threading.get_ident(), provider.Threads)
+        self.assertEqual('failed', results['RT@missing'])
+        self.assertIsInstance(engine.Errors['RT@missing'], TickerNotFoundError)
+        for t in tickers[0:6]:
+            self.assertEqual('updated', results[t])
+            self.assertEqual([1., 2.], list(db.Retrieve(db.GetMeta(t)).values))
+        # Second time around, only the missing series is stale.
+        engine = RefreshEngine('REFRESH_TEST')
+        engine.Protocol = NoUpdateProtocol()
+        results = engine.Refresh(tickers)
+        self.assertEqual('fresh', results['RT@0'])
+        self.assertEqual('failed', results['RT@missing'])
+        self.assertEqual(sorted(tickers[0:6]), db.GetAllValidSeriesTickers())
+
+    def test_errors_and_reads_in_workers(self):
+        loc_utils.use_test_configuration()
+        econ_platform_core.UpdateProtocolList.Initialise()
+        db = BrokenRefreshDatabase()
+        db.DatabaseFile = ':memory:'
+        econ_platform_core.Databases.AddDatabase(db, 'REFRESH_TEST2')
+        provider = SlowProvider()
+        econ_platform_core.Providers.AddProvider(provider)
+        engine = RefreshEngine('REFRESH_TEST2')
+        engine.Protocol = ThreadRecordingProtocol()
+        results = engine.Refresh(['RT@nodata', 'RT@1', 'RT@2'])
+        # SetLastRefresh() failing is a failed series, not the end of the refresh.
+        self.assertEqual('failed', results['RT@nodata'])
+        self.assertIsInstance(engine.Errors['RT@nodata'], PlatformError)
+        self.assertEqual('updated', results['RT@1'])
+        self.assertEqual('updated', results['RT@2'])
+        # The incremental start reads are done by the workers.
+        self.assertEqual(3, len(engine.Protocol.Threads))
+        self.assertNotIn(threading.get_ident(), engine.Protocol.Threads)
+
+    def test_worker_connections(self):
+        loc_utils.use_test_configuration()
+        econ_platform_core.UpdateProtocolList.Initialise()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        db = database_sqlite3.DatabaseSqlite3()
+        db.DatabaseFile = os.path.join(directory, 'refresh.db')
+        self.addCleanup(db.CloseAll)
+        econ_platform_core.Databases.AddDatabase(db, 'REFRESH_TEST3')
+        econ_platform_core.Providers.AddProvider(IncrementalProvider())
+        tickers = ['RI@{0}'.format(x) for x in range(0, 8)]
+        counts = []
+        for dummy in range(0, 4):
+            # Make the incremental start reads go to the database.
+            econ_platform_core.Cache.Clear()
+            engine = RefreshEngine('REFRESH_TEST3')
+            engine.Protocol = AlwaysUpdateProtocol()
+            engine.MaxWorkers = 4
+            results = engine.Refresh(tickers)
+            # The provider returns the same series each time.
+            expected = 'updated' if len(counts) == 0 else 'unchanged'
+            self.assertEqual([expected] * 8, [results[t] for t in tickers])
+            counts.append(len(db.AllConnections))
+        # Only the main thread's connection is left open.
+        self.assertEqual([1, 1, 1, 1], counts)
+
+
+class IncrementalProvider(econ_platform_core.ProviderWrapper):
+    def __init__(self):
+        super().__init__(name='RefreshIncrementalProvider', default_code='RI')
+        self.SupportsIncremental = True
+
+    def fetch(self, series_meta, start_date=None):
+        return pandas.Series([float(x) for x in range(0, 10)],
+                             index=pandas.date_range('2000-01-01', periods=10, freq='MS'))
+
+
+class AlwaysUpdateProtocol(NoUpdateProtocol):
+    def NeedsUpdate(self, series_meta, database_manager):
+        return True
+
+
+class BrokenRefreshDatabase(database_sqlite3.DatabaseSqlite3):
+    def SetLastRefresh(self, ticker_full, time_stamp=None):
+        raise PlatformError('database is broken')
+
+
+class ThreadRecordingProtocol(NoUpdateProtocol):
+    def __init__(self):
+        super().__init__()
+        self.Threads = []
+
+    def GetIncrementalStart(self, series_meta, provider_manager, database_manager):
+        self.Threads.append(threading.get_ident())
+        return super().GetIncrementalStart(series_meta, provider_manager, database_manager)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+"""
+Tests for the in-memory series cache.
+"""
+
+import unittest
+import datetime
+
+import pandas
+
+import loc_utils
+import econ_platform_core
+from econ_platform_core.series_cache import SeriesCache
+import econ_platform_core.databases.database_sqlite3 as database_sqlite3
+
+
+def make_series(n):
+    ser = pandas.Series([float(x) for x in range(0, n)])
+    ser.index = pandas.date_range(datetime.date(2000, 1, 1), periods=n)
+    return ser
+
+
+class TestSeriesCache(unittest.TestCase):
+    def test_get_put(self):
+        obj = SeriesCache(max_bytes=1024*1024)
+        self.assertIsNone(obj.Get('DB', 'T@1'))
+        ser = make_series(10)
+        obj.Put('DB', 'T@1', ser)
+        ser2 = obj.Get('DB', 'T@1')
+        self.assertTrue(ser.equals(ser2))
+        # Get hands out a copy
+        ser2.iloc[0] = 100.
+        self.assertEqual(0., obj.Get('DB', 'T@1').iloc[0])
+        stats = obj.GetStatistics()
+        self.assertEqual(2, stats['Hits'])
+        self.assertEqual(1, stats['Misses'])
+
+    def test_no_code(self):
+        obj = SeriesCache(max_bytes=1024*1024)
+        obj.Put('', 'T@1', make_series(10))
+        self.assertIsNone(obj.Get('', 'T@1'))
+
+    def test_eviction(self):
+        ser = make_series(100)
+        size = ser.memory_usage(index=True, deep=True)
+        # Room for two series.
+        obj = SeriesCache(max_bytes=int(2.5 * size))
+        obj.Put('DB', 'T@1', ser)
+        obj.Put('DB', 'T@2', ser)
+        # T@1 is now the most recently used.
+        obj.Get('DB', 'T@1')
+        obj.Put('DB', 'T@3', ser)
+        self.assertIsNone(obj.Get('DB', 'T@2'))
+        self.assertIsNotNone(obj.Get('DB', 'T@1'))
+        self.assertEqual(1, obj.GetStatistics()['Evictions'])
+
+    def test_generation(self):
+        obj = SeriesCache(max_bytes=1024*1024)
+        generation = obj.GetGeneration('DB', 'T@1')
+        for x in range(0, 100):
+            obj.Invalidate('DB', 'T@{0}'.format(x))
+        # One counter, whatever the number of tickers written.
+        self.assertEqual(generation + 100, obj.GetGeneration('DB', 'T@1'))
+        obj.Put('DB', 'T@1', make_series(10), generation=generation)
+        self.assertIsNone(obj.Get('DB', 'T@1'))
+        obj.Put('DB', 'T@1', make_series(10), generation=obj.GetGeneration('DB', 'T@1'))
+        self.assertEqual(10, len(obj.Get('DB', 'T@1')))
+
+    def test_invalidate_on_write(self):
+        loc_utils.use_test_configuration()
+        econ_platform_core.Cache.SetBudget(1024*1024)
+        obj = database_sqlite3.DatabaseSqlite3()
+        obj.DatabaseFile = ':memory:'
+        obj.Code = 'CACHE_TEST'
+        meta = obj.GetMeta('TEST@cache_1')
+        obj.Write(make_series(3), meta)
+        meta = obj.GetMeta('TEST@cache_1')
+        obj.Retrieve(meta)
+        hits = econ_platform_core.Cache.Hits
+        obj.Retrieve(meta)
+        self.assertEqual(hits + 1, econ_platform_core.Cache.Hits)
+        obj.Write(make_series(5), meta)
+        self.assertEqual(5, len(obj.Retrieve(meta)))
+        obj.Delete(meta)
+        self.assertIsNone(econ_platform_core.Cache.Get('CACHE_TEST', 'TEST@cache_1'))
+        econ_platform_core.Cache.SetBudget(0)
+
+    def test_write_during_retrieve(self):
+        # A write that lands between the database read and the Put() must not leave the old series cached.
+        loc_utils.use_test_configuration()
+        econ_platform_core.Cache.SetBudget(1024*1024)
+        obj = InterleavedDatabase()
+        obj.DatabaseFile = ':memory:'
+        obj.Code = 'CACHE_TEST'
+        meta = obj.GetMeta('TEST@cache_2')
+        obj.Write(make_series(3), meta)
+        obj.DuringRetrieve = lambda: obj.Write(make_series(5), meta)
+        self.assertEqual(3, len(obj.Retrieve(meta)))
+        obj.DuringRetrieve = None
+        self.assertIsNone(econ_platform_core.Cache.Get('CACHE_TEST', 'TEST@cache_2'))
+        self.assertEqual(5, len(obj.Retrieve(meta)))
+        # Same thing for RetrieveMany()
+        econ_platform_core.Cache.Invalidate('CACHE_TEST', 'TEST@cache_2')
+        obj.DuringRetrieve = lambda: obj.Write(make_series(7), meta)
+        obj.RetrieveMany([meta])
+        obj.DuringRetrieve = None
+        self.assertEqual(7, len(obj.RetrieveMany([meta])['TEST@cache_2']))
+        econ_platform_core.Cache.SetBudget(0)
+
+
+class InterleavedDatabase(database_sqlite3.DatabaseSqlite3):
+    """
+    Calls DuringRetrieve after reading from the database (standing in for a write in another thread).
+    """
+    DuringRetrieve = None
+
+    def _Retrieve(self, series_meta):
+        ser = super()._Retrieve(series_meta)
+        if self.DuringRetrieve is not None:
+            self.DuringRetrieve()
+        return ser
+
+    def _RetrieveMany(self, meta_list):
+        out = super()._RetrieveMany(meta_list)
+        if self.DuringRetrieve is not None:
+            self.DuringRetrieve()
+        return out
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -18,12 +18,17 @@ import loc_utils
 
 # loc_utils.skip_this_extension_module()
 
+import concurrent.futures
+import os
 import pandas
 import unittest
 import time
 import datetime
+import tempfile
 
 import econ_platform_core.databases.database_sqlite3 as database_sqlite3
+import econ_platform_core.entity_and_errors
+from econ_platform_core.entity_and_errors import PlatformError
 
 
 class TestEndToEnd(unittest.TestCase):
@@ -67,3 +72,301 @@ class TestEndToEnd(unittest.TestCase):
 
 
 
+    def test_get_meta_many(self):
+        loc_utils.use_test_configuration()
+        obj = database_sqlite3.DatabaseSqlite3()
+        obj.DatabaseFile = ':memory:'
+        ser = pandas.Series([1., 2.])
+        ser.index = [datetime.date(2000, 1, 1), datetime.date(2000, 2, 1)]
+        meta = obj.GetMeta('TEST@many_1')
+        obj.Write(ser, meta)
+        meta_list = obj.GetMetaMany(['TEST@many_1', 'TEST@many_missing'])
+        self.assertTrue(meta_list[0].Exists)
+        self.assertFalse(meta_list[1].Exists)
+        self.assertEqual('TEST@many_missing', str(meta_list[1].ticker_full))
+
+    def test_retrieve_many(self):
+        loc_utils.use_test_configuration()
+        obj = database_sqlite3.DatabaseSqlite3()
+        obj.DatabaseFile = ':memory:'
+        # Force more than one block of series_id.
+        obj.MaxQueryParameters = 2
+        tickers = ['TEST@many_{0}'.format(i) for i in range(0, 5)]
+        for i, ticker in enumerate(tickers):
+            ser = pandas.Series([float(i), float(i) + 0.5])
+            ser.index = [datetime.date(2000, 1, 1), datetime.date(2000, 2, 1)]
+            obj.Write(ser, obj.GetMeta(ticker))
+        res = obj.RetrieveMany(obj.GetMetaMany(tickers))
+        self.assertEqual(5, len(res))
+        self.assertEqual([3., 3.5], list(res['TEST@many_3'].values))
+        self.assertEqual(2000, res['TEST@many_3'].index[1].year)
+        self.assertEqual(2, res['TEST@many_3'].index[1].month)
+
+    def test_retrieve_many_mixed(self):
+        loc_utils.use_test_configuration()
+        for version in (1, 2):
+            obj = database_sqlite3.DatabaseSqlite3()
+            obj.DatabaseFile = ':memory:'
+            obj.NewSchemaVersion = version
+            obj.MaxQueryParameters = 3
+            dated = pandas.Series([1., 2., 3.], index=[datetime.date(1960, 1, 1), datetime.date(2000, 2, 1),
+                                                       datetime.date(2000, 3, 1)])
+            model = pandas.Series([4., 5., 6.], index=[2., 10., 100.5])
+            tickers = ['TEST@dated', 'TEST@model', 'TEST@empty', 'TEST@dated_2']
+            obj.Write(dated, obj.GetMeta('TEST@dated'))
+            obj.Write(model, obj.GetMeta('TEST@model'))
+            obj.Write(pandas.Series([], dtype=float), obj.GetMeta('TEST@empty'))
+            obj.Write(dated * 2., obj.GetMeta('TEST@dated_2'))
+            # Rows of the first series after the others in the table.
+            obj.Write(pandas.concat([dated, pandas.Series([7.], index=[datetime.date(2001, 1, 1)])]),
+                      obj.GetMeta('TEST@dated'))
+            res = obj.RetrieveMany(obj.GetMetaMany(tickers))
+            self.assertEqual([1., 2., 3., 7.], list(res['TEST@dated'].values))
+            self.assertEqual(pandas.Timestamp(2001, 1, 1), res['TEST@dated'].index[-1])
+            self.assertIsInstance(res['TEST@dated'].index, pandas.DatetimeIndex)
+            self.assertEqual([2., 10., 100.5], list(res['TEST@model'].index))
+            self.assertEqual([4., 5., 6.], list(res['TEST@model'].values))
+            self.assertEqual(0, len(res['TEST@empty']))
+            self.assertEqual([2., 4., 6.], list(res['TEST@dated_2'].values))
+            for ticker in tickers:
+                single = obj.Retrieve(obj.GetMeta(ticker))
+                self.assertEqual(list(single.index), list(res[ticker].index), ticker)
+
+    def test_schema_v2(self):
+        loc_utils.use_test_configuration()
+        obj = database_sqlite3.DatabaseSqlite3()
+        obj.DatabaseFile = ':memory:'
+        obj.NewSchemaVersion = 2
+        ser = pandas.Series([1., 2., 3.])
+        ser.index = [datetime.date(1960, 1, 1), datetime.date(2000, 2, 1), datetime.date(2000, 3, 1)]
+        obj.Write(ser, obj.GetMeta('TEST@v2_dates'))
+        self.assertEqual(2, obj.SchemaVersion)
+        obj.Execute('SELECT series_dates FROM {0}'.format(obj.TableData))
+        self.assertEqual(-3653, obj.Cursor.fetchall()[0][0])
+        ser2 = obj.Retrieve(obj.GetMeta('TEST@v2_dates'))
+        self.assertEqual(list(pandas.DatetimeIndex(ser.index)), list(ser2.index))
+        self.assertEqual([1., 2., 3.], list(ser2.values))
+        # Model time axis. Would be out of order if sorted as strings.
+        ser = pandas.Series([1., 2., 3.], index=[2., 10., 100.5])
+        obj.Write(ser, obj.GetMeta('TEST@v2_float'))
+        ser2 = obj.Retrieve(obj.GetMeta('TEST@v2_float'))
+        self.assertEqual([2., 10., 100.5], list(ser2.index))
+        self.assertEqual([1., 2., 3.], list(ser2.values))
+
+    def test_migrate(self):
+        loc_utils.use_test_configuration()
+        fname = os.path.join(tempfile.mkdtemp(), 'migrate.db')
+        obj = database_sqlite3.DatabaseSqlite3()
+        obj.DatabaseFile = fname
+        obj.NewSchemaVersion = 1
+        ser = pandas.Series([1., 2.])
+        ser.index = [datetime.date(2000, 1, 1), datetime.date(2000, 2, 1)]
+        obj.Write(ser, obj.GetMeta('TEST@migrate_dates'))
+        obj.Write(pandas.Series([3., 4.], index=[10., 2.]), obj.GetMeta('TEST@migrate_float'))
+        self.assertEqual(1, obj.SchemaVersion)
+        obj.MigrateSchema(2)
+        obj.Connection.close()
+        obj2 = database_sqlite3.DatabaseSqlite3()
+        obj2.DatabaseFile = fname
+        ser2 = obj2.Retrieve(obj2.GetMeta('TEST@migrate_dates'))
+        self.assertEqual(2, obj2.SchemaVersion)
+        self.assertEqual(list(pandas.DatetimeIndex(ser.index)), list(ser2.index))
+        ser3 = obj2.Retrieve(obj2.GetMeta('TEST@migrate_float'))
+        self.assertEqual([2., 10.], list(ser3.index))
+        self.assertEqual([4., 3.], list(ser3.values))
+        obj2.Execute('SELECT start_date, end_date FROM ViewSummary WHERE ticker_full = ?', 'TEST@migrate_dates')
+        self.assertEqual(('2000-01-01', '2000-02-01'), obj2.Cursor.fetchall()[0])
+        obj2.Connection.close()
+        os.remove(fname)
+
+    def test_retrieve_float_axis_v1(self):
+        loc_utils.use_test_configuration()
+        obj = database_sqlite3.DatabaseSqlite3()
+        obj.DatabaseFile = ':memory:'
+        obj.NewSchemaVersion = 1
+        # Stored as text, so sorted as '10.0', '100.5', '2.0' by the database.
+        ser = pandas.Series([1., 2., 3.], index=[2., 10., 100.5])
+        obj.Write(ser, obj.GetMeta('TEST@v1_float'))
+        ser2 = obj.Retrieve(obj.GetMeta('TEST@v1_float'))
+        self.assertEqual([2., 10., 100.5], list(ser2.index))
+        self.assertEqual([1., 2., 3.], list(ser2.values))
+        obj.Write(pandas.Series([], dtype=float), obj.GetMeta('TEST@v1_empty'))
+        self.assertEqual(0, len(obj.Retrieve(obj.GetMeta('TEST@v1_empty'))))
+
+    def test_write_diff(self):
+        loc_utils.use_test_configuration()
+        for version in (1, 2):
+            obj = database_sqlite3.DatabaseSqlite3()
+            obj.DatabaseFile = ':memory:'
+            obj.NewSchemaVersion = version
+            meta = obj.GetMeta('TEST@diff')
+            ser = pandas.Series([1., 2., 3., 4.], index=pandas.date_range('2000-01-01', periods=4, freq='MS'))
+            obj.Write(ser, meta)
+            self.assertEqual(4, obj.LastWriteStatistics['insert'])
+            # Revise the last observation, drop the first, add one.
+            ser2 = pandas.Series([2., 3., 4.5, 5.], index=pandas.date_range('2000-02-01', periods=4, freq='MS'))
+            obj.Write(ser2, meta)
+            self.assertEqual({'insert': 1, 'update': 1, 'delete': 1, 'replace': False}, obj.LastWriteStatistics)
+            ser3 = obj.Retrieve(meta)
+            self.assertEqual(list(ser2.values), list(ser3.values))
+            self.assertEqual(list(ser2.index), list(ser3.index))
+            # Replace mode rewrites everything.
+            obj.WriteMode = 'replace'
+            obj.Write(ser2, meta)
+            self.assertEqual({'insert': 4, 'update': 0, 'delete': 0, 'replace': True}, obj.LastWriteStatistics)
+            self.assertEqual(list(ser2.values), list(obj.Retrieve(meta).values))
+
+    def test_write_many(self):
+        loc_utils.use_test_configuration()
+        for version in (1, 2):
+            obj = database_sqlite3.DatabaseSqlite3()
+            obj.DatabaseFile = ':memory:'
+            obj.NewSchemaVersion = version
+            # Force more than one block in the series_id lookup.
+            obj.MaxQueryParameters = 2
+            ser_old = pandas.Series([1., 2.], index=pandas.date_range('2000-01-01', periods=2, freq='MS'))
+            obj.Write(ser_old, obj.GetMeta('TEST@many_0'))
+            series_list = []
+            for i in range(0, 3):
+                ser = pandas.Series([1., 2., float(i)], index=pandas.date_range('2000-01-01', periods=3, freq='MS'))
+                series_list.append((ser, obj.GetMeta('TEST@many_{0}'.format(i))))
+            obj.WriteMany(series_list)
+            # Existing series: one insert; two new series with three each.
+            self.assertEqual({'insert': 7, 'update': 0, 'delete': 0, 'replace': 0, 'series': 3},
+                             obj.LastWriteStatistics)
+            for ser, meta in series_list:
+                meta2 = obj.GetMeta(str(meta.ticker_full))
+                self.assertTrue(meta2.Exists)
+                self.assertIsNotNone(meta2.last_update)
+                self.assertEqual(list(ser.values), list(obj.Retrieve(meta2).values))
+            self.assertEqual(['TEST@many_0', 'TEST@many_1', 'TEST@many_2'], obj.GetAllValidSeriesTickers())
+
+    def test_failed_write_new_series(self):
+        loc_utils.use_test_configuration()
+        obj = database_sqlite3.DatabaseSqlite3()
+        obj.DatabaseFile = ':memory:'
+        ser = pandas.Series([1., 2.], index=pandas.date_range('2000-01-01', periods=2, freq='MS'))
+
+        def broken(series_id, ser, is_new):
+            raise ValueError('disk on fire')
+        obj._WriteObservations = broken
+        with self.assertRaises(ValueError):
+            obj.Write(ser, obj.GetMeta('TEST@failed'))
+        # The series is not created without its data.
+        self.assertIsNone(obj.GetSeriesID('TEST@failed'))
+        self.assertEqual([], obj.GetAllValidSeriesTickers())
+
+    def test_pragmas(self):
+        config = loc_utils.use_test_configuration()
+        config.ConfigParser.read_dict({'D_SQLITE': {'journal_mode': 'WAL', 'synchronous': 'NORMAL',
+                                                    'cache_size': '-2000', 'temp_store': ''},
+                                       'D_SQLITE_PRAGMA_TEST': {'synchronous': 'FULL'}})
+        fname = os.path.join(tempfile.mkdtemp(), 'pragma.db')
+        obj = database_sqlite3.DatabaseSqlite3()
+        obj.DatabaseFile = fname
+        obj.Code = 'PRAGMA_TEST'
+        obj.Write(pandas.Series([1.], index=[datetime.date(2000, 1, 1)]), obj.GetMeta('TEST@pragma'))
+        self.assertEqual({'journal_mode': 'WAL', 'synchronous': 'FULL', 'cache_size': '-2000'}, obj.Pragmas)
+        values = obj.GetPragmaValues()
+        self.assertEqual('wal', values['journal_mode'])
+        # FULL
+        self.assertEqual(2, values['synchronous'])
+        self.assertEqual(-2000, values['cache_size'])
+        obj.Connection.close()
+        # Reopen: settings applied on connect as well as creation.
+        obj = database_sqlite3.DatabaseSqlite3()
+        obj.DatabaseFile = fname
+        obj.Pragmas = {'synchronous': 'OFF'}
+        self.assertEqual(0, obj.GetPragmaValues()['synchronous'])
+        obj.Pragmas = {'synchronous': 'OFF; DROP TABLE SeriesMeta'}
+        with self.assertRaises(PlatformError):
+            obj.ApplyPragmas()
+        obj.Connection.close()
+
+    def test_threads(self):
+        loc_utils.use_test_configuration()
+        fname = os.path.join(tempfile.mkdtemp(), 'threads.db')
+        for file_name in (fname, ':memory:'):
+            obj = database_sqlite3.DatabaseSqlite3()
+            obj.DatabaseFile = file_name
+            tickers = ['TEST@thread_{0}'.format(x) for x in range(0, 8)]
+
+            def worker(ticker):
+                ser = pandas.Series([1., 2., 3.], index=pandas.date_range('2000-01-01', periods=3, freq='MS'))
+                obj.Write(ser, obj.GetMeta(ticker))
+                for i in range(0, 5):
+                    ser2 = obj.Retrieve(obj.GetMeta(ticker))
+                    self.assertEqual([1., 2., 3.], list(ser2.values))
+                return id(obj.Connection)
+
+            with concurrent.futures.ThreadPoolExecutor(max_workers=4) as pool:
+                conn_ids = set(pool.map(worker, tickers))
+            if file_name == ':memory:':
+                self.assertEqual(1, len(conn_ids))
+            else:
+                self.assertGreater(len(conn_ids), 1)
+            self.assertEqual(sorted(tickers), obj.GetAllValidSeriesTickers())
+            obj.CloseAll()
+        os.remove(fname)
+
+    def test_ticker_alias(self):
+        loc_utils.use_test_configuration()
+        fname = os.path.join(tempfile.mkdtemp(), 'alias.db')
+        obj = database_sqlite3.DatabaseSqlite3()
+        obj.DatabaseFile = fname
+        ser = pandas.Series([1.], index=[datetime.date(2000, 1, 1)])
+        obj.Write(ser, obj.GetMeta('TEST@alias_1'))
+        obj.Write(ser, obj.GetMeta('TEST@alias_2'))
+        self.assertTrue(obj.HasAliasTable)
+        series_id = obj.GetSeriesID('TEST@alias_2')
+        obj.Execute('INSERT INTO TickerLocal (series_id, ticker_local) VALUES (?, ?)', series_id, 'local_2',
+                    commit_after=True)
+        self.assertEqual(series_id, obj.GetSeriesID('local_2'))
+        plan = obj.Execute('EXPLAIN QUERY PLAN SELECT series_id FROM TickerAlias WHERE ticker = ?',
+                           'TEST@alias_2').fetchall()
+        self.assertIn('PRIMARY KEY', str(plan))
+        obj.Delete(obj.GetMeta('TEST@alias_2'))
+        self.assertIsNone(obj.GetSeriesID('TEST@alias_2'))
+        # The local ticker goes with the series, so that a new series that re-uses the id does not pick it up.
+        self.assertIsNone(obj.GetSeriesID('local_2'))
+        # Simulate an older file: drop the alias table and go back to the UNION view.
+        for cmd in obj.Execute("SELECT name FROM sqlite_master WHERE type='trigger'").fetchall():
+            obj.Execute('DROP TRIGGER {0}'.format(cmd[0]))
+        obj.Execute('DROP VIEW TickerLookup')
+        obj.Execute('DROP TABLE TickerAlias')
+        obj.HasAliasTable = False
+        obj.Execute(obj._GetCreateLookupViewSQL())
+        obj.Connection.commit()
+        obj.CloseAll()
+        obj = database_sqlite3.DatabaseSqlite3()
+        obj.DatabaseFile = fname
+        self.assertEqual(1, obj.GetSeriesID('TEST@alias_1'))
+        self.assertFalse(obj.HasAliasTable)
+        obj.MigrateTickerAlias()
+        self.assertTrue(obj.HasAliasTable)
+        self.assertEqual(1, obj.GetSeriesID('TEST@alias_1'))
+        self.assertIsNone(obj.GetSeriesID('local_2'))
+        obj.Write(ser, obj.GetMeta('TEST@alias_3'))
+        self.assertEqual(series_id, obj.GetSeriesID('TEST@alias_3'))
+        self.assertIsNone(obj.GetSeriesID('local_2'))
+        self.assertEqual(2, len(obj.Execute('SELECT * FROM TickerLookup').fetchall()))
+        obj.CloseAll()
+        os.remove(fname)
+
+    def test_retrieve_with_meta(self):
+        loc_utils.use_test_configuration()
+        obj = database_sqlite3.DatabaseSqlite3()
+        obj.DatabaseFile = ':memory:'
+        meta = obj.GetMeta('TEST@with_meta')
+        meta.series_name = 'name'
+        meta.ProviderMetadata = {'a': 'b'}
+        ser = pandas.Series([1., 2.], index=pandas.date_range('2000-01-01', periods=2, freq='MS'))
+        obj.Write(ser, meta)
+        ser2, meta2 = obj.RetrieveWithMeta('TEST@with_meta')
+        self.assertTrue(meta2.Exists)
+        self.assertEqual('name', meta2.series_name)
+        self.assertEqual({'a': 'b'}, meta2.ProviderMetadata)
+        self.assertEqual([1., 2.], list(ser2.values))
+        self.assertFalse(obj.Connection.in_transaction)
+        with self.assertRaises(econ_platform_core.entity_and_errors.TickerNotFoundError):
+            obj.RetrieveWithMeta('TEST@not_there')
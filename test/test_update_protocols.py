@@ -0,0 +1,73 @@
+"""
+Tests for the update protocol base class (incremental fetches).
+"""
+
+import unittest
+import datetime
+
+import pandas
+
+import loc_utils
+import econ_platform_core
+from econ_platform_core.entity_and_errors import NoDataError
+from econ_platform_core.update_protocols import UpdateProtocol
+import econ_platform_core.databases.database_sqlite3 as database_sqlite3
+
+
+class IncrementalProvider(econ_platform_core.ProviderWrapper):
+    """
+    Provider that only has recent history, and records the start_date it was passed.
+    """
+    def __init__(self, ser):
+        super().__init__()
+        self.SupportsIncremental = True
+        self.Series = ser
+        self.StartDate = 'not called'
+
+    def fetch(self, series_meta, start_date=None):
+        self.StartDate = start_date
+        if start_date is None:
+            return self.Series
+        return self.Series[self.Series.index >= pandas.Timestamp(start_date)]
+
+
+class TestIncremental(unittest.TestCase):
+    def test_splice(self):
+        loc_utils.use_test_configuration()
+        db = database_sqlite3.DatabaseSqlite3()
+        db.DatabaseFile = ':memory:'
+        stored = pandas.Series([float(x) for x in range(0, 10)],
+                               index=pandas.date_range('2000-01-01', periods=10, freq='MS'))
+        db.Write(stored, db.GetMeta('TEST@incremental'))
+        meta = db.GetMeta('TEST@incremental')
+        # Provider has revised the last value, added one, and dropped the early history.
+        provider_ser = pandas.Series([4., 5., 6., 7., 8., 9.5, 10.],
+                                     index=pandas.date_range('2000-05-01', periods=7, freq='MS'))
+        provider = IncrementalProvider(provider_ser)
+        protocol = UpdateProtocol()
+        ser = protocol.FetchAndWrite('TEST@incremental', meta, provider, db)
+        self.assertEqual(datetime.date(2000, 6, 1), provider.StartDate)
+        expected = [0., 1., 2., 3., 4., 5., 6., 7., 8., 9.5, 10.]
+        self.assertEqual(expected, list(ser.values))
+        self.assertEqual(expected, list(db.Retrieve(meta).values))
+        # Nothing new the second time around.
+        with self.assertRaises(NoDataError):
+            protocol.FetchAndWrite('TEST@incremental', db.GetMeta('TEST@incremental'), provider, db)
+
+    def test_not_incremental(self):
+        loc_utils.use_test_configuration()
+        db = database_sqlite3.DatabaseSqlite3()
+        db.DatabaseFile = ':memory:'
+        ser = pandas.Series([1., 2.], index=pandas.date_range('2000-01-01', periods=2, freq='MS'))
+        provider = IncrementalProvider(ser)
+        protocol = UpdateProtocol()
+        # Not on the database: full fetch.
+        protocol.FetchAndWrite('TEST@not_incremental', db.GetMeta('TEST@not_incremental'), provider, db)
+        self.assertIsNone(provider.StartDate)
+        # Too short to bother.
+        protocol.FetchAndWrite('TEST@not_incremental', db.GetMeta('TEST@not_incremental'), provider, db)
+        self.assertIsNone(provider.StartDate)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,8 @@
 
 import unittest
 import os
+import shutil
+import tempfile
 import datetime
 
 import econ_platform_core
@@ -110,6 +112,23 @@ class test_functions(unittest.TestCase):
 
 
 
+    def test_sidecar_cache(self):
+        data_dir = tempfile.mkdtemp()
+        fname = os.path.join(data_dir, 'workbook.xls')
+        with open(fname, 'w') as f:
+            f.write('version 1')
+        self.assertIsNone(utils.read_sidecar_cache(fname))
+        utils.write_sidecar_cache(fname, {'x': [1, 2]})
+        self.assertTrue(os.path.exists(os.path.join(data_dir, 'cache', 'workbook.xls.pkl')))
+        self.assertEqual({'x': [1, 2]}, utils.read_sidecar_cache(fname))
+        # Different cache version: stale.
+        self.assertIsNone(utils.read_sidecar_cache(fname, cache_version=2))
+        # File changed: stale.
+        with open(fname, 'w') as f:
+            f.write('version 2 is longer')
+        self.assertIsNone(utils.read_sidecar_cache(fname))
+        shutil.rmtree(data_dir)
+
 
 class test_parse_config_directory(unittest.TestCase):
     package_dir = os.path.dirname(econ_platform_core.__file__)